@@ -0,0 +1,32 @@
+# analysis/_arrays.py
+# Analiz modülleri için ortak NumPy yardımcıları (iç kullanım)
+import numpy as np
+import pandas as pd
+
+
+def time_keys(values) -> np.ndarray:
+    """
+    Zaman dizisi → sıralanabilir/karşılaştırılabilir int64 anahtarlar.
+    - datetime benzeri (pd.Timestamp, datetime64, datetime) → epoch-ns
+    - sayısal (open_time epoch-ms gibi) → olduğu gibi int64
+    Aynı kaynaktan gelen zamanlar karşılaştırılmalı (ns ile ms karıştırılmamalı).
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        arr = values.to_numpy()
+    else:
+        arr = np.asarray(list(values) if not isinstance(values, np.ndarray) else values)
+    if arr.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if np.issubdtype(arr.dtype, np.integer):
+        return arr.astype(np.int64, copy=False)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[ns]").astype(np.int64)
+    idx = pd.DatetimeIndex(pd.to_datetime(arr))
+    if idx.tz is not None:
+        idx = idx.tz_convert("UTC").tz_localize(None)
+    return idx.as_unit("ns").asi8.astype(np.int64, copy=False)
+
+
+def time_key(value) -> int:
+    """Tek zaman değeri için time_keys karşılığı."""
+    return int(time_keys([value])[0])
@@ -1,25 +1,33 @@
 from typing import List, Tuple, Dict, Any, Optional
 import pandas as pd
 import numpy as np
-from bisect import bisect_right
+
+from analysis._arrays import time_keys
+from analysis.indicators import atr_series
+from analysis.exits import resolve_exits, REASONS, R_MAX_BARS
 
 # df: timestamp, open, high, low, close (sıralı)
 # signals: List[Tuple[timestamp, value, "BUY"/"SELL"]]
 
+# tick-size önbellekte olmayan semboller → uyarı sembol başına bir kez (sweep/walk-forward çok sayıda çağırır)
+_TICK_WARNED = set()
+
 def _atr_from_df(df: pd.DataFrame, period: int = 14) -> float:
     """Basit ATR hesaplayıcı (rolling SMA). df: high, low, close"""
     if df is None or len(df) == 0:
         return 0.0
-    h = df["high"].astype(float).values
-    l = df["low"].astype(float).values
-    c = df["close"].astype(float).values
-    tr = np.zeros_like(c)
-    tr[0] = h[0] - l[0]
-    for i in range(1, len(c)):
-        tr[i] = max(h[i] - l[i], abs(h[i] - c[i-1]), abs(l[i] - c[i-1]))
-    if len(tr) < period:
-        return float(np.mean(tr))
-    return float(pd.Series(tr).rolling(period).mean().iloc[-1])
+    return float(atr_series(df["high"], df["low"], df["close"], period)[-1])
+
+
+def _last_index_before(sorted_keys: np.ndarray, order: np.ndarray, key: int, limit: int) -> Optional[int]:
+    """ts_keys[i] == key olan ve i < limit olan en büyük i (yoksa None). order: stable argsort(ts_keys)."""
+    lo = int(np.searchsorted(sorted_keys, key, side="left"))
+    hi = int(np.searchsorted(sorted_keys, key, side="right"))
+    if lo == hi:
+        return None
+    cand = order[lo:hi]                       # stable → artan index
+    k = int(np.searchsorted(cand, limit, side="left")) - 1
+    return int(cand[k]) if k >= 0 else None
 
 
 def run_backtest(
@@ -47,6 +55,8 @@ def run_backtest(
     htf_interval: str = "4h",
     htf_lookback: int = 3,
     htf_max_bars_since_swing: int = 300,
+    htf_source: str = "resample",     # "resample": HTF, df'ten üretilir | "fetch": son 1000 HTF bar çekilir
+    use_tick_quantize: bool = False,  # SL/TP'yi tick-size'e yuvarla (filtreler disk önbelleğinden, ağ yok)
 ) -> List[Dict[str, Any]]:
     """
     Backtest fonksiyonu (canlı kurallarıyla hizalı + opsiyonel HTF filtre):
@@ -55,12 +65,39 @@ def run_backtest(
     - TP: RR ile, sonra max_tp_percent ile sınırla
     - Gap açılışı, double-hit, timeout, max_future_bars
     - (opsiyonel) HTF filtre: 1h BUY ancak 4h HL, 1h SELL ancak 4h LH ise
+      (HTF barları varsayılan olarak df'in kendisinden üretilir → tam olarak test edilen aralığı kapsar)
     - Telemetry: effective_rr, tp_capped
+    Çerçeve bir kez NumPy dizilerine çevrilir; swing'ler searchsorted ile bulunur,
+    tüm işlemlerin çıkışı tek seferde analysis.exits.resolve_exits ile çözülür.
     """
     results: List[Dict[str, Any]] = []
 
+    # ATR serisi bir kez (sinyal başına tüm geçmişi yeniden hesaplamak yerine)
+    atr_arr = atr_series(df["high"], df["low"], df["close"], atr_period) if use_atr_buffer else None
+
+    # tick-size (canlıdaki gibi: BUY → SL aşağı / TP yukarı, SELL → tersi)
+    tick = None
+    if use_tick_quantize and symbol is not None:
+        from services.binance_filters import get_price_tick
+        tick = get_price_tick(symbol, allow_network=False)
+        if tick is None and symbol not in _TICK_WARNED:
+            _TICK_WARNED.add(symbol)
+            print(f"⚠️ [backtest] {symbol} tick-size önbellekte yok → quantize kapalı")
+    if tick:
+        from services.binance_filters import floor_to_tick, ceil_to_tick
+
     # yardımcı: timestamp -> index map
-    ts_to_idx = {t: i for i, t in enumerate(df["timestamp"].tolist())}
+    ts_series = df["timestamp"]
+    ts_to_idx = {t: i for i, t in enumerate(ts_series.tolist())}
+
+    # çerçeve → NumPy dizileri (bir kez)
+    ts_keys = time_keys(ts_series)
+    ts_order = np.argsort(ts_keys, kind="stable")
+    ts_sorted = ts_keys[ts_order]
+    o_arr = df["open"].to_numpy(dtype=np.float64)
+    h_arr = df["high"].to_numpy(dtype=np.float64)
+    l_arr = df["low"].to_numpy(dtype=np.float64)
+    c_arr = df["close"].to_numpy(dtype=np.float64)
 
     # sinyallerde aynı timestamp tekrarını filtrele (ilkini al)
     unique_signals = []
@@ -73,23 +110,32 @@ def run_backtest(
     # swing listelerini zaman sırasına sok
     swing_highs = sorted(swing_highs, key=lambda x: x[0]) if swing_highs else []
     swing_lows  = sorted(swing_lows,  key=lambda x: x[0]) if swing_lows  else []
+    sh_keys = time_keys([t for t, _v in swing_highs])
+    sl_keys = time_keys([t for t, _v in swing_lows])
 
     # -------------------------------------------------
     # HTF trend ön-hazırlık (tek sefer)
     # -------------------------------------------------
-    htf_times = []
+    htf_times = np.empty(0, dtype=np.int64)     # trend noktası zamanları (int64 anahtar, sıralı)
     htf_labels = []
-    htf_ts_all = []
-    idx_map_htf = {}
+    htf_ts_all = np.empty(0, dtype=np.int64)    # tüm HTF bar zamanları (int64 anahtar, sıralı)
+    htf_point_idx = np.empty(0, dtype=np.int64) # trend noktasının HTF bar index'i
     if use_htf_filter:
-        if symbol is None:
+        htf_df = None
+        if htf_source == "resample":
+            from analysis.resample import resample_ohlc
+            try:
+                htf_df = resample_ohlc(df, htf_interval)
+            except ValueError:
+                htf_df = None  # HTF, LTF'in hizalı katı değil → ağdan çek
+        if htf_df is None and symbol is None:
             raise ValueError("use_htf_filter=True iken run_backtest(symbol=...) belirtmelisin.")
         try:
-            from services.binance_service import get_klines
             from analysis.swing_points import detect_swing_points as _detect
             from analysis.trend_structure import classify_trend_structure as _classify
-            # yeterli uzunlukta 4h veri çek (LTF penceresini kapsasın)
-            htf_df = get_klines(symbol=symbol, interval=htf_interval, limit=1000)
+            if htf_df is None:
+                from services.binance_service import get_klines
+                htf_df = get_klines(symbol=symbol, interval=htf_interval, limit=1000)
             if htf_df is not None and len(htf_df) >= 20:
                 htf_df = htf_df.sort_values("timestamp").drop_duplicates(subset=["timestamp"]).reset_index(drop=True)
                 h_swing_highs, h_swing_lows = _detect(htf_df, lookback=htf_lookback)
@@ -97,38 +143,41 @@ def run_backtest(
                                     sorted(h_swing_lows,  key=lambda x: x[0]))
                 if h_trend:
                     h_trend = sorted(h_trend, key=lambda x: x[0])
-                    htf_times  = [t for (t, _v, _lab) in h_trend]
+                    htf_times  = time_keys([t for (t, _v, _lab) in h_trend])
                     htf_labels = [lab for (_t, _v, lab) in h_trend]
-                    htf_ts_all = htf_df["timestamp"].tolist()
-                    idx_map_htf = {t: i for i, t in enumerate(htf_ts_all)}
+                    htf_ts_all = time_keys(htf_df["timestamp"])
+                    pos_all = np.searchsorted(htf_ts_all, htf_times, side="left")
+                    found = (pos_all < len(htf_ts_all)) & (htf_ts_all[np.minimum(pos_all, len(htf_ts_all) - 1)] == htf_times)
+                    htf_point_idx = np.where(found, pos_all, np.arange(len(htf_times)))
         except Exception:
             # HTF verisi alınamazsa filtre devre dışı bırakılır (fail-open)
             use_htf_filter = False
 
-    def _get_htf_bias(cutoff_ts) -> Optional[str]:
+    def _get_htf_bias(cutoff_key: int) -> Optional[str]:
         """
-        cutoff_ts: Entry'den bir bar önceki LTF kapanış zamanı (1h).
-        HTF trend listesinde cutoff_ts'ye en yakın ve ona eşit/önceki trend etiketini döndürür.
+        cutoff_key: Entry'den bir bar önceki LTF kapanış zamanı (1h), time_keys anahtarı.
+        HTF trend listesinde cutoff'a en yakın ve ona eşit/önceki trend etiketini döndürür.
         """
-        if not (use_htf_filter and htf_times):
+        if not (use_htf_filter and len(htf_times)):
             return None
-        # htf_times sıralı → bisect ile cutoff'tan küçük/eşit son trend
-        pos = bisect_right(htf_times, cutoff_ts) - 1
+        # htf_times sıralı → searchsorted ile cutoff'tan küçük/eşit son trend
+        pos = int(np.searchsorted(htf_times, cutoff_key, side="right")) - 1
         if pos < 0:
             return None
         lab = htf_labels[pos]
 
         # tazelik kontrolü (opsiyonel)
         # cutoff'un HTF index'ini bul (HTF serisinde cutoff'tan küçük/eşit son bar)
-        pos_cut = bisect_right(htf_ts_all, cutoff_ts) - 1
+        pos_cut = int(np.searchsorted(htf_ts_all, cutoff_key, side="right")) - 1
         if pos_cut >= 0:
-            if (pos_cut - idx_map_htf.get(htf_times[pos], pos)) > htf_max_bars_since_swing:
+            if (pos_cut - int(htf_point_idx[pos])) > htf_max_bars_since_swing:
                 return None
         return lab
 
     # -------------------------------------------------
     # Ana döngü
     # -------------------------------------------------
+    trades: List[Dict[str, Any]] = []   # çıkışı çözülecek adaylar (sinyal sırasıyla)
     for entry_time_raw, _, direction in unique_signals:
         # entry bar: sinyal mumundan bir sonraki bar
         if entry_time_raw not in ts_to_idx:
@@ -138,17 +187,16 @@ def run_backtest(
             continue
 
         idx_entry = entry_bar_idx + 1
-        entry_row = df.iloc[idx_entry]
-        entry_price = float(entry_row["open"])
-        entry_time = entry_row["timestamp"]
+        entry_price = float(o_arr[idx_entry])
+        entry_time = ts_series.iloc[idx_entry]
+        entry_key = int(ts_keys[idx_entry])
 
-        # analiz için kapanmış barlar (repaint yok): sinyal mumu dahil, entry mumu hariç
-        closed_df = df.iloc[:idx_entry].copy()
-        ltf_cutoff = closed_df["timestamp"].iloc[-1]  # HTF filtresi için referans
+        # analiz için kapanmış barlar (repaint yok): sinyal mumu dahil, entry mumu hariç → [0, idx_entry)
+        ltf_cutoff_key = int(ts_keys[idx_entry - 1])  # HTF filtresi için referans
 
         # --- HTF filtresi (opsiyonel) ---
         if use_htf_filter:
-            htf_bias = _get_htf_bias(ltf_cutoff)
+            htf_bias = _get_htf_bias(ltf_cutoff_key)
             if htf_bias is None:
                 # HTF veri/teyit yok veya çok eski → korumacı: sinyal alma
                 continue
@@ -157,40 +205,32 @@ def run_backtest(
             if direction == "SELL" and htf_bias != "LH":
                 continue
 
-        # ATR hesapla (opsiyonel)
-        atr_val = _atr_from_df(closed_df[["high", "low", "close"]], period=atr_period) if use_atr_buffer else 0.0
-
-        # buffer hesaplayıcı
-        def buffer_abs() -> float:
-            base = entry_price * sl_buffer_pct
-            if use_atr_buffer and atr_val > 0:
-                return base + atr_mult * atr_val
-            return base
+        # ATR (opsiyonel) → buffer
+        atr_val = float(atr_arr[idx_entry - 1]) if use_atr_buffer else 0.0   # == _atr_from_df(closed_df)
+        buf_abs = entry_price * sl_buffer_pct
+        if use_atr_buffer and atr_val > 0:
+            buf_abs = buf_abs + atr_mult * atr_val
 
-        # swing tazeliği için index map
-        idx_map_closed = {t: i for i, t in enumerate(closed_df["timestamp"].tolist())}
-
-        # SL & TP kur (aynı canlı mantığı)
-        raw_tp = None
-        tp_capped = False
-        effective_rr = None
+        # entry_time'a kadar olan son swing (BUY: low, SELL: high) — sıralı listede searchsorted
+        is_buy = (direction == "BUY")
+        s_list, s_keys = (swing_lows, sl_keys) if is_buy else (swing_highs, sh_keys)
+        pos = int(np.searchsorted(s_keys, entry_key, side="right")) - 1
+        if pos < 0:
+            continue
+        swing = float(s_list[pos][1])
 
-        if direction == "BUY":
-            # entry_time'a kadar olan son swing-low
-            swing, swing_t = None, None
-            for t, v in reversed(swing_lows):
-                if t <= entry_time:
-                    swing, swing_t = float(v), t
-                    break
-            if swing is None:
+        # swing tazeliği kontrolü (kapanmış barlar içindeki index'ler; ikisi de orada olmalı)
+        i_entry = _last_index_before(ts_sorted, ts_order, entry_key, idx_entry)
+        if i_entry is not None:
+            i_swing = _last_index_before(ts_sorted, ts_order, int(s_keys[pos]), idx_entry)
+            if i_swing is not None and (i_entry - i_swing) > max_bars_since_swing:
                 continue
 
-            # swing tazeliği kontrolü
-            if (entry_time in idx_map_closed) and (swing_t in idx_map_closed):
-                if (idx_map_closed[entry_time] - idx_map_closed[swing_t]) > max_bars_since_swing:
-                    continue
-
-            sl = float(swing - buffer_abs())
+        # SL & TP kur (aynı canlı mantığı)
+        if is_buy:
+            sl = float(swing - buf_abs)
+            if tick:
+                sl = floor_to_tick(sl, tick)
             risk = entry_price - sl
             if risk <= 0:
                 continue
@@ -200,24 +240,15 @@ def run_backtest(
             raw_tp = entry_price + rr_ratio * risk
             tp_cap = entry_price * (1.0 + max_tp_percent)
             tp = float(min(raw_tp, tp_cap))
+            if tick:
+                tp = ceil_to_tick(tp, tick)
             tp_capped = (tp != raw_tp)
             effective_rr = (tp - entry_price) / risk
 
         else:  # SELL
-            # entry_time'a kadar olan son swing-high
-            swing, swing_t = None, None
-            for t, v in reversed(swing_highs):
-                if t <= entry_time:
-                    swing, swing_t = float(v), t
-                    break
-            if swing is None:
-                continue
-
-            if (entry_time in idx_map_closed) and (swing_t in idx_map_closed):
-                if (idx_map_closed[entry_time] - idx_map_closed[swing_t]) > max_bars_since_swing:
-                    continue
-
-            sl = float(swing + buffer_abs())
+            sl = float(swing + buf_abs)
+            if tick:
+                sl = ceil_to_tick(sl, tick)
             risk = sl - entry_price
             if risk <= 0:
                 continue
@@ -227,67 +258,47 @@ def run_backtest(
             raw_tp = entry_price - rr_ratio * risk
             tp_floor = entry_price * (1.0 - max_tp_percent)
             tp = float(max(raw_tp, tp_floor))
+            if tick:
+                tp = floor_to_tick(tp, tick)
             tp_capped = (tp != raw_tp)
             effective_rr = (entry_price - tp) / risk
 
-        # future barlar (NOT: backtest t0 bar içini atlar)
-        future_df = df.iloc[idx_entry + 1 : idx_entry + 1 + max_future_bars].copy()
-        if future_df.empty:
-            continue
+        trades.append({
+            "idx_entry": idx_entry,
+            "entry_time": entry_time,
+            "direction": direction,
+            "entry_price": entry_price,
+            "sl": sl,
+            "tp": tp,
+            "tp_capped": tp_capped,
+            "effective_rr": effective_rr,
+        })
 
-        result = "NONE"
-        exit_price = None
-        exit_reason = ""
-        bars_held = 0
-
-        for i, (_, row) in enumerate(future_df.iterrows(), start=1):
-            row_open = float(row["open"])
-            row_high = float(row["high"])
-            row_low  = float(row["low"])
-            bars_held = i
-
-            # 1) Açılışta gap kontrolü
-            if direction == "BUY":
-                if row_open >= tp:
-                    result, exit_price, exit_reason = "WIN", tp, "OPEN_GAP_TP"; break
-                if row_open <= sl:
-                    result, exit_price, exit_reason = "LOSS", sl, "OPEN_GAP_SL"; break
-            else:  # SELL
-                if row_open <= tp:
-                    result, exit_price, exit_reason = "WIN", tp, "OPEN_GAP_TP"; break
-                if row_open >= sl:
-                    result, exit_price, exit_reason = "LOSS", sl, "OPEN_GAP_SL"; break
-
-            # 2) Bar içinde SL/TP
-            if direction == "BUY":
-                hit_sl = (row_low <= sl)
-                hit_tp = (row_high >= tp)
-            else:
-                hit_sl = (row_high >= sl)
-                hit_tp = (row_low  <= tp)
-
-            if hit_sl and hit_tp:
-                if conservative_double_hit:
-                    result, exit_price, exit_reason = "LOSS", sl, "SL_HIT"
-                else:
-                    result, exit_price, exit_reason = "WIN", tp, "TP_HIT"
-                break
-            elif hit_sl:
-                result, exit_price, exit_reason = "LOSS", sl, "SL_HIT"; break
-            elif hit_tp:
-                result, exit_price, exit_reason = "WIN", tp, "TP_HIT"; break
-
-            # 3) Timeout (opsiyonel)
-            if timeout_close is not None and bars_held >= timeout_close:
-                exit_price = float(row["close"])
-                exit_reason = "TIMEOUT"
-                break
-
-        # 4) max_future_bars sınırı: kapanmadıysa bar kapanışından çıkar
-        if result == "NONE":
-            last_row = future_df.iloc[-1]
-            exit_price = float(last_row["close"])
-            exit_reason = "MAX_BARS"
+    # -------------------------------------------------
+    # Çıkışlar: tüm adaylar tek vektörel geçişte
+    # (future barlar entry+1'den başlar → backtest t0 bar içini atlar)
+    # -------------------------------------------------
+    ex = resolve_exits(
+        [t["idx_entry"] for t in trades],
+        [t["direction"] == "BUY" for t in trades],
+        [t["sl"] for t in trades],
+        [t["tp"] for t in trades],
+        o_arr, h_arr, l_arr, c_arr,
+        max_future_bars=max_future_bars,
+        conservative_double_hit=conservative_double_hit,
+        timeout_close=timeout_close,
+        mode="backtest",
+    )
+
+    for k, t in enumerate(trades):
+        if not ex["closed"][k]:
+            continue   # future bar yok
+        direction, entry_price, sl, tp = t["direction"], t["entry_price"], t["sl"], t["tp"]
+        exit_price = float(ex["exit_price"][k])
+        exit_reason = REASONS[int(ex["reason"][k])]
+        bars_held = int(ex["bars_held"][k])
+        # max_future_bars sınırı (ve timeout): kapanmadıysa pencerenin son kapanışından çıkılmış sayılır
+        result = "NONE" if int(ex["reason"][k]) == R_MAX_BARS else ("WIN" if ex["result"][k] > 0 else "LOSS")
 
         # PnL / R / fee
         if direction == "BUY":
@@ -305,13 +316,13 @@ def run_backtest(
             result = "WIN" if pnl_percent > 0 else "LOSS"
 
         results.append({
-            "entry_time": entry_time,
+            "entry_time": t["entry_time"],
             "direction": direction,
             "entry_price": float(entry_price),
             "sl": float(sl),
             "tp": float(tp),
-            "tp_capped": bool(tp_capped),
-            "effective_rr": float(effective_rr) if effective_rr is not None else None,
+            "tp_capped": bool(t["tp_capped"]),
+            "effective_rr": float(t["effective_rr"]) if t["effective_rr"] is not None else None,
             "exit_price": float(exit_price),
             "exit_reason": exit_reason,
             "bars_held": bars_held,
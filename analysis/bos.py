@@ -1,17 +1,31 @@
 # analysis/bos.py
 
 from typing import List, Tuple, Dict, Any
+import numpy as np
 import pandas as pd
 
+from analysis._arrays import time_keys
+
 # Tip: sinyal formatı (timestamp, value, "BUY"/"SELL")
 Signal = Tuple[pd.Timestamp, float, str]
 
-def _last_prior_swing(swing_list: List[Tuple[pd.Timestamp, float]], ts: pd.Timestamp):
-    """ ts'ten ÖNCEKİ son swing değerini döndür (yoksa None). """
-    for t, v in reversed(swing_list):
-        if t < ts:
-            return v
-    return None
+def _last_prior_swing_levels(swing_list: List[Tuple[pd.Timestamp, float]], bar_keys: np.ndarray):
+    """
+    Her bar için bar'dan ÖNCEKİ son swing (tek seferde, searchsorted):
+    listede (liste sırasına göre) en son gelen, zamanı bar'dan KESİN küçük swing.
+    Dönen: (değerler, var_mı) — var_mı=False olan barlarda değer anlamsız.
+    """
+    n = len(bar_keys)
+    if not swing_list:
+        return np.zeros(n), np.zeros(n, dtype=bool)
+    keys = time_keys([t for t, _v in swing_list])
+    vals = np.asarray([v for _t, v in swing_list])
+    order = np.argsort(keys, kind="stable")
+    # zamanca ilk k swing içindeki en büyük liste index'i (sıralı listede = k-1)
+    last_pos = np.maximum.accumulate(order)
+    k = np.searchsorted(keys[order], bar_keys, side="left")   # t < ts olan swing sayısı
+    has = k > 0
+    return vals[last_pos[np.maximum(k - 1, 0)]], has
 
 def detect_bos_events(
     df: pd.DataFrame,
@@ -23,43 +37,40 @@ def detect_bos_events(
     BoS (Break of Structure) olaylarını bul.
     - Bullish BoS: close > last_swing_high * (1 + buffer) ve önceki close <= eşik
     - Bearish BoS: close < last_swing_low  * (1 - buffer) ve önceki close >= eşik
+    "Bar i itibarıyla son swing" dizileri bir kez (searchsorted) hesaplanır, kırılımlar vektörel bulunur.
     """
     events: List[Dict[str, Any]] = []
     if len(df) < 2:
         return events
 
-    for i in range(1, len(df)):
-        ts = df["timestamp"].iloc[i]
-        close_now = float(df["close"].iloc[i])
-        close_prev = float(df["close"].iloc[i-1])
-
-        # Önceki close'a göre "cross" kontrolü yapalım ki aynı bölgeyi defalarca saymayalım.
-        last_high = _last_prior_swing(swing_highs, ts)
-        last_low  = _last_prior_swing(swing_lows,  ts)
-
-        # Bullish BoS
-        if last_high is not None:
-            thr_up = last_high * (1.0 + breach_buffer_pct)
-            if close_prev <= thr_up and close_now > thr_up:
-                events.append({
-                    "time": ts,
-                    "direction": "BUY",
-                    "broken_level": float(last_high),
-                    "close": close_now,
-                    "index": i
-                })
-
-        # Bearish BoS
-        if last_low is not None:
-            thr_dn = last_low * (1.0 - breach_buffer_pct)
-            if close_prev >= thr_dn and close_now < thr_dn:
-                events.append({
-                    "time": ts,
-                    "direction": "SELL",
-                    "broken_level": float(last_low),
-                    "close": close_now,
-                    "index": i
-                })
+    bar_keys = time_keys(df["timestamp"])[1:]
+    close = df["close"].to_numpy(dtype=np.float64)
+    close_now, close_prev = close[1:], close[:-1]
+
+    # Önceki close'a göre "cross" kontrolü yapalım ki aynı bölgeyi defalarca saymayalım.
+    last_high, has_high = _last_prior_swing_levels(swing_highs, bar_keys)
+    last_low,  has_low  = _last_prior_swing_levels(swing_lows,  bar_keys)
+
+    # Bullish / Bearish BoS
+    thr_up = last_high * (1.0 + breach_buffer_pct)
+    thr_dn = last_low * (1.0 - breach_buffer_pct)
+    up = has_high & (close_prev <= thr_up) & (close_now > thr_up)
+    dn = has_low & (close_prev >= thr_dn) & (close_now < thr_dn)
+
+    # aynı barda önce BUY, sonra SELL (eski döngü sırası)
+    rows = np.concatenate([np.flatnonzero(up), np.flatnonzero(dn)])
+    is_sell = np.concatenate([np.zeros(up.sum(), dtype=bool), np.ones(dn.sum(), dtype=bool)])
+    order = np.lexsort((is_sell, rows))
+    times = df["timestamp"].iloc[rows[order] + 1].tolist()
+    for r, sell, ts in zip(rows[order].tolist(), is_sell[order].tolist(), times):
+        level = last_low[r] if sell else last_high[r]
+        events.append({
+            "time": ts,
+            "direction": "SELL" if sell else "BUY",
+            "broken_level": float(level),
+            "close": float(close_now[r]),
+            "index": r + 1
+        })
 
     return events
 
@@ -86,39 +97,36 @@ def build_bos_retest_signals(
 
     bos_events = detect_bos_events(df, swing_highs, swing_lows, breach_buffer_pct=breach_buffer_pct)
 
-    for ev in bos_events:
-        idx_bos = ev["index"]
-        direction = ev["direction"]
-        level = ev["broken_level"]
-
-        # İleriye dönük retest aralığı
-        start = idx_bos + 1
-        end   = min(len(df), idx_bos + 1 + retest_window_bars)
-
-        found = False
-        for j in range(start, end):
-            row = df.iloc[j]
-            ts  = row["timestamp"]
-            o, h, l, c = float(row["open"]), float(row["high"]), float(row["low"]), float(row["close"])
-
-            if direction == "BUY":
-                # Kırılan high, artık destek: oraya retest + tekrar üstünde kapanış
-                zone_up = level * (1.0 + retest_zone_pct)
-                if l <= zone_up and c >= level:
-                    signals.append((ts, c, "BUY"))
-                    found = True
-                    break
-            else:
-                # Kırılan low, artık direnç: oraya retest + tekrar altında kapanış
-                zone_dn = level * (1.0 - retest_zone_pct)
-                if h >= zone_dn and c <= level:
-                    signals.append((ts, c, "SELL"))
-                    found = True
-                    break
-
-        # Retest bulunmazsa sinyal yok (BoS tek başına yetmez)
-        if not found:
-            continue
+    if not bos_events or retest_window_bars <= 0:
+        return signals
+
+    n = len(df)
+    high  = df["high"].to_numpy(dtype=np.float64)
+    low   = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+
+    idx_bos = np.array([ev["index"] for ev in bos_events], dtype=np.int64)
+    is_buy  = np.array([ev["direction"] == "BUY" for ev in bos_events])
+    level   = np.array([ev["broken_level"] for ev in bos_events], dtype=np.float64)
+
+    # İleriye dönük retest aralığı: her BoS için [idx_bos+1, idx_bos+retest_window_bars] (events × pencere)
+    j = idx_bos[:, None] + 1 + np.arange(retest_window_bars)[None, :]
+    valid = j < n
+    jc = np.minimum(j, n - 1)
+    lv = level[:, None]
+    # Bullish: kırılan high artık destek → oraya retest + tekrar üstünde kapanış
+    buy_hit = (low[jc] <= lv * (1.0 + retest_zone_pct)) & (close[jc] >= lv)
+    # Bearish: kırılan low artık direnç → oraya retest + tekrar altında kapanış
+    sell_hit = (high[jc] >= lv * (1.0 - retest_zone_pct)) & (close[jc] <= lv)
+    hit = np.where(is_buy[:, None], buy_hit, sell_hit) & valid
+
+    # Retest bulunmazsa sinyal yok (BoS tek başına yetmez); bulunursa ilk retest barı
+    found = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+    sig_rows = j[np.arange(len(j)), first][found]
+    sig_times = df["timestamp"].iloc[sig_rows].tolist()
+    for ts, c, buy in zip(sig_times, close[sig_rows].tolist(), is_buy[found].tolist()):
+        signals.append((ts, c, "BUY" if buy else "SELL"))
 
     # Aynı timestamp üzerine birden fazla sinyal gelirse ilkini koru
     uniq, seen = [], set()
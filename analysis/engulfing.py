@@ -1,20 +1,33 @@
+import numpy as np
+
+
 # Basit engulfing tespiti: gövde bazlı
 # Çıktı: [(timestamp, close_price, "bullish"/"bearish"), ...]
-def detect_engulfings(df):
-    engulfings = []
-    for i in range(1, len(df)):
-        o1, c1 = df["open"].iloc[i - 1], df["close"].iloc[i - 1]
-        o2, c2 = df["open"].iloc[i],     df["close"].iloc[i]
-        t2     = df["timestamp"].iloc[i]
+def engulfing_masks(open_, close):
+    """(bullish, bearish) boolean dizileri; index i, (i-1, i) mum çiftinin ikinci mumudur (mask[0]=False)."""
+    o = np.asarray(open_, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    bull = np.zeros(len(o), dtype=bool)
+    bear = np.zeros(len(o), dtype=bool)
+    if len(o) < 2:
+        return bull, bear
+    o1, c1, o2, c2 = o[:-1], c[:-1], o[1:], c[1:]
 
-        # Bullish: önceki kırmızı (c1<o1), sonraki yeşil (c2>o2) ve
-        # ikinci mum gövdesi, ilk gövdeyi tam sarıyor
-        if c1 < o1 and c2 > o2 and o2 <= c1 and c2 >= o1:
-            engulfings.append((t2, float(c2), "bullish"))
+    # Bullish: önceki kırmızı (c1<o1), sonraki yeşil (c2>o2) ve
+    # ikinci mum gövdesi, ilk gövdeyi tam sarıyor
+    bull[1:] = (c1 < o1) & (c2 > o2) & (o2 <= c1) & (c2 >= o1)
 
-        # Bearish: önceki yeşil (c1>o1), sonraki kırmızı (c2<o2) ve
-        # ikinci mum gövdesi, ilk gövdeyi tam sarıyor
-        if c1 > o1 and c2 < o2 and o2 >= c1 and c2 <= o1:
-            engulfings.append((t2, float(c2), "bearish"))
+    # Bearish: önceki yeşil (c1>o1), sonraki kırmızı (c2<o2) ve
+    # ikinci mum gövdesi, ilk gövdeyi tam sarıyor
+    bear[1:] = (c1 > o1) & (c2 < o2) & (o2 >= c1) & (c2 <= o1)
+    return bull, bear
 
-    return engulfings
+
+def detect_engulfings(df):
+    bull, bear = engulfing_masks(df["open"].to_numpy(), df["close"].to_numpy())
+    # bir mum aynı anda bullish ve bearish olamaz → index sırası = eski döngünün sırası
+    idx = np.flatnonzero(bull | bear)
+    times = df["timestamp"].iloc[idx].tolist()
+    closes = df["close"].to_numpy()[idx].astype(float).tolist()
+    kinds = np.where(bull[idx], "bullish", "bearish").tolist()
+    return list(zip(times, closes, kinds))
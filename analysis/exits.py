@@ -0,0 +1,204 @@
+# analysis/exits.py
+# Tüm işlemlerin çıkışını tek seferde (vektörel) çözen çekirdek.
+# Girdi: entry index / yön / SL / TP vektörleri + OHLC dizileri.
+# (n_trades × pencere) open/high/low/close matrisleri sliding_window_view ile kurulur,
+# her satırdaki ilk olay argmax ile bulunur — işlem başına Python döngüsü yok.
+#
+# mode="backtest" → analysis.backtest.run_backtest ile birebir:
+#   - pencere: entry'den SONRAKİ barlar (t0 = entry barının içi atlanır), en fazla max_future_bars
+#   - her barda sıra: açılış gap'i (TP, sonra SL) → bar içi SL/TP (double-hit) → timeout
+#   - olay yoksa MAX_BARS: pencerenin son kapanışı; timeout da (önceki davranış) MAX_BARS'a düşer
+# mode="live" → paper_trader.evaluator.evaluate_open_trade'in bar bar uygulanmasıyla birebir:
+#   - k. değerlendirme = entry+k barının açılışı: önce bu açılışta gap, sonra (k≥2) entry+k-1 barının içi
+#   - k=1'de bar içi kontrol yok (t0 atlanır), timeout/MAX_BARS k≥2'de, kapanış entry+k-1 close'u
+#   - henüz gelmemiş barlar → işlem açık kalır (closed=False)
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+REASONS = ["", "OPEN_GAP_TP", "OPEN_GAP_SL", "SL_HIT", "TP_HIT", "TIMEOUT", "MAX_BARS"]
+R_NONE, R_GAP_TP, R_GAP_SL, R_SL, R_TP, R_TIMEOUT, R_MAX_BARS = range(len(REASONS))
+
+CHUNK_ROWS = 1 << 16   # bellek: satır × pencere × 4 matris parça parça
+
+
+def _windows(x: np.ndarray, width: int, start_idx: np.ndarray) -> np.ndarray:
+    """x[start : start+width] satırları (dizi sonu NaN ile doldurulur → karşılaştırmalar False)."""
+    padded = np.concatenate([x, np.full(width, np.nan)])
+    return sliding_window_view(padded, width)[start_idx]
+
+
+def _first_event(ev: np.ndarray):
+    has = ev.any(axis=1)
+    return has, np.where(has, ev.argmax(axis=1), ev.shape[1])
+
+
+def _resolve_backtest(e, buy, sl, tp, O, H, L, C, n, M, conservative_double_hit, timeout_close):
+    rows = np.arange(len(e))
+    m = np.clip(n - 1 - e, 0, M)                                  # geçerli pencere uzunluğu
+    col = np.arange(M)[None, :]
+    valid = col < m[:, None]
+    b = buy[:, None]
+    slc, tpc = sl[:, None], tp[:, None]
+    with np.errstate(invalid="ignore"):
+        gap_tp = np.where(b, O >= tpc, O <= tpc) & valid
+        gap_sl = np.where(b, O <= slc, O >= slc) & valid
+        hit_sl = np.where(b, L <= slc, H >= slc) & valid
+        hit_tp = np.where(b, H >= tpc, L <= tpc) & valid
+    has, first = _first_event(gap_tp | gap_sl | hit_sl | hit_tp)
+
+    fc = np.minimum(first, M - 1)
+    g_tp, g_sl = gap_tp[rows, fc], gap_sl[rows, fc]
+    h_sl, h_tp = hit_sl[rows, fc], hit_tp[rows, fc]
+    double = h_sl & h_tp
+    take_sl = h_sl & (~double | conservative_double_hit)
+    reason = np.select(
+        [g_tp, g_sl, take_sl, h_tp | h_sl],
+        [R_GAP_TP, R_GAP_SL, R_SL, R_TP],
+        R_NONE,
+    )
+    win = g_tp | (~g_sl & ~take_sl & (h_tp | h_sl))
+
+    bars_held = np.where(has, first + 1, m)
+    if timeout_close is not None:
+        t_col = max(int(timeout_close), 1) - 1
+        timed_out = (t_col < m) & (~has | (first > t_col))
+        bars_held = np.where(timed_out, t_col + 1, bars_held)
+        has = has & ~timed_out
+
+    last_close = C[rows, np.maximum(m - 1, 0)]
+    exit_price = np.where(has, np.where(win, tp, sl), last_close)
+    reason = np.where(has, reason, R_MAX_BARS)
+    result = np.where(has, np.where(win, 1, -1), 0)
+    exit_idx = np.where(has, e + 1 + first, e + m)
+    closed = m > 0
+    return {"closed": closed, "exit_idx": exit_idx, "exit_price": exit_price, "reason": reason,
+            "result": result, "bars_held": bars_held}
+
+
+def _resolve_live(e, buy, sl, tp, O, H, L, C, n, M, conservative_double_hit, timeout_close):
+    # pencere kolonları: c → bar entry+1+c; adım k (1..K): açılış kolonu k-1, bar içi kolonu k-2
+    rows = np.arange(len(e))
+    K = O.shape[1]
+    t_eff = max(int(timeout_close), 1) if timeout_close is not None else None
+    end_k = max(2, min(t_eff, M) if t_eff is not None else M)
+    end_reason = R_TIMEOUT if (t_eff is not None and end_k >= t_eff) else R_MAX_BARS
+    avail = np.clip(n - 1 - e, 0, K)                              # gerçekleşmiş değerlendirme sayısı
+
+    step = np.arange(1, K + 1)[None, :]
+    live_step = (step <= avail[:, None]) & (step <= end_k)
+    b = buy[:, None]
+    slc, tpc = sl[:, None], tp[:, None]
+    with np.errstate(invalid="ignore"):
+        gap_tp = np.where(b, O >= tpc, O <= tpc) & live_step
+        gap_sl = np.where(b, O <= slc, O >= slc) & live_step
+        # adım k'daki bar içi kontrol = kolon k-2 (k=1'de yok)
+        Hs = np.concatenate([np.full((len(e), 1), np.nan), H[:, :-1]], axis=1)
+        Ls = np.concatenate([np.full((len(e), 1), np.nan), L[:, :-1]], axis=1)
+        hit_sl = np.where(b, Ls <= slc, Hs >= slc) & live_step
+        hit_tp = np.where(b, Hs >= tpc, Ls <= tpc) & live_step
+    has, first = _first_event(gap_tp | gap_sl | hit_sl | hit_tp)
+
+    fc = np.minimum(first, K - 1)
+    g_tp, g_sl = gap_tp[rows, fc], gap_sl[rows, fc]
+    h_sl, h_tp = hit_sl[rows, fc], hit_tp[rows, fc]
+    is_gap = g_tp | g_sl
+    double = h_sl & h_tp
+    take_sl = h_sl & (~double | conservative_double_hit)
+    reason = np.select([g_tp, g_sl, take_sl, h_tp | h_sl], [R_GAP_TP, R_GAP_SL, R_SL, R_TP], R_NONE)
+    win = g_tp | (~is_gap & ~take_sl & (h_tp | h_sl))
+    k_first = first + 1
+
+    ended = ~has & (avail >= end_k)
+    end_close = C[rows, end_k - 2]                                # bar entry+end_k-1
+    closed = has | ended
+    exit_price = np.where(has, np.where(win, tp, sl), np.where(ended, end_close, np.nan))
+    reason = np.where(has, reason, np.where(ended, end_reason, R_NONE))
+    result = np.where(has, np.where(win, 1, -1), 0)
+    exit_idx = np.where(has, np.where(is_gap, e + k_first, e + k_first - 1),
+                        np.where(ended, e + end_k - 1, -1))
+    # kapanışta kayıtlı bars_held: ilk değerlendirme 1 yapar, sonraki her olaysız adım +1
+    bars_held = np.where(has, np.where(k_first >= 2, k_first - 1, 0),
+                         np.where(ended, end_k, np.minimum(avail, end_k)))
+    return {"closed": closed, "exit_idx": exit_idx, "exit_price": exit_price, "reason": reason,
+            "result": result, "bars_held": bars_held}
+
+
+def resolve_exits(
+    entry_idx,
+    is_buy,
+    sl,
+    tp,
+    open_,
+    high,
+    low,
+    close,
+    max_future_bars: int = 20,
+    conservative_double_hit: bool = True,
+    timeout_close: Optional[int] = None,
+    mode: str = "backtest",
+) -> Dict[str, np.ndarray]:
+    """
+    Dönen diziler (işlem başına):
+      closed     : çıkış belirlendi mi (backtest: pencere boş değil; live: bar verisi yetti)
+      exit_idx   : çıkış zamanının bar index'i (gap → açılan bar, bar içi/timeout → o bar)
+      exit_price : TP / SL / kapanış (açık işlemde NaN)
+      reason     : REASONS index'i (REASONS[reason] → "SL_HIT" vb.)
+      result     : 1 WIN, -1 LOSS, 0 belirsiz (MAX_BARS/TIMEOUT → PnL işaretine göre)
+      bars_held  : kapanıştaki bar sayacı (run_backtest / evaluator ile aynı)
+    """
+    if mode not in ("backtest", "live"):
+        raise ValueError(f"Bilinmeyen mode: {mode}")
+    e = np.asarray(entry_idx, dtype=np.int64)
+    buy = np.asarray(is_buy, dtype=bool)
+    slv = np.asarray(sl, dtype=np.float64)
+    tpv = np.asarray(tp, dtype=np.float64)
+    o = np.asarray(open_, dtype=np.float64)
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    n = len(o)
+    M = max(int(max_future_bars), 0)
+
+    T = len(e)
+    if mode == "backtest":
+        width, fn = max(M, 1), _resolve_backtest
+    else:
+        t_eff = max(int(timeout_close), 1) if timeout_close is not None else None
+        width, fn = max(2, min(t_eff, M) if t_eff is not None else M), _resolve_live
+
+    out = {
+        "closed": np.zeros(T, dtype=bool),
+        "exit_idx": np.full(T, -1, dtype=np.int64),
+        "exit_price": np.full(T, np.nan),
+        "reason": np.zeros(T, dtype=np.int64),
+        "result": np.zeros(T, dtype=np.int64),
+        "bars_held": np.zeros(T, dtype=np.int64),
+    }
+    if T == 0 or (mode == "backtest" and M == 0):
+        return out
+
+    for a in range(0, T, CHUNK_ROWS):
+        sl_ = slice(a, min(T, a + CHUNK_ROWS))
+        start = e[sl_] + 1
+        W = [_windows(x, width, start) for x in (o, h, l, c)]
+        res = fn(e[sl_], buy[sl_], slv[sl_], tpv[sl_], *W, n, M,
+                 conservative_double_hit, timeout_close)
+        for k, v in res.items():
+            out[k][sl_] = v
+    return out
+
+
+def exit_pnl(is_buy, entry_price, sl, exit_price, fee_roundtrip: float = 0.0):
+    """(pnl_percent, r_multiple) — run_backtest / evaluator formülleriyle aynı (vektörel)."""
+    buy = np.asarray(is_buy, dtype=bool)
+    entry = np.asarray(entry_price, dtype=np.float64)
+    slv = np.asarray(sl, dtype=np.float64)
+    ex = np.asarray(exit_price, dtype=np.float64)
+    move = np.where(buy, ex - entry, entry - ex)
+    denom = np.where(buy, entry - slv, slv - entry)
+    pnl_percent = move / entry * 100.0 - fee_roundtrip * 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_multiple = np.where(denom != 0, move / np.where(denom != 0, denom, 1.0), 0.0)
+    return pnl_percent, r_multiple
@@ -0,0 +1,125 @@
+# analysis/indicators.py
+# Seri başına bir kez hesaplanan (vektörel) göstergeler + bar eklendikçe artımlı güncelleme.
+# atr_series(...)[k] == backtest._atr_from_df(df.iloc[:k+1]) (aynı tanım: TR'nin basit hareketli ortalaması,
+# ilk `period`-1 barda o ana kadarki TR ortalaması).
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """TR[0] = high-low; TR[i] = max(high-low, |high-prev_close|, |low-prev_close|)."""
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    tr = h - l
+    if len(c) > 1:
+        pc = c[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(h[1:] - pc), np.abs(l[1:] - pc)))
+    return tr
+
+
+def rolling_mean(values, period: int) -> np.ndarray:
+    """Basit hareketli ortalama; ilk `period`-1 değerde o ana kadarki ortalama."""
+    v = np.asarray(values, dtype=np.float64)
+    out = pd.Series(v).rolling(period).mean().to_numpy().copy()
+    head = min(period - 1, len(v))
+    for k in range(head):
+        out[k] = float(np.mean(v[: k + 1]))
+    return out
+
+
+def atr_series(high, low, close, period: int = 14) -> np.ndarray:
+    return rolling_mean(true_range(high, low, close), period)
+
+
+class IndicatorCache:
+    """
+    Bir (symbol, interval) serisi için gösterge dizileri:
+      cache = IndicatorCache.from_frame(df)
+      cache.atr(14)[i]           # O(1) bar index erişimi
+      cache.append(h, l, c)      # yeni kapanan bar → hesaplanmış göstergeler O(period) ile uzar
+    Diziler kapasitesi ikiye katlanan tamponlarda tutulur (append amortize O(1), kopya yok).
+    """
+
+    def __init__(self, high=(), low=(), close=()):
+        self._n = len(close)
+        self._cols = {
+            "high": np.array(high, dtype=np.float64),
+            "low": np.array(low, dtype=np.float64),
+            "close": np.array(close, dtype=np.float64),
+        }
+        self._cache: Dict[Tuple[str, int], np.ndarray] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "IndicatorCache":
+        return cls(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy())
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._cols["high"][: self._n]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._cols["low"][: self._n]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._cols["close"][: self._n]
+
+    # -------------------------------------------------
+    # Göstergeler
+    # -------------------------------------------------
+    def _get(self, key: Tuple[str, int], build) -> np.ndarray:
+        if key not in self._cache:
+            arr = build()
+            buf = np.empty(max(len(self._cols["close"]), len(arr)), dtype=np.float64)
+            buf[: len(arr)] = arr
+            self._cache[key] = buf
+        return self._cache[key][: self._n]
+
+    def tr(self) -> np.ndarray:
+        return self._get(("tr", 0), lambda: true_range(self.high, self.low, self.close))
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self._get(("atr", int(period)), lambda: rolling_mean(self.tr(), period))
+
+    def sma(self, period: int) -> np.ndarray:
+        return self._get(("sma", int(period)), lambda: rolling_mean(self.close, period))
+
+    def atr_at(self, idx: int, period: int = 14) -> float:
+        return float(self.atr(period)[idx])
+
+    # -------------------------------------------------
+    # Artımlı güncelleme
+    # -------------------------------------------------
+    def _grow(self) -> None:
+        cap = max(16, 2 * len(self._cols["close"]))
+        for d in (self._cols, self._cache):
+            for k, arr in d.items():
+                buf = np.empty(cap, dtype=np.float64)
+                buf[: self._n] = arr[: self._n]
+                d[k] = buf
+
+    def append(self, high: float, low: float, close: float) -> None:
+        """Bir bar ekle; hesaplanmış göstergeler yalnızca son değerleriyle uzatılır (tam yeniden hesap yok)."""
+        h, l, c = float(high), float(low), float(close)
+        n = self._n
+        prev_close = self._cols["close"][n - 1] if n else None
+        if n >= len(self._cols["close"]):
+            self._grow()
+        self._cols["high"][n], self._cols["low"][n], self._cols["close"][n] = h, l, c
+        self._n = n + 1
+
+        tr_buf = self._cache.get(("tr", 0))
+        if tr_buf is not None:
+            tr_buf[n] = h - l if prev_close is None else max(h - l, abs(h - prev_close), abs(l - prev_close))
+        for (name, period), buf in self._cache.items():
+            if name == "tr":
+                continue
+            src = tr_buf if name == "atr" else self._cols["close"]
+            buf[n] = float(np.mean(src[max(0, n + 1 - period): n + 1]))
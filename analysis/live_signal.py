@@ -1,8 +1,13 @@
 # analysis/live_signal.py
-from typing import Optional, Dict, Any, Tuple
+import time
+from typing import Optional, Dict, Any, Tuple, List
 import pandas as pd
 
-from services.binance_service import get_klines
+from services import kline_store
+from services.binance_service import KLINE_SETTLE_SEC, KLINE_STORE_ENABLED, get_klines
+from services.intervals import interval_to_ms
+from analysis.resample import resample_ohlc, resample_ratio
+from analysis.swing_stream import SwingTrendDetector
 from analysis.swing_points import detect_swing_points
 from analysis.trend_structure import classify_trend_structure
 
@@ -15,6 +20,70 @@ def _find_last_swing_before(time_ref, arr: list) -> Tuple[Optional[float], Optio
     return None, None
 
 
+MAX_RESAMPLE_LTF_BARS = 10000
+
+
+def _htf_limit(limit: int) -> int:
+    return max(200, min(limit, 1000))
+
+
+def _resample_ratio(interval: str, htf_interval: str) -> Optional[int]:
+    try:
+        return resample_ratio(interval_to_ms(interval), htf_interval)
+    except ValueError:
+        return None
+
+
+def _ltf_limit(limit: int, interval: str, htf_interval: str) -> int:
+    """HTF, LTF'ten üretilecekse: _htf_limit kadar HTF bar çıkacak kadar LTF (+ baştaki yarım kova)."""
+    ratio = _resample_ratio(interval, htf_interval)
+    if not ratio:
+        return limit
+    return max(limit, min((_htf_limit(limit) + 1) * ratio + 1, MAX_RESAMPLE_LTF_BARS))
+
+
+def _resample_htf(symbol: str, interval: str, limit: int, use_htf_filter: bool,
+                  htf_interval: str, htf_source: str) -> bool:
+    """
+    HTF yerelde (LTF'ten) üretilsin mi?
+    Yalnızca gereken LTF geçmişi zaten depodaysa: son `limit` barın ötesindeki kısım depoda eksiksizse
+    ek çekim olmaz (kuyruk her iki yolda da çekilir). Değilse (örn. 15m → 4h için ~3200 bar, birkaç sayfa)
+    HTF'i doğrudan çekmek daha ucuzdur.
+    """
+    if not (use_htf_filter and htf_source == "resample" and KLINE_STORE_ENABLED):
+        return False
+    if not _resample_ratio(interval, htf_interval):
+        return False
+    n = _ltf_limit(limit, interval, htf_interval)
+    iv = interval_to_ms(interval)
+    last_open = (int(time.time() * 1000) // iv) * iv
+    return not kline_store.missing_runs(symbol, interval, last_open - (n - 1) * iv, last_open - (limit - 1) * iv)
+
+
+def live_signal_requests(
+    symbol: str,
+    interval: str = "1h",
+    limit: int = 500,
+    use_htf_filter: bool = True,
+    htf_interval: str = "4h",
+    htf_source: str = "resample",
+) -> List[Tuple[str, str, int]]:
+    """get_live_signal'ın ihtiyaç duyduğu kline çekimleri → get_klines_many ile önceden toplu çekmek için."""
+    if _resample_htf(symbol, interval, limit, use_htf_filter, htf_interval, htf_source):
+        return [(symbol, interval, _ltf_limit(limit, interval, htf_interval))]
+    reqs = [(symbol, interval, limit)]
+    if use_htf_filter:
+        reqs.append((symbol, htf_interval, _htf_limit(limit)))
+    return reqs
+
+
+def signal_frames(reqs: List[Tuple[str, str, int]], frames: Dict) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """live_signal_requests + get_klines_many sonucu → (df, htf_df); HTF ayrıca çekilmediyse htf_df=None."""
+    df = frames.get(reqs[0])
+    htf_df = frames.get(reqs[1]) if len(reqs) > 1 else None
+    return df, htf_df
+
+
 def get_live_signal(
     symbol: str = "BTCUSDT",
     interval: str = "1h",
@@ -37,6 +106,13 @@ def get_live_signal(
     htf_interval: str = "4h",
     htf_lookback: int = 3,
     htf_max_bars_since_swing: int = 300,  # HTF swing tazelik limiti (bar)
+    htf_source: str = "resample",         # "resample": HTF, LTF barlarından üretilir | "fetch": ayrı çekim
+
+    # Önceden çekilmiş veri (get_klines_many) → verilirse ağa gidilmez
+    df: Optional[pd.DataFrame] = None,
+    htf_df: Optional[pd.DataFrame] = None,
+    # (symbol, interval) başına kalıcı detektör → her çağrıda yalnızca yeni (kesinleşmiş) barlar işlenir
+    detector: Optional[SwingTrendDetector] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Repaint yok:
@@ -49,6 +125,7 @@ def get_live_signal(
       - swing tazeliği kontrolü: HL/LH teyidine kadar olan SON uygun swing
       - (opsiyonel) min_tp_percent / min_risk_pct / tick quantize
       - (opsiyonel) HTF trend filtresi: 1h sinyal 4h yönüyle uyumlu değilse sinyal verme
+        (htf_df verilmezse ve 1h geçmişi depodaysa 4h barlar 1h barlardan UTC sınırlarına hizalı üretilir → ikinci çekim yok)
     """
     # --- opsiyonel tick helpers ---
     tick = None
@@ -74,9 +151,19 @@ def get_live_signal(
             pass  # fallback no-op
 
     # --- LTF (1h) veri ---
-    df = get_klines(symbol=symbol, interval=interval, limit=limit)
+    if df is None:
+        resample_htf = htf_df is None and _resample_htf(symbol, interval, limit, use_htf_filter, htf_interval, htf_source)
+        n = _ltf_limit(limit, interval, htf_interval) if resample_htf else limit
+        df = get_klines(symbol=symbol, interval=interval, limit=n)
+    else:
+        resample_htf = use_htf_filter and htf_df is None and htf_source == "resample" \
+            and _resample_ratio(interval, htf_interval) is not None
     if df is None or len(df) < 30:
         return None
+    if resample_htf:
+        # HTF: tüm kapanmış LTF barlarından; LTF analizi yine son `limit` bar üzerinde
+        htf_df = resample_ohlc(df.iloc[:-1], htf_interval, interval=interval)
+    df = df.tail(limit)
 
     closed_df = df.iloc[:-1].copy()   # sadece kapanmış barlarda analiz
     live_bar  = df.iloc[-1]
@@ -96,11 +183,17 @@ def get_live_signal(
     if len(closed_df) < 2*lookback + 5:
         return None
 
-    swing_highs, swing_lows = detect_swing_points(closed_df, lookback=lookback)
-    swing_highs = sorted(swing_highs, key=lambda x: x[0]) if swing_highs else []
-    swing_lows  = sorted(swing_lows,  key=lambda x: x[0]) if swing_lows  else []
-
-    trend_points = classify_trend_structure(swing_highs, swing_lows)
+    if detector is not None and detector.lookback == lookback:
+        # detektörün kalıcı durumuna yalnızca kesinleşmiş barlar girer (kapanış + KLINE_SETTLE_SEC geçmiş);
+        # az önce kapanan bar sonraki çekimde değişebilir → geçici değerlendirilir
+        settled_until = pd.Timestamp(int(time.time() * 1000) - int(KLINE_SETTLE_SEC * 1000)
+                                     - interval_to_ms(interval), unit="ms")
+        swing_highs, swing_lows, trend_points = detector.window(closed_df, settled_until=settled_until)
+    else:
+        swing_highs, swing_lows = detect_swing_points(closed_df, lookback=lookback)
+        swing_highs = sorted(swing_highs, key=lambda x: x[0]) if swing_highs else []
+        swing_lows  = sorted(swing_lows,  key=lambda x: x[0]) if swing_lows  else []
+        trend_points = classify_trend_structure(swing_highs, swing_lows)
     if not trend_points:
         return None
 
@@ -110,7 +203,8 @@ def get_live_signal(
     # --- HTF (4h) TREND FİLTRESİ ---
     if use_htf_filter:
         cutoff_time = closed_df["timestamp"].iloc[-1]  # yalnızca LTF'in son kapanışına kadar HTF bak
-        htf_df = get_klines(symbol=symbol, interval=htf_interval, limit=max(200, min(limit, 1000)))
+        if htf_df is None:
+            htf_df = get_klines(symbol=symbol, interval=htf_interval, limit=_htf_limit(limit))
         if htf_df is None or len(htf_df) < 20:
             return None  # HTF verisi yoksa sinyal üretme (korumacı)
         htf_closed = htf_df[htf_df["timestamp"] <= cutoff_time].copy()
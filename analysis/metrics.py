@@ -0,0 +1,163 @@
+# analysis/metrics.py
+# Artımlı (O(1)) performans metrikleri: her kapanan işlemde sabit zamanlı güncelleme, geçmiş yeniden taranmaz.
+# - Tüm geçmiş: win rate, profit factor (R bazlı), beklenti (işlem başı PnL%), ortalama R,
+#   kümülatif PnL%, max drawdown (kümülatif PnL% eğrisi üzerinde), en uzun kayıp serisi
+# - Kayan pencere (son `window` işlem): win rate, PF, beklenti, ortalama R, PnL% (deque + koşan toplamlar)
+# - to_dict() / from_dict() ile durum JSON'a yazılıp aynen geri yüklenir
+#
+# Konvansiyonlar paper_trader.storage.compute_metrics_from_trades ile aynı:
+#   PF = Σ R(WIN) / -Σ R(LOSS); kayıp yoksa 9999, hiç işlem yoksa 0
+from collections import deque
+from typing import Any, Dict, Optional
+
+PF_NO_LOSS = 9999.0
+
+
+def _to_float(x) -> float:
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if v != v else v
+
+
+def _pf(sum_win_r: float, sum_loss_r: float, n: int) -> float:
+    if n == 0:
+        return 0.0
+    return (sum_win_r / sum_loss_r) if sum_loss_r > 0 else PF_NO_LOSS
+
+
+class MetricsAccumulator:
+    """
+      acc = MetricsAccumulator(window=50)
+      for r in results: acc.add(r["r_multiple"], r["pnl_percent"], r["result"])
+      acc.summary()                  # {"trades", "win_rate", "profit_factor", ..., "rolling_win_rate", ...}
+      state = acc.to_dict()          # JSON'a yazılabilir
+      acc = MetricsAccumulator.from_dict(state)
+    """
+
+    _FIELDS = ("n", "wins", "losses", "timeouts", "sum_r", "sum_win_r", "sum_loss_r", "pnl_cum",
+               "peak", "max_dd", "loss_streak", "max_loss_streak")
+    _ROLL_FIELDS = ("w_wins", "w_sum_r", "w_sum_win_r", "w_sum_loss_r", "w_pnl")
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = int(window) if window else None
+        self.n = self.wins = self.losses = self.timeouts = 0
+        self.sum_r = self.sum_win_r = self.sum_loss_r = self.pnl_cum = 0.0
+        self.peak = self.max_dd = 0.0
+        self.loss_streak = self.max_loss_streak = 0
+        # kayan pencere toplamları
+        self.w_wins = 0
+        self.w_sum_r = self.w_sum_win_r = self.w_sum_loss_r = self.w_pnl = 0.0
+        self._recent: deque = deque()          # (r, pnl, result) — yalnızca pencere için
+
+    # -------------------------------------------------
+    # Güncelleme
+    # -------------------------------------------------
+    def add(self, r_multiple, pnl_percent, result: str, exit_reason: str = "") -> None:
+        r = _to_float(r_multiple)
+        pnl = _to_float(pnl_percent)
+        win, loss = result == "WIN", result == "LOSS"
+
+        self.n += 1
+        self.sum_r += r
+        self.pnl_cum += pnl
+        if win:
+            self.wins += 1
+            self.sum_win_r += r
+        elif loss:
+            self.losses += 1
+            self.sum_loss_r -= r
+        if exit_reason == "TIMEOUT":
+            self.timeouts += 1
+
+        # drawdown: kümülatif PnL% eğrisinin zirveden düşüşü (başlangıç 0)
+        self.peak = max(self.peak, self.pnl_cum)
+        self.max_dd = max(self.max_dd, self.peak - self.pnl_cum)
+
+        # kayıp serisi (FLAT seriyi bozmaz)
+        if loss:
+            self.loss_streak += 1
+            self.max_loss_streak = max(self.max_loss_streak, self.loss_streak)
+        elif win:
+            self.loss_streak = 0
+
+        if self.window:
+            self._push(r, pnl, result)
+
+    def add_trade(self, trade: Dict[str, Any]) -> None:
+        """Backtest sonucu / trades satırı sözlüğünden ekle."""
+        self.add(trade.get("r_multiple"), trade.get("pnl_percent"), trade.get("result", ""),
+                 trade.get("exit_reason") or "")
+
+    def _push(self, r: float, pnl: float, result: str, sign: int = 1) -> None:
+        if sign > 0:
+            self._recent.append((r, pnl, result))
+        self.w_sum_r += sign * r
+        self.w_pnl += sign * pnl
+        if result == "WIN":
+            self.w_wins += sign
+            self.w_sum_win_r += sign * r
+        elif result == "LOSS":
+            self.w_sum_loss_r -= sign * r
+        if sign > 0 and len(self._recent) > self.window:
+            self._push(*self._recent.popleft(), sign=-1)
+
+    # -------------------------------------------------
+    # Okuma
+    # -------------------------------------------------
+    def summary(self) -> Dict[str, float]:
+        n = self.n
+        out = {
+            "trades": n,
+            "wins": self.wins,
+            "losses": self.losses,
+            "timeouts": self.timeouts,
+            "win_rate": 100.0 * self.wins / n if n else 0.0,
+            "profit_factor": _pf(self.sum_win_r, self.sum_loss_r, n),
+            "expectancy_pct": self.pnl_cum / n if n else 0.0,
+            "avg_r": self.sum_r / n if n else 0.0,
+            "pnl_percent_cum": self.pnl_cum,
+            "max_drawdown_pct": self.max_dd,
+            "max_loss_streak": self.max_loss_streak,
+        }
+        if self.window:
+            k = len(self._recent)
+            out.update({
+                "rolling_trades": k,
+                "rolling_win_rate": 100.0 * self.w_wins / k if k else 0.0,
+                "rolling_profit_factor": _pf(self.w_sum_win_r, self.w_sum_loss_r, k),
+                "rolling_expectancy_pct": self.w_pnl / k if k else 0.0,
+                "rolling_avg_r": self.w_sum_r / k if k else 0.0,
+                "rolling_pnl_percent": self.w_pnl,
+            })
+        return out
+
+    def equity_row(self, timestamp_utc: str) -> Dict[str, Any]:
+        """paper_trader equity satırı (EQUITY_COLUMNS)."""
+        return {
+            "timestamp_utc": timestamp_utc,
+            "equity_index": float(100.0 + self.pnl_cum),
+            "trades_closed": int(self.n),
+            "win_rate": float(100.0 * self.wins / self.n) if self.n else 0.0,
+            "profit_factor": float(_pf(self.sum_win_r, self.sum_loss_r, self.n)),
+            "pnl_percent_cum": float(self.pnl_cum),
+        }
+
+    # -------------------------------------------------
+    # Serileştirme
+    # -------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        state = {f: getattr(self, f) for f in self._FIELDS + self._ROLL_FIELDS}
+        state["window"] = self.window
+        state["recent"] = [list(x) for x in self._recent]
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "MetricsAccumulator":
+        acc = cls(window=state.get("window"))
+        for f in cls._FIELDS + cls._ROLL_FIELDS:
+            if f in state:
+                setattr(acc, f, state[f])
+        acc._recent = deque(tuple(x) for x in state.get("recent", []))
+        return acc
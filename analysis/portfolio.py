@@ -0,0 +1,453 @@
+# analysis/portfolio.py
+# Olay güdümlü çok sembollü portföy backtest'i (paper_trader kurallarıyla).
+# - Tüm sembollerin bar akışları heapq.merge ile TEK global zaman çizelgesinde birleşir;
+#   aynı bar zamanında semboller SYMBOLS sırasıyla işlenir (canlıdaki on_bar_open döngüsü gibi):
+#   önce o sembolün açık işlemleri değerlendirilir, sonra yeni sinyal
+# - Canlı kurallar: aynı sembolde aynı yönde OPEN işlem varsa sinyal atlanır (has_open_trade_same_direction),
+#   çıkışlar evaluate_open_trade ile birebir (analysis.exits.resolve_exits mode="live")
+# - Sinyal = get_live_signal kuralları: son teyitli (swing + lookback bar kapanmış) trend noktası HL → BUY, LH → SELL;
+#   SL = o swing ∓ entry*sl_buffer_pct, TP = RR*risk (max_tp_percent tavanı), risk% > max_risk_pct → yok.
+#   Fark: canlı analiz son `limit` barlık pencereye bakar, burada tüm geçmiş kullanılır; HTF swing'i ise
+#   teyit eden HTF barı KAPANINCA görünür (canlıdaki yarım HTF barı hesaba katılmaz)
+# - Portföy: eşzamanlı pozisyon / brüt maruziyet limitleri, risk bazlı pozisyon büyüklüğü, gerçekleşen equity
+# - Bellek sınırlı: her sembol BLOCK_BARS'lık bloklar halinde üretilir (swing'ler blok blok, taşınan durumla);
+#   kaynak olarak OhlcArchive (memmap) verilirse veri de sayfa sayfa okunur. İşlem/equity satırları CSV'ye akıtılabilir.
+#
+# Kullanım:
+#   python -m analysis.portfolio --interval 1h --start 2021-01-01 --trades-csv pf_trades.csv --equity-csv pf_equity.csv
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import csv
+import heapq
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.exits import REASONS, R_GAP_SL, R_GAP_TP, exit_pnl, resolve_exits
+from analysis.resample import open_times_ms, resample_ohlc
+from analysis.swing_points import swing_point_indices
+from services.intervals import interval_to_ms
+
+try:
+    from paper_trader.config import (
+        RR_RATIO, SL_BUFFER_PCT, MAX_TP_PERCENT, MAX_RISK_PCT,
+        FEE_ROUNDTRIP, CONSERVATIVE_DOUBLE_HIT, TIMEOUT_CLOSE, MAX_FUTURE_BARS,
+    )
+except Exception:
+    RR_RATIO, SL_BUFFER_PCT, MAX_TP_PERCENT, MAX_RISK_PCT = 1.5, 0.005, 0.05, 0.02
+    FEE_ROUNDTRIP, CONSERVATIVE_DOUBLE_HIT, TIMEOUT_CLOSE, MAX_FUTURE_BARS = 0.0006, True, None, 20
+
+BLOCK_BARS = 4096
+MIN_LTF_BARS = 30          # get_live_signal: len(df) < 30 → sinyal yok
+MIN_HTF_BARS = 20          # get_live_signal: len(htf_df) < 20 → sinyal yok
+
+TRADE_COLUMNS = [
+    "trade_id", "open_time_utc", "close_time_utc", "symbol", "interval", "side",
+    "entry_price", "sl", "tp", "exit_price", "exit_reason", "bars_held", "fee_roundtrip",
+    "risk_abs", "r_multiple", "pnl_percent", "result", "state", "notional", "pnl_abs", "equity_after",
+]
+EQUITY_COLUMNS = ["time_utc", "equity", "open_positions", "gross_exposure", "event"]
+
+
+def _iso(ms: int) -> str:
+    return pd.Timestamp(int(ms), unit="ms").strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _columns(src) -> Dict[str, np.ndarray]:
+    """DataFrame (get_klines formatı) ya da OhlcArchive → open_time/open/high/low/close dizileri."""
+    if isinstance(src, pd.DataFrame):
+        return {
+            "open_time": open_times_ms(src),
+            **{c: src[c].to_numpy(dtype=np.float64) for c in ("open", "high", "low", "close")},
+        }
+    return {c: src.columns[c] for c in ("open_time", "open", "high", "low", "close")}
+
+
+def _label_codes(values: np.ndarray, prev: Optional[float], is_high: bool) -> np.ndarray:
+    """classify_trend_structure etiketleri → yön kodu: LH → -1 (SELL), HL → +1 (BUY), diğerleri 0."""
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int8)
+    before = np.concatenate([[np.nan if prev is None else prev], values[:-1]])
+    if is_high:
+        code = np.where(values > before, 0, -1).astype(np.int8)      # HH : LH
+    else:
+        code = np.where(values > before, 1, 0).astype(np.int8)       # HL : LL
+    if prev is None:
+        code[0] = 0                                                  # HH? / HL?
+    return code
+
+
+def _merge_points(hi_idx, hi_val, hi_code, lo_idx, lo_val, lo_code):
+    """Aynı bar hem high hem low ise önce high (classify'daki kararlı sıralama)."""
+    key = np.concatenate([hi_idx * 2, lo_idx * 2 + 1])
+    order = np.argsort(key, kind="stable")
+    idx = np.concatenate([hi_idx, lo_idx])[order]
+    val = np.concatenate([hi_val, lo_val])[order]
+    code = np.concatenate([hi_code, lo_code])[order]
+    return idx, val, code
+
+
+class _SymbolStream:
+    """Bir sembolün sinyal olaylarını (çıkışları önceden çözülmüş) zaman sırasıyla blok blok üretir."""
+
+    def __init__(self, symbol: str, rank: int, src, interval: str, p: Dict[str, Any]):
+        self.symbol = symbol
+        self.rank = rank
+        self.cols = _columns(src)
+        self.n = len(self.cols["open_time"])
+        self.interval = interval
+        self.p = p
+        self.htf = self._htf_points() if p["use_htf_filter"] else None
+
+    # -------------------------------------------------
+    # HTF trend (seyrek, bir kez)
+    # -------------------------------------------------
+    def _htf_points(self):
+        c = self.cols
+        frame = pd.DataFrame({k: np.asarray(c[k]) for k in ("open_time", "open", "high", "low", "close")})
+        frame["volume"] = 0.0
+        htf = resample_ohlc(frame, self.p["htf_interval"], interval=self.interval, include_partial=False)
+        del frame
+        L = self.p["htf_lookback"]
+        h_open = htf["open_time"].to_numpy(dtype=np.int64)
+        hh = htf["high"].to_numpy(dtype=np.float64)
+        hl = htf["low"].to_numpy(dtype=np.float64)
+        hi_idx, lo_idx = swing_point_indices(hh, hl, L)
+        k, _v, code = _merge_points(
+            hi_idx, hh[hi_idx], _label_codes(hh[hi_idx], None, True),
+            lo_idx, hl[lo_idx], _label_codes(hl[lo_idx], None, False),
+        )
+        htf_ms = interval_to_ms(self.p["htf_interval"])
+        return {
+            "open": h_open,
+            "end": h_open + htf_ms,
+            "visible_from": h_open[k + L] + htf_ms if len(k) else np.empty(0, dtype=np.int64),
+            "k": k,
+            "code": code,
+        }
+
+    def _htf_bias(self, t_live: np.ndarray, t_cut: np.ndarray) -> np.ndarray:
+        """Canlı bar açılışı t_live'da görünen son HTF etiketi kodu (0: yok / eski / veri yetersiz)."""
+        H = self.htf
+        pos = np.searchsorted(H["visible_from"], t_live, side="right") - 1
+        ok = pos >= 0
+        ok &= np.searchsorted(H["end"], t_live, side="right") >= MIN_HTF_BARS
+        posc = np.maximum(pos, 0)
+        bias = np.where(ok, H["code"][posc] if len(H["code"]) else 0, 0)
+        pos_cut = np.searchsorted(H["open"], t_cut, side="right") - 1
+        stale = (pos_cut - (H["k"][posc] if len(H["k"]) else 0)) > self.p["htf_max_bars_since_swing"]
+        return np.where(stale, 0, bias)
+
+    # -------------------------------------------------
+    # LTF: blok blok swing / trend + sinyal + çıkış
+    # -------------------------------------------------
+    def events(self) -> Iterator[Tuple]:
+        p, c, n = self.p, self.cols, self.n
+        L = 3                                        # get_live_signal'daki sabit lookback
+        ot = c["open_time"]
+        a = L
+        prev_high = prev_low = None
+        carry = (np.empty(0, np.int64), np.empty(0), np.empty(0, np.int8))   # son trend noktası
+        width = max(2, min(max(int(p["timeout_close"]), 1), p["max_future_bars"])
+                    if p["timeout_close"] is not None else p["max_future_bars"])
+
+        for j0 in range(max(1, MIN_LTF_BARS - 1), n, BLOCK_BARS):
+            j1 = min(n, j0 + BLOCK_BARS)
+            # bu bloğun sinyalleri için swing adayları: s + L <= j1 - 2
+            b = max(a, min(j1 - 1 - L, n - L))
+            hi = np.empty(0, np.int64)
+            lo = np.empty(0, np.int64)
+            if b > a:
+                hs, ls = swing_point_indices(np.asarray(c["high"][a - L:b + L], dtype=np.float64),
+                                             np.asarray(c["low"][a - L:b + L], dtype=np.float64), L)
+                hi, lo = hs + (a - L), ls + (a - L)
+            a = b
+            hv = np.asarray(c["high"][hi], dtype=np.float64) if len(hi) else np.empty(0)
+            lv = np.asarray(c["low"][lo], dtype=np.float64) if len(lo) else np.empty(0)
+            s_idx, s_val, s_code = _merge_points(hi, hv, _label_codes(hv, prev_high, True),
+                                                 lo, lv, _label_codes(lv, prev_low, False))
+            if len(hv):
+                prev_high = float(hv[-1])
+            if len(lv):
+                prev_low = float(lv[-1])
+            conf = np.concatenate([carry[0], s_idx + L])
+            val = np.concatenate([carry[1], s_val])
+            code = np.concatenate([carry[2], s_code])
+            if len(conf):
+                carry = (conf[-1:], val[-1:], code[-1:])
+
+            j = np.arange(j0, j1)
+            pos = np.searchsorted(conf, j - 1, side="right") - 1
+            has = pos >= 0
+            posc = np.maximum(pos, 0)
+            d = np.where(has, code[posc] if len(code) else 0, 0)
+            if self.htf is not None:
+                d = np.where(self._htf_bias(ot[j0:j1], ot[j0 - 1:j1 - 1]) == d, d, 0)
+            swing = val[posc] if len(val) else np.zeros(len(j))
+            entry = np.asarray(c["open"][j0:j1], dtype=np.float64)
+            buy = d > 0
+            buf = entry * p["sl_buffer_pct"]
+            sl = np.where(buy, swing - buf, swing + buf)
+            risk = np.where(buy, entry - sl, sl - entry)
+            raw_tp = np.where(buy, entry + p["rr_ratio"] * risk, entry - p["rr_ratio"] * risk)
+            cap = np.where(buy, entry * (1.0 + p["max_tp_percent"]), entry * (1.0 - p["max_tp_percent"]))
+            tp = np.where(buy, np.minimum(raw_tp, cap), np.maximum(raw_tp, cap))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                risk_pct = risk / entry
+            ok = (d != 0) & (risk > 0) & (risk_pct <= p["max_risk_pct"])
+            if p["min_risk_pct"] > 0.0:
+                ok &= risk_pct >= p["min_risk_pct"]
+            if p["min_tp_percent"] > 0.0:
+                min_tp = np.where(buy, entry * (1.0 + p["min_tp_percent"]), entry * (1.0 - p["min_tp_percent"]))
+                tp = np.where(buy, np.maximum(tp, min_tp), np.minimum(tp, min_tp))
+                ok &= np.where(buy, tp <= cap, tp >= cap)
+            sel = np.flatnonzero(ok)
+            if len(sel) == 0:
+                continue
+
+            # çıkışlar: canlı evaluator'ın bar bar uygulanmasıyla aynı (yalnızca gereken dilim)
+            e = j[sel]
+            hi_end = min(n, j1 + width + 2)
+            ex = resolve_exits(
+                e - j0, buy[sel], sl[sel], tp[sel],
+                c["open"][j0:hi_end], c["high"][j0:hi_end], c["low"][j0:hi_end], c["close"][j0:hi_end],
+                max_future_bars=p["max_future_bars"], conservative_double_hit=p["conservative_double_hit"],
+                timeout_close=p["timeout_close"], mode="live",
+            )
+            exit_idx = ex["exit_idx"] + j0
+            gap = np.isin(ex["reason"], (R_GAP_TP, R_GAP_SL))
+            eval_idx = np.where(ex["closed"], exit_idx + np.where(gap, 0, 1), -1)
+            pnl, r_mult = exit_pnl(buy[sel], entry[sel], sl[sel], ex["exit_price"], p["fee_roundtrip"])
+            for k, jj in enumerate(e.tolist()):
+                closed = bool(ex["closed"][k])
+                yield (
+                    int(ot[jj]), self.rank, jj,
+                    "BUY" if buy[sel[k]] else "SELL", float(entry[sel[k]]), float(sl[sel[k]]), float(tp[sel[k]]),
+                    closed,
+                    int(ot[eval_idx[k]]) if closed else None,
+                    int(ot[exit_idx[k]]) if closed else None,
+                    float(ex["exit_price"][k]), REASONS[int(ex["reason"][k])], int(ex["bars_held"][k]),
+                    float(pnl[k]), float(r_mult[k]),
+                )
+
+
+def run_portfolio(
+    sources: Dict[str, Any],
+    interval: str = "1h",
+    # sinyal (get_live_signal / paper_trader ile aynı varsayılanlar)
+    rr_ratio: float = RR_RATIO,
+    sl_buffer_pct: float = SL_BUFFER_PCT,
+    max_tp_percent: float = MAX_TP_PERCENT,
+    max_risk_pct: float = MAX_RISK_PCT,
+    min_tp_percent: float = 0.0,
+    min_risk_pct: float = 0.0,
+    use_htf_filter: bool = True,
+    htf_interval: str = "4h",
+    htf_lookback: int = 3,
+    htf_max_bars_since_swing: int = 300,
+    # kapanış (evaluator)
+    fee_roundtrip: float = FEE_ROUNDTRIP,
+    conservative_double_hit: bool = CONSERVATIVE_DOUBLE_HIT,
+    timeout_close: Optional[int] = TIMEOUT_CLOSE,
+    max_future_bars: int = MAX_FUTURE_BARS,
+    # portföy
+    initial_equity: float = 10_000.0,
+    risk_per_trade: float = 0.01,          # equity'nin SL'de kaybedilecek payı
+    max_position_pct: float = 0.25,        # tek pozisyon notional tavanı (equity oranı)
+    max_gross_exposure: float = 1.0,       # açık pozisyonların toplam notional tavanı (equity oranı)
+    max_open_positions: Optional[int] = None,
+    trades_csv: Optional[str] = None,
+    equity_csv: Optional[str] = None,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    sources: {symbol: DataFrame | OhlcArchive} — sıra, aynı bar zamanındaki işlem sırasıdır (SYMBOLS gibi).
+    Dönen: {"summary": {...}, "trades": [...] | None, "equity": [...] | None}
+    (trades_csv / equity_csv verilirse satırlar belleğe alınmadan dosyaya akıtılır → None)
+    """
+    p = dict(
+        rr_ratio=rr_ratio, sl_buffer_pct=sl_buffer_pct, max_tp_percent=max_tp_percent, max_risk_pct=max_risk_pct,
+        min_tp_percent=min_tp_percent, min_risk_pct=min_risk_pct, use_htf_filter=use_htf_filter,
+        htf_interval=htf_interval, htf_lookback=htf_lookback, htf_max_bars_since_swing=htf_max_bars_since_swing,
+        fee_roundtrip=fee_roundtrip, conservative_double_hit=conservative_double_hit,
+        timeout_close=timeout_close, max_future_bars=int(max_future_bars),
+    )
+    symbols = [s.upper() for s in sources]
+    streams = [_SymbolStream(s, i, src, interval, p) for i, (s, src) in enumerate(zip(symbols, sources.values()))]
+
+    files, writers = [], {}
+    for name, path, cols in (("trades", trades_csv, TRADE_COLUMNS), ("equity", equity_csv, EQUITY_COLUMNS)):
+        if path:
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            f = open(path, "w", newline="", encoding="utf-8")
+            files.append(f)
+            writers[name] = csv.DictWriter(f, fieldnames=cols)
+            writers[name].writeheader()
+    kept = {"trades": None if "trades" in writers else [], "equity": None if "equity" in writers else []}
+
+    def _emit(name: str, row: Dict[str, Any]) -> None:
+        if name in writers:
+            writers[name].writerow(row)
+        else:
+            kept[name].append(row)
+
+    equity = float(initial_equity)
+    peak_equity = equity
+    max_dd = 0.0
+    gross = 0.0
+    open_by_side: Dict[Tuple[int, str], int] = {}
+    n_open = 0
+    closing: List[Tuple] = []          # heap: (eval_time, rank, seq, trade)
+    seq = 0
+    stats = {"signals": 0, "opened": 0, "closed": 0, "skipped_same_side": 0, "skipped_limit": 0,
+             "wins": 0, "losses": 0, "gross_win": 0.0, "gross_loss": 0.0, "max_open": 0, "peak_exposure": 0.0}
+
+    def _close(trade: Dict[str, Any]) -> None:
+        nonlocal equity, peak_equity, max_dd, gross, n_open
+        pnl_abs = trade["notional"] * trade["pnl_percent"] / 100.0
+        equity += pnl_abs
+        gross -= trade["notional"]
+        n_open -= 1
+        open_by_side[(trade["_rank"], trade["side"])] -= 1
+        peak_equity = max(peak_equity, equity)
+        max_dd = max(max_dd, (peak_equity - equity) / peak_equity * 100.0 if peak_equity > 0 else 0.0)
+        stats["closed"] += 1
+        if trade["pnl_percent"] > 0:
+            stats["wins"] += 1
+            stats["gross_win"] += pnl_abs
+        elif trade["pnl_percent"] < 0:
+            stats["losses"] += 1
+            stats["gross_loss"] -= pnl_abs
+        row = {k: trade[k] for k in TRADE_COLUMNS if k in trade}
+        row.update(state="CLOSED", pnl_abs=pnl_abs, equity_after=equity,
+                   result="WIN" if trade["pnl_percent"] > 0 else ("LOSS" if trade["pnl_percent"] < 0 else "FLAT"))
+        _emit("trades", row)
+        _emit("equity", {"time_utc": _iso(trade["_eval_t"]), "equity": equity, "open_positions": n_open,
+                         "gross_exposure": gross, "event": f"close {trade['trade_id']}"})
+
+    merged = heapq.merge(*(s.events() for s in streams))
+    for ev in merged:
+        t, rank, _j, side, entry, sl, tp, closed, eval_t, exit_t, exit_price, reason, bars_held, pnl, r_mult = ev
+        # bu sembolün (ve sırada önceki sembollerin) bu bara kadarki kapanışları: önce değerlendirme, sonra sinyal
+        while closing and (closing[0][0], closing[0][1]) <= (t, rank):
+            _close(heapq.heappop(closing)[3])
+        stats["signals"] += 1
+
+        if open_by_side.get((rank, side), 0) > 0:
+            stats["skipped_same_side"] += 1           # has_open_trade_same_direction
+            continue
+        if max_open_positions is not None and n_open >= max_open_positions:
+            stats["skipped_limit"] += 1
+            continue
+        risk_pct = abs(entry - sl) / entry
+        notional = min(equity * risk_per_trade / risk_pct, equity * max_position_pct)
+        notional = min(notional, equity * max_gross_exposure - gross)
+        if notional <= 0:
+            stats["skipped_limit"] += 1
+            continue
+
+        symbol = symbols[rank]
+        open_iso = _iso(t)
+        trade = {
+            "trade_id": f"{symbol}-{open_iso}", "open_time_utc": open_iso,
+            "close_time_utc": _iso(exit_t) if closed else "", "symbol": symbol, "interval": interval,
+            "side": side, "entry_price": entry, "sl": sl, "tp": tp,
+            "exit_price": exit_price if closed else "", "exit_reason": reason if closed else "",
+            "bars_held": bars_held, "fee_roundtrip": fee_roundtrip, "risk_abs": abs(entry - sl),
+            "r_multiple": r_mult if closed else "", "pnl_percent": pnl if closed else "",
+            "state": "OPEN", "notional": notional, "_rank": rank, "_eval_t": eval_t,
+        }
+        open_by_side[(rank, side)] = open_by_side.get((rank, side), 0) + 1
+        n_open += 1
+        gross += notional
+        stats["opened"] += 1
+        stats["max_open"] = max(stats["max_open"], n_open)
+        stats["peak_exposure"] = max(stats["peak_exposure"], gross / equity if equity > 0 else 0.0)
+        _emit("equity", {"time_utc": open_iso, "equity": equity, "open_positions": n_open,
+                         "gross_exposure": gross, "event": f"open {trade['trade_id']}"})
+        if closed:
+            heapq.heappush(closing, (eval_t, rank, seq, trade))
+            seq += 1
+        else:
+            # veri sonunda hâlâ açık
+            row = {k: trade[k] for k in TRADE_COLUMNS if k in trade}
+            row.update(result="", pnl_abs="", equity_after="")
+            _emit("trades", row)
+
+    while closing:
+        _close(heapq.heappop(closing)[3])
+    for f in files:
+        f.close()
+
+    closed_n = stats["closed"]
+    summary = {
+        "initial_equity": float(initial_equity),
+        "final_equity": equity,
+        "return_pct": (equity / initial_equity - 1.0) * 100.0 if initial_equity else 0.0,
+        "max_drawdown_pct": max_dd,
+        "signals": stats["signals"],
+        "trades_opened": stats["opened"],
+        "trades_closed": closed_n,
+        "trades_open_at_end": n_open,
+        "skipped_same_side": stats["skipped_same_side"],
+        "skipped_limit": stats["skipped_limit"],
+        "win_rate": stats["wins"] / closed_n * 100.0 if closed_n else 0.0,
+        "profit_factor": (stats["gross_win"] / stats["gross_loss"]) if stats["gross_loss"] > 0 else 9999.0,
+        "max_concurrent_positions": stats["max_open"],
+        "peak_gross_exposure": stats["peak_exposure"],
+    }
+    if verbose:
+        print(f"[portfolio] {len(symbols)} sembol | açılan {summary['trades_opened']} / sinyal {summary['signals']} | "
+              f"equity {summary['final_equity']:.2f} ({summary['return_pct']:+.2f}%) | "
+              f"max DD {summary['max_drawdown_pct']:.2f}% | PF {summary['profit_factor']:.2f}")
+    return {"summary": summary, "trades": kept["trades"], "equity": kept["equity"]}
+
+
+if __name__ == "__main__":
+    from services.binance_service import load_history
+    from services.ohlc_archive import open_archive
+    try:
+        from paper_trader.config import SYMBOLS as _DEFAULT_SYMBOLS
+    except Exception:
+        _DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+
+    parser = argparse.ArgumentParser(description="Çok sembollü portföy backtest'i (paper_trader kuralları)")
+    parser.add_argument("--symbols", nargs="+", default=_DEFAULT_SYMBOLS)
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--start", default=None, help="yerel depodan (arşiv yoksa)")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--initial-equity", type=float, default=10_000.0)
+    parser.add_argument("--risk-per-trade", type=float, default=0.01)
+    parser.add_argument("--max-position-pct", type=float, default=0.25)
+    parser.add_argument("--max-gross-exposure", type=float, default=1.0)
+    parser.add_argument("--max-open-positions", type=int, default=None)
+    parser.add_argument("--no-htf", action="store_true")
+    parser.add_argument("--trades-csv", default="portfolio_trades.csv")
+    parser.add_argument("--equity-csv", default="portfolio_equity.csv")
+    args = parser.parse_args()
+
+    sources = {}
+    for s in args.symbols:
+        src = open_archive(s, args.interval)               # memmap (önce services.ohlc_archive ile kur)
+        if src is not None and (args.start or args.end):
+            from services.intervals import to_epoch_ms
+            src = src.between(to_epoch_ms(args.start) if args.start else None,
+                              to_epoch_ms(args.end) if args.end else None)
+        if src is None or len(src) == 0:
+            src = load_history(s, args.interval, start=args.start, end=args.end)
+        if src is None or len(src) == 0:
+            print(f"⚠️ [portfolio] {s} {args.interval}: veri yok, atlandı")
+            continue
+        sources[s] = src
+
+    run_portfolio(
+        sources, interval=args.interval, use_htf_filter=not args.no_htf,
+        initial_equity=args.initial_equity, risk_per_trade=args.risk_per_trade,
+        max_position_pct=args.max_position_pct, max_gross_exposure=args.max_gross_exposure,
+        max_open_positions=args.max_open_positions, trades_csv=args.trades_csv, equity_csv=args.equity_csv,
+    )
@@ -0,0 +1,164 @@
+# analysis/resample.py
+# Üst zaman dilimi (HTF) barlarını eldeki LTF barlarından üretir (ikinci bir ağ çekimi yerine).
+# - Kovalar UTC epoch ızgarasına hizalı: bucket = open_time // htf_ms * htf_ms (Binance ile aynı sınırlar)
+# - open=ilk, high=max, low=min, close=son, volume=toplam
+# - Baştaki yarım kova (pencere kova ortasında başlıyorsa) atılır: açılışı gerçek HTF açılışı değildir
+# - Sondaki yarım kova (oluşmakta olan HTF bar) include_partial=True ise tutulur
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis._arrays import time_keys
+from services.intervals import interval_to_ms, is_grid_aligned
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def open_times_ms(df: pd.DataFrame) -> np.ndarray:
+    """open_time (epoch-ms) kolonu; yoksa timestamp'ten (UTC varsayılır) türetilir."""
+    if "open_time" in df.columns:
+        return df["open_time"].to_numpy(dtype=np.int64)
+    return time_keys(df["timestamp"]) // 1_000_000
+
+
+def infer_interval_ms(open_times: np.ndarray) -> Optional[int]:
+    """Ardışık açılışlar arasındaki en sık fark (bar süresi)."""
+    if len(open_times) < 2:
+        return None
+    d = np.diff(np.asarray(open_times, dtype=np.int64))
+    d = d[d > 0]
+    if d.size == 0:
+        return None
+    vals, counts = np.unique(d, return_counts=True)
+    return int(vals[np.argmax(counts)])
+
+
+def resample_ratio(interval_ms: Optional[int], htf_interval: str) -> Optional[int]:
+    """HTF, LTF'in tam katı ve ızgaraya hizalıysa oran (örn. 1h→4h = 4), değilse None."""
+    if not interval_ms or not is_grid_aligned(htf_interval):
+        return None
+    htf_ms = interval_to_ms(htf_interval)
+    if htf_ms < interval_ms or htf_ms % interval_ms:
+        return None
+    return htf_ms // interval_ms
+
+
+def resample_ohlc(
+    df: pd.DataFrame,
+    htf_interval: str,
+    interval: Optional[str] = None,
+    include_partial: bool = True,
+) -> pd.DataFrame:
+    """
+    LTF frame (timestamp/open_time + OHLCV) → HTF frame (get_klines formatı).
+    interval verilmezse bar süresi açılış farklarından çıkarılır.
+    """
+    t = open_times_ms(df)
+    iv = interval_to_ms(interval) if interval else infer_interval_ms(t)
+    ratio = resample_ratio(iv, htf_interval)
+    if ratio is None:
+        raise ValueError(f"{htf_interval!r}, LTF bar süresinin ({iv} ms) hizalı bir katı değil")
+    htf_ms = interval_to_ms(htf_interval)
+
+    cols = {"open_time": t}
+    for c in OHLCV:
+        if c in df.columns:
+            cols[c] = df[c].to_numpy(dtype=np.float64)
+    if "volume" not in cols:
+        cols["volume"] = np.zeros(len(t))
+    src = pd.DataFrame(cols)
+    src["bucket"] = (t // htf_ms) * htf_ms
+
+    g = src.groupby("bucket", sort=True)
+    out = pd.DataFrame({
+        "open": g["open"].first(),
+        "high": g["high"].max(),
+        "low": g["low"].min(),
+        "close": g["close"].last(),
+        "volume": g["volume"].sum(),
+        "first_open": g["open_time"].min(),
+        "bars": g["open_time"].size(),
+    })
+    out.index.name = "open_time"
+    out = out.reset_index()
+
+    if len(out):
+        # baştaki yarım kova
+        if out["first_open"].iloc[0] != out["open_time"].iloc[0]:
+            out = out.iloc[1:]
+        # sondaki yarım kova (oluşmakta olan HTF bar)
+        if not include_partial and len(out) and out["bars"].iloc[-1] < ratio:
+            out = out.iloc[:-1]
+
+    out = out.drop(columns=["first_open", "bars"]).reset_index(drop=True)
+    out.insert(0, "timestamp", pd.to_datetime(out["open_time"].to_numpy(dtype=np.int64), unit="ms"))
+    return out[["timestamp"] + OHLCV + ["open_time"]]
+
+
+class HtfAggregator:
+    """
+    Kapanan LTF barlarıyla artımlı HTF üretimi.
+      agg = HtfAggregator("1h", "4h")
+      done = agg.update(bar)   # bar: open_time/open/high/low/close/volume; kova tamamlanınca HTF bar döner
+      agg.current              # oluşmakta olan (yarım) HTF bar
+    """
+
+    def __init__(self, interval: str, htf_interval: str, max_bars: int = 1000):
+        self.iv = interval_to_ms(interval)
+        self.htf_ms = interval_to_ms(htf_interval)
+        self.ratio = resample_ratio(self.iv, htf_interval)
+        if self.ratio is None:
+            raise ValueError(f"{htf_interval!r}, {interval!r}'in hizalı bir katı değil")
+        self.max_bars = int(max_bars)
+        self.bars: List[Dict] = []        # tamamlanmış HTF barlar (eski → yeni)
+        self.current: Optional[Dict] = None
+        self._skip_bucket: Optional[int] = None
+
+    def _emit(self) -> Optional[Dict]:
+        cur, self.current = self.current, None
+        if cur is None or cur["open_time"] == self._skip_bucket:
+            return None
+        done = {k: v for k, v in cur.items() if k != "bars"}
+        self.bars.append(done)
+        if len(self.bars) > self.max_bars:
+            del self.bars[: len(self.bars) - self.max_bars]
+        return done
+
+    def update(self, bar: Dict) -> Optional[Dict]:
+        t = int(bar["open_time"])
+        bucket = (t // self.htf_ms) * self.htf_ms
+        emitted = None
+        if self.current is not None and bucket != self.current["open_time"]:
+            # kova eksik barla kapandı (veri boşluğu) → yine de HTF bar olarak yayınla
+            emitted = self._emit()
+        if self.current is None:
+            if not self.bars and t != bucket:
+                # ilk kova ortasından başlıyoruz → bu kovanın açılışı güvenilmez, yayınlama
+                self._skip_bucket = bucket
+            self.current = {
+                "open_time": bucket, "open": float(bar["open"]), "high": float(bar["high"]),
+                "low": float(bar["low"]), "close": float(bar["close"]),
+                "volume": float(bar.get("volume", 0.0)), "bars": 1,
+            }
+        else:
+            cur = self.current
+            cur["high"] = max(cur["high"], float(bar["high"]))
+            cur["low"] = min(cur["low"], float(bar["low"]))
+            cur["close"] = float(bar["close"])
+            cur["volume"] += float(bar.get("volume", 0.0))
+            cur["bars"] += 1
+        # son LTF bar → HTF bar kapanır
+        if t + self.iv >= bucket + self.htf_ms:
+            done = self._emit()
+            emitted = done if done is not None else emitted
+        return emitted
+
+    def frame(self, include_partial: bool = True) -> pd.DataFrame:
+        rows = list(self.bars)
+        if include_partial and self.current is not None and self.current["open_time"] != self._skip_bucket:
+            rows.append({k: v for k, v in self.current.items() if k != "bars"})
+        df = pd.DataFrame(rows, columns=["open_time"] + OHLCV)
+        df["open_time"] = df["open_time"].astype(np.int64)
+        df.insert(0, "timestamp", pd.to_datetime(df["open_time"].to_numpy(dtype=np.int64), unit="ms"))
+        return df[["timestamp"] + OHLCV + ["open_time"]]
@@ -1,16 +1,47 @@
 # ✅ analysis/signals.py
-from datetime import timedelta
 
-def generate_signals(trend_points, engulfings):
-    signals = []
+import numpy as np
+
+from analysis._arrays import time_keys
+from services.intervals import interval_to_ms
+
+
+def generate_signals(trend_points, engulfings, window_bars: int = 2, interval: str = "1h"):
+    """
+    HL + sonraki `window_bars` bar içinde bullish engulfing → BUY,
+    LH + sonraki `window_bars` bar içinde bearish engulfing → SELL.
+    Pencere: 0 <= e_time - t_time <= window_bars * interval (varsayılan 2 × 1h = eski 2 saat kuralı).
+    Sıralı engulfing zamanları üzerinde searchsorted ile birleştirilir (iç içe döngü yok);
+    çıktı sırası: trend noktası sırası, her birinde engulfing'lerin verilen sırası.
+    """
+    if not trend_points or not engulfings:
+        return []
+    e_keys = time_keys([e[0] for e in engulfings])
+    order = np.argsort(e_keys, kind="stable")
+    e_sorted = e_keys[order]
+    t_times = np.asarray([p[0] for p in trend_points])
+    t_keys = time_keys(t_times)
 
-    for t_time, t_value, label in trend_points:
-        for e_time, e_value, e_type in engulfings:
-            time_diff = e_time - t_time
-            if timedelta(0) <= time_diff <= timedelta(hours=2):
-                if label == "HL" and e_type == "bullish":
-                    signals.append((e_time, e_value, "BUY"))
-                elif label == "LH" and e_type == "bearish":
-                    signals.append((e_time, e_value, "SELL"))
+    # anahtar birimi zaman tipinden: tamsayı zamanlar epoch-ms (open_time), datetime'lar epoch-ns
+    window = int(window_bars) * interval_to_ms(interval)
+    if not np.issubdtype(t_times.dtype, np.integer):
+        window *= 1_000_000
+
+    lo = np.searchsorted(e_sorted, t_keys, side="left")
+    hi = np.searchsorted(e_sorted, t_keys + window, side="right")
+
+    signals = []
+    for k in np.flatnonzero(hi > lo):
+        label = trend_points[k][2]
+        if label == "HL":
+            want, side = "bullish", "BUY"
+        elif label == "LH":
+            want, side = "bearish", "SELL"
+        else:
+            continue
+        for j in np.sort(order[lo[k]:hi[k]]):
+            e_time, e_value, e_type = engulfings[j]
+            if e_type == want:
+                signals.append((e_time, e_value, side))
 
     return signals
@@ -0,0 +1,350 @@
+# analysis/sweep.py
+# run_backtest parametre taraması (grid × semboller) — süreç havuzu ile paralel.
+# - Her sembolün OHLC dizileri + swing index'leri BİR KEZ paylaşımlı belleğe (multiprocessing.shared_memory)
+#   yazılır; işçiler bağlanıp sembol başına bir kez DataFrame/swing listelerini kurar (görev başına pickle yok)
+# - Görev = (sembol, kombinasyon parçası); sonuçlar geldikçe tek CSV tablosuna akar (kombinasyon başına özet)
+# - Hata veren kombinasyon atlanmaz: metrikleri boş, `error` kolonu dolu bir satır yazılır (ızgara eksiksiz kalır)
+#
+# Kullanım:
+#   python -m analysis.sweep --symbols BTCUSDT ETHUSDT --interval 1h --start 2021-01-01 \
+#       --grid rr_ratio=1.5,2,3 sl_buffer_pct=0.003,0.005 use_htf_filter=true,false --out sweep.csv
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import csv
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.backtest import run_backtest
+from analysis.swing_points import swing_point_indices
+from analysis.trend_structure import classify_trend_structure
+
+try:
+    from paper_trader.config import SWEEP_MAX_WORKERS
+except Exception:
+    SWEEP_MAX_WORKERS = None   # None → os.cpu_count()
+
+COMBOS_PER_TASK = 25
+SUMMARY_COLUMNS = [
+    "symbol", "combo_id", "params", "trades", "wins", "losses", "win_rate",
+    "profit_factor", "avg_r", "pnl_percent_cum", "max_drawdown_pct", "error",
+]
+
+
+# -------------------------------------------------
+# Parametre ızgarası
+# -------------------------------------------------
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """{"rr_ratio": [1.5, 2], "max_risk_pct": [0.02]} → kartezyen çarpım (sıra: anahtar sırası)."""
+    keys = list(grid)
+    return [dict(zip(keys, vals)) for vals in itertools.product(*(list(grid[k]) for k in keys))]
+
+
+def _parse_value(raw: str):
+    low = raw.strip().lower()
+    if low in ("true", "false"):
+        return low == "true"
+    if low in ("none", "null"):
+        return None
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+def parse_grid_args(items: List[str]) -> Dict[str, List[Any]]:
+    """["rr_ratio=1.5,2", "use_htf_filter=true,false"] → {"rr_ratio": [1.5, 2], ...}"""
+    grid: Dict[str, List[Any]] = {}
+    for item in items:
+        key, _, vals = item.partition("=")
+        if not vals:
+            raise ValueError(f"Geçersiz grid öğesi: {item!r} (beklenen: ad=v1,v2)")
+        grid[key.strip()] = [_parse_value(v) for v in vals.split(",")]
+    return grid
+
+
+# -------------------------------------------------
+# Özet metrikler (main.py ile aynı tanımlar + max drawdown)
+# -------------------------------------------------
+def _r_multiple(r: Dict[str, Any]) -> float:
+    entry, sl, exitp = float(r["entry_price"]), float(r["sl"]), float(r["exit_price"])
+    denom = (entry - sl) if r["direction"] == "BUY" else (sl - entry)
+    if denom == 0:
+        return 0.0
+    return ((exitp - entry) / denom) if r["direction"] == "BUY" else ((entry - exitp) / denom)
+
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    n = len(results)
+    r_mult = np.array([_r_multiple(r) for r in results], dtype=np.float64)
+    pnl = np.array([r["pnl_percent"] for r in results], dtype=np.float64)
+    win = np.array([r["result"] == "WIN" for r in results], dtype=bool)
+    loss = np.array([r["result"] == "LOSS" for r in results], dtype=bool)
+    sum_win_r = float(r_mult[win].sum())
+    sum_loss_r = -float(r_mult[loss].sum())
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity if n else np.zeros(0)
+    return {
+        "trades": n,
+        "wins": int(win.sum()),
+        "losses": int(loss.sum()),
+        "win_rate": float(win.sum() / n * 100.0) if n else 0.0,
+        "profit_factor": (sum_win_r / sum_loss_r) if sum_loss_r > 0 else 9999.0,
+        "avg_r": float(r_mult.mean()) if n else 0.0,
+        "pnl_percent_cum": float(pnl.sum()),
+        "max_drawdown_pct": float(drawdown.max()) if n else 0.0,
+    }
+
+
+# -------------------------------------------------
+# Paylaşımlı bellek
+# -------------------------------------------------
+def _to_shm(arrays: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Dict[str, Tuple[int, str, int]]]:
+    """Dizileri tek bir SharedMemory bloğuna yaz → (shm, {ad: (offset, dtype, uzunluk)})."""
+    spec: Dict[str, Tuple[int, str, int]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset = (offset + 7) // 8 * 8
+        spec[name] = (offset, arr.dtype.str, len(arr))
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+        off, dt, n = spec[name]
+        np.ndarray((n,), dtype=dt, buffer=shm.buf, offset=off)[:] = arr
+    return shm, spec
+
+
+def _from_shm(buf, spec: Dict[str, Tuple[int, str, int]]) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray((n,), dtype=dt, buffer=buf, offset=off) for name, (off, dt, n) in spec.items()}
+
+
+def _column(data, name: str, dtype) -> np.ndarray:
+    """DataFrame kolonu ya da OhlcArchive (memmap) kolonu → ndarray (arşivde dtype uyuyorsa kopya yok)."""
+    if isinstance(data, pd.DataFrame):
+        return data[name].to_numpy(dtype=dtype)
+    return np.asarray(data.columns[name], dtype=dtype)
+
+
+def open_times(data) -> np.ndarray:
+    """int64 epoch-ms açılış zamanları (DataFrame: open_time ya da timestamp; arşiv: open_time)."""
+    if isinstance(data, pd.DataFrame) and "open_time" not in data.columns:
+        return data["timestamp"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+    return _column(data, "open_time", np.int64)
+
+
+def prepare_symbol(data, lookback: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Paylaşılacak diziler: open_time + OHLC + swing index'leri (swing'ler bir kez hesaplanır).
+    data: OHLC DataFrame ya da services.ohlc_archive.OhlcArchive (memmap kolonlar doğrudan
+    paylaşımlı belleğe kopyalanır; arada pandas frame kurulmaz).
+    """
+    high = _column(data, "high", np.float64)
+    low = _column(data, "low", np.float64)
+    hi_idx, lo_idx = swing_point_indices(high, low, lookback)
+    return {
+        "open_time": open_times(data),
+        "open": _column(data, "open", np.float64),
+        "high": high,
+        "low": low,
+        "close": _column(data, "close", np.float64),
+        "swing_hi": hi_idx.astype(np.int64),
+        "swing_lo": lo_idx.astype(np.int64),
+    }
+
+
+# -------------------------------------------------
+# İşçi tarafı
+# -------------------------------------------------
+_WORKER_SHM: Dict[str, Tuple[str, Dict]] = {}      # symbol → (shm adı, spec)
+_WORKER_FRAMES: Dict[str, Tuple] = {}              # symbol → (df, paylaşımlı diziler)
+_WORKER_CACHE: Dict[str, Tuple] = {}               # symbol → (signals, swing_highs, swing_lows)
+_WORKER_HANDLES: List[shared_memory.SharedMemory] = []
+
+
+def worker_init(shm_specs: Dict[str, Tuple[str, Dict]]) -> None:
+    _WORKER_SHM.update(shm_specs)
+
+
+def attach_symbol(symbol: str) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """Sembol verisini paylaşımlı bellekten bir kez kur (işçi başına): (df, diziler)."""
+    if symbol in _WORKER_FRAMES:
+        return _WORKER_FRAMES[symbol]
+    name, spec = _WORKER_SHM[symbol]
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER_HANDLES.append(shm)
+    a = _from_shm(shm.buf, spec)
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(a["open_time"], unit="ms"),
+        "open": a["open"], "high": a["high"], "low": a["low"], "close": a["close"],
+        "open_time": a["open_time"],
+    })
+    _WORKER_FRAMES[symbol] = (df, a)
+    return _WORKER_FRAMES[symbol]
+
+
+def swing_inputs(df: pd.DataFrame, hi_idx: np.ndarray, lo_idx: np.ndarray):
+    """Swing index'lerinden run_backtest girdileri: (signals, swing_highs, swing_lows); HL → BUY, LH → SELL."""
+    ts = df["timestamp"]
+    # detect_swing_points ile aynı biçim: (pd.Timestamp, değer)
+    swing_highs = list(zip(ts.iloc[hi_idx].tolist(), df["high"].to_numpy()[hi_idx]))
+    swing_lows = list(zip(ts.iloc[lo_idx].tolist(), df["low"].to_numpy()[lo_idx]))
+    trend_points = classify_trend_structure(swing_highs, swing_lows)
+    signals = [(t, v, "BUY" if lab == "HL" else "SELL") for t, v, lab in trend_points if lab in ("HL", "LH")]
+    return signals, swing_highs, swing_lows
+
+
+def _symbol_inputs(symbol: str):
+    df, a = attach_symbol(symbol)
+    if symbol not in _WORKER_CACHE:
+        _WORKER_CACHE[symbol] = swing_inputs(df, a["swing_hi"], a["swing_lo"])
+    return (df,) + _WORKER_CACHE[symbol]
+
+
+@contextmanager
+def share_frames(frames: Dict[str, Any], lookback: int = 3):
+    """{symbol: df | OhlcArchive} → paylaşımlı bellek {SYMBOL: (shm adı, spec)}; çıkışta bloklar kapatılıp silinir."""
+    handles: List[shared_memory.SharedMemory] = []
+    shm_specs: Dict[str, Tuple[str, Dict]] = {}
+    try:
+        for symbol, df in frames.items():
+            shm, spec = _to_shm(prepare_symbol(df, lookback=lookback))
+            handles.append(shm)
+            shm_specs[symbol.upper()] = (shm.name, spec)
+        yield shm_specs
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+
+def _run_task(symbol: str, combos: List[Tuple[int, Dict[str, Any]]], base_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    df, signals, swing_highs, swing_lows = _symbol_inputs(symbol)
+    rows = []
+    for combo_id, params in combos:
+        kwargs = dict(base_params, **params)
+        kwargs.setdefault("symbol", symbol)
+        try:
+            res = run_backtest(signals=signals, df=df, swing_highs=swing_highs, swing_lows=swing_lows, **kwargs)
+            summary = summarize_results(res)
+        except Exception as e:
+            print(f"⚠️ [sweep] {symbol} #{combo_id} {params}: {e}")
+            rows.append(dict(symbol=symbol, combo_id=combo_id, params=json.dumps(params, sort_keys=True),
+                             error=f"{type(e).__name__}: {e}"))
+            continue
+        rows.append(dict(symbol=symbol, combo_id=combo_id, params=json.dumps(params, sort_keys=True), **summary))
+    return rows
+
+
+# -------------------------------------------------
+# Tarama
+# -------------------------------------------------
+def run_sweep(
+    frames: Dict[str, Any],
+    grid: Dict[str, Iterable[Any]],
+    out_csv: Optional[str] = None,
+    base_params: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    combos_per_task: int = COMBOS_PER_TASK,
+    lookback: int = 3,
+    verbose: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    frames: {symbol: OHLC DataFrame | OhlcArchive}; grid: {run_backtest parametresi: [değerler]}.
+    Sonuç satırlarını tamamlandıkça üretir (generator); out_csv verilirse aynı anda CSV'ye akıtır.
+    Hata veren kombinasyonlar da satır olarak gelir (yalnızca symbol/combo_id/params/error dolu).
+    """
+    combos = list(enumerate(expand_grid(grid)))
+    base_params = dict(base_params or {})
+    max_workers = int(max_workers or SWEEP_MAX_WORKERS or os.cpu_count() or 1)
+
+    f = writer = None
+    with share_frames(frames, lookback=lookback) as shm_specs:
+        try:
+            if out_csv:
+                d = os.path.dirname(out_csv)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                f = open(out_csv, "w", newline="", encoding="utf-8")
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+                writer.writeheader()
+
+            tasks = [
+                (symbol, combos[i:i + combos_per_task])
+                for symbol in shm_specs
+                for i in range(0, len(combos), combos_per_task)
+            ]
+            t0 = time.perf_counter()
+            done = failed = 0
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=worker_init, initargs=(shm_specs,)) as pool:
+                futs = [pool.submit(_run_task, s, chunk, base_params) for s, chunk in tasks]
+                for fut in as_completed(futs):
+                    for row in fut.result():
+                        if row.get("error"):
+                            failed += 1
+                        if writer is not None:
+                            writer.writerow(row)
+                        yield row
+                    if f is not None:
+                        f.flush()
+                    done += 1
+                    if verbose and (done % 20 == 0 or done == len(tasks)):
+                        print(f"[sweep] {done}/{len(tasks)} görev ({time.perf_counter() - t0:.1f} sn)")
+            if verbose and failed:
+                print(f"⚠️ [sweep] {failed}/{len(combos) * len(shm_specs)} kombinasyon hata verdi "
+                      f"(error kolonu dolu satırlar)")
+        finally:
+            if f is not None:
+                f.close()
+
+
+if __name__ == "__main__":
+    from services.binance_service import load_history
+
+    parser = argparse.ArgumentParser(description="run_backtest parametre taraması (paralel)")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--start", required=True, help="yerel depodan (önce services.history_downloader)")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--grid", nargs="+", required=True, help="ad=v1,v2 ... (run_backtest parametreleri)")
+    parser.add_argument("--base", default="{}", help='sabit parametreler (JSON), örn. {"fee_roundtrip": 0.001}')
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep_results.csv")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--archive", action="store_true",
+                        help="Veriyi memmap kolon arşivinden oku (services/ohlc_archive; pandas kopyası yok)")
+    args = parser.parse_args()
+
+    frames = {}
+    for s in args.symbols:
+        if args.archive:
+            from services.ohlc_archive import open_archive
+            from services.intervals import to_epoch_ms
+            arc = open_archive(s, args.interval)
+            df = arc.between(to_epoch_ms(args.start), to_epoch_ms(args.end) if args.end else None) if arc else None
+        else:
+            df = load_history(s, args.interval, start=args.start, end=args.end)
+        if df is None or len(df) == 0:
+            print(f"⚠️ [sweep] {s} {args.interval}: depoda veri yok, atlandı")
+            continue
+        frames[s.upper()] = df
+
+    rows = list(run_sweep(frames, parse_grid_args(args.grid), out_csv=args.out,
+                          base_params=json.loads(args.base), max_workers=args.workers))
+    ok = [r for r in rows if not r.get("error")]
+    failed = len(rows) - len(ok)
+    print(f"[sweep] {len(rows)} satır ({failed} hatalı kombinasyon) → {args.out}")
+    if ok:
+        top = pd.DataFrame(ok).sort_values("pnl_percent_cum", ascending=False).head(args.top)
+        print(top[["symbol", "params", "trades", "win_rate", "profit_factor", "pnl_percent_cum", "max_drawdown_pct"]]
+              .to_string(index=False))
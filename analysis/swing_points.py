@@ -1,15 +1,45 @@
-def detect_swing_points(df, lookback=3):
-    swing_highs = []
-    swing_lows = []
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _neighbour_extremes(x: np.ndarray, lookback: int, fn):
+    """Her i ∈ [L, n-L) için solundaki ve sağındaki L barın max/min'i (i hariç)."""
+    w = fn(sliding_window_view(x, lookback), axis=1)   # w[k] = fn(x[k:k+L])
+    n = len(x)
+    left = w[: n - 2 * lookback]                        # x[i-L : i]
+    right = w[lookback + 1 : n - lookback + 1]          # x[i+1 : i+L+1]
+    return left, right
 
-    for i in range(lookback, len(df) - lookback):
-        is_swing_high = all(df["high"].iloc[i] > df["high"].iloc[i - j] and df["high"].iloc[i] > df["high"].iloc[i + j] for j in range(1, lookback + 1))
-        is_swing_low = all(df["low"].iloc[i] < df["low"].iloc[i - j] and df["low"].iloc[i] < df["low"].iloc[i + j] for j in range(1, lookback + 1))
 
-        if is_swing_high:
-            swing_highs.append((df["timestamp"].iloc[i], df["high"].iloc[i]))
+def swing_point_indices(high, low, lookback=3):
+    """
+    Swing high/low bar index'leri (vektörel, O(n·L) yerine tek geçişli NumPy):
+      high[i] tüm ±lookback komşularından KESİN büyükse swing high, low[i] KESİN küçükse swing low.
+    Eşitlik swing sayılmaz; NaN içeren pencere swing üretmez (eski döngüyle aynı).
+    high/low herhangi bir dizi olabilir (ör. OhlcArchive.high memmap'i) — float64 ise kopyalanmaz.
+    """
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    n = len(h)
+    if lookback < 1 or n < 2 * lookback + 1:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy()
+    center = slice(lookback, n - lookback)
+    with np.errstate(invalid="ignore"):
+        hl, hr = _neighbour_extremes(h, lookback, np.max)
+        is_high = (h[center] > hl) & (h[center] > hr)
+        ll, lr = _neighbour_extremes(l, lookback, np.min)
+        is_low = (l[center] < ll) & (l[center] < lr)
+    return np.flatnonzero(is_high) + lookback, np.flatnonzero(is_low) + lookback
+
+
+def detect_swing_points(df, lookback=3):
+    hi_idx, lo_idx = swing_point_indices(df["high"].to_numpy(), df["low"].to_numpy(), lookback)
 
-        if is_swing_low:
-            swing_lows.append((df["timestamp"].iloc[i], df["low"].iloc[i]))
+    ts = df["timestamp"]
+    highs = df["high"].to_numpy()
+    lows = df["low"].to_numpy()
+    swing_highs = list(zip(ts.iloc[hi_idx].tolist(), highs[hi_idx]))
+    swing_lows = list(zip(ts.iloc[lo_idx].tolist(), lows[lo_idx]))
 
     return swing_highs, swing_lows
@@ -0,0 +1,180 @@
+# analysis/swing_stream.py
+# Artımlı swing / trend yapısı: her kapanan bar O(lookback) işle işlenir.
+# Çıktı, aynı barlar üzerinde detect_swing_points + classify_trend_structure ile birebir aynıdır:
+#   - bar i, ±lookback komşusundan KESİN büyük/küçükse swing (eşitlik swing değil)
+#   - bar i ancak i+lookback geldiğinde teyit edilir
+#   - aynı bar hem high hem low ise önce high, sonra low etiketlenir (batch'teki kararlı sıralama)
+# Etiketler eklenirken bir kez hesaplanır; pencere sorgusu yeniden sınıflandırmaz (bisect + dilim).
+# Kalıcı duruma yalnızca kesinleşmiş barlar girer (window(settled_until=...)); kesinleşmemiş kuyruk
+# her çağrıda geçici olarak değerlendirilir, detektörün gördüğü kuyruk değişmişse baştan kurulur.
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+TrendPoint = Tuple[Any, Any, str]
+
+
+class SwingTrendDetector:
+    def __init__(self, lookback: int = 3, max_points: int = 5000):
+        self.lookback = int(lookback)
+        self.max_points = int(max_points)
+        self._bars: deque = deque(maxlen=2 * self.lookback + 1)   # (t, high, low)
+        self.last_time = None
+        self.bar_count = 0
+        self.swing_highs: List[Tuple[Any, Any]] = []
+        self.swing_lows: List[Tuple[Any, Any]] = []
+        self.trend_points: List[TrendPoint] = []
+        # bisect için zaman dizileri (listelerle birlikte büyür / kırpılır)
+        self._high_times: List[Any] = []
+        self._low_times: List[Any] = []
+        self._point_times: List[Any] = []
+        self._prev_high = None
+        self._prev_low = None
+
+    def reset(self) -> None:
+        self.__init__(self.lookback, self.max_points)
+
+    # -------------------------------------------------
+    # Güncelleme
+    # -------------------------------------------------
+    def _confirm(self, bars, prev_high, prev_low):
+        """bars (2L+1 bar) ortasındaki bar swing mi → (yeni noktalar, prev_high, prev_low); durum değişmez."""
+        L = self.lookback
+        ct, ch, cl = bars[L]
+        others = [b for k, b in enumerate(bars) if k != L]
+        out: List[TrendPoint] = []
+        if all(ch > b[1] for b in others):
+            out.append((ct, ch, "HH?" if prev_high is None else ("HH" if ch > prev_high else "LH")))
+            prev_high = ch
+        if all(cl < b[2] for b in others):
+            out.append((ct, cl, "HL?" if prev_low is None else ("HL" if cl > prev_low else "LL")))
+            prev_low = cl
+        return out, prev_high, prev_low
+
+    def update(self, t, high, low) -> List[TrendPoint]:
+        """Bir kapanmış (kesinleşmiş) bar ekle → bu barla teyit edilen yeni trend noktaları."""
+        self._bars.append((t, high, low))
+        self.last_time = t
+        self.bar_count += 1
+        if len(self._bars) < self._bars.maxlen:
+            return []
+
+        out, self._prev_high, self._prev_low = self._confirm(self._bars, self._prev_high, self._prev_low)
+        for pt in out:
+            if pt[2] in ("HH?", "HH", "LH"):
+                self.swing_highs.append(pt[:2])
+                self._high_times.append(pt[0])
+            else:
+                self.swing_lows.append(pt[:2])
+                self._low_times.append(pt[0])
+            self.trend_points.append(pt)
+            self._point_times.append(pt[0])
+        if out:
+            self._trim()
+        return out
+
+    def _trim(self) -> None:
+        for seq, times in ((self.swing_highs, self._high_times), (self.swing_lows, self._low_times),
+                           (self.trend_points, self._point_times)):
+            if len(seq) > 2 * self.max_points:
+                del seq[: len(seq) - self.max_points]
+                del times[: len(times) - self.max_points]
+
+    def _tail_changed(self, df) -> bool:
+        """Detektörün tuttuğu son barlar df'te farklı değerlerle (ya da eksik) mi geliyor (depo kuyruğu düzeltildi)?"""
+        ts = df["timestamp"]
+        highs, lows = df["high"].to_numpy(), df["low"].to_numpy()
+        for t, h, l in self._bars:
+            i = int(ts.searchsorted(t, side="left"))
+            if i < len(ts) and ts.iloc[i] == t:
+                if highs[i] != h or lows[i] != l:
+                    return True
+            elif i > 0:
+                return True         # df'in aralığında ama yok
+        return False
+
+    def sync(self, df) -> List[TrendPoint]:
+        """
+        df (timestamp, high, low; sıralı kesinleşmiş barlar) içindeki yeni barları işle.
+        df, detektörün gördüğünden daha eskiye bitiyorsa (farklı seri) ya da detektörün tuttuğu son barlar
+        df'te değişmişse baştan kurulur.
+        """
+        ts = df["timestamp"]
+        if len(ts) == 0:
+            return []
+        if self.last_time is not None and (ts.iloc[-1] < self.last_time or self._tail_changed(df)):
+            self.reset()
+        start = 0 if self.last_time is None else int(ts.searchsorted(self.last_time, side="right"))
+        out: List[TrendPoint] = []
+        if start >= len(ts):
+            return out
+        t_new = ts.iloc[start:].tolist()
+        h_new = df["high"].to_numpy()[start:]
+        l_new = df["low"].to_numpy()[start:]
+        for t, h, l in zip(t_new, h_new, l_new):
+            out.extend(self.update(t, h, l))
+        return out
+
+    def _provisional(self, df) -> List[TrendPoint]:
+        """df'in detektörün son barından sonraki (kesinleşmemiş) barlarıyla teyit olan noktalar; durum değişmez."""
+        ts = df["timestamp"]
+        start = 0 if self.last_time is None else int(ts.searchsorted(self.last_time, side="right"))
+        bars = deque(self._bars, maxlen=self._bars.maxlen)
+        prev_high, prev_low = self._prev_high, self._prev_low
+        out: List[TrendPoint] = []
+        for t, h, l in zip(ts.iloc[start:].tolist(), df["high"].to_numpy()[start:], df["low"].to_numpy()[start:]):
+            bars.append((t, h, l))
+            if len(bars) == bars.maxlen:
+                pts, prev_high, prev_low = self._confirm(bars, prev_high, prev_low)
+                out.extend(pts)
+        return out
+
+    # -------------------------------------------------
+    # Pencere sorguları
+    # -------------------------------------------------
+    def swings_between(self, start_t, end_t) -> Tuple[List[Tuple[Any, Any]], List[Tuple[Any, Any]]]:
+        """start_t ≤ t ≤ end_t aralığındaki swing'ler (zaman sıralı)."""
+        h, l = self._high_times, self._low_times
+        return (self.swing_highs[bisect_left(h, start_t): bisect_right(h, end_t)],
+                self.swing_lows[bisect_left(l, start_t): bisect_right(l, end_t)])
+
+    def window(self, df, settled_until=None) -> Tuple[List[Tuple[Any, Any]], List[Tuple[Any, Any]], List[TrendPoint]]:
+        """
+        df'i senkronla ve detect_swing_points(df) + classify_trend_structure ile AYNI sonucu döndür:
+        pencerenin ilk/son `lookback` barı batch'te swing olamayacağı için dışarıda bırakılır.
+        Etiketler saklanan etiketlerdir; batch'te pencerenin ilk high/low'u önceki swing'i göremeyeceği için
+        yalnızca o ikisi "HH?" / "HL?" yapılır (yeniden sınıflandırma yok).
+        settled_until: bu zamandan SONRA açılan barlar kalıcı duruma alınmaz (henüz kesinleşmemiş olabilir);
+        her çağrıda geçici olarak değerlendirilir → sonraki çekimde değerleri değişse de detektör kaymaz.
+        """
+        L = self.lookback
+        ts = df["timestamp"]
+        n_settled = len(ts) if settled_until is None else int(ts.searchsorted(settled_until, side="right"))
+        self.sync(df.iloc[:n_settled])
+        if len(df) < 2 * L + 1:
+            return [], [], []
+        lo_t, hi_t = ts.iloc[L], ts.iloc[len(ts) - 1 - L]
+        highs, lows = self.swings_between(lo_t, hi_t)
+        p = self._point_times
+        points = self.trend_points[bisect_left(p, lo_t): bisect_right(p, hi_t)]
+        if n_settled < len(ts):
+            extra = [pt for pt in self._provisional(df) if lo_t <= pt[0] <= hi_t]
+            for pt in extra:
+                (highs if pt[2] in ("HH?", "HH", "LH") else lows).append(pt[:2])
+            points = points + extra
+
+        seen_high = seen_low = False
+        for k, (t, v, label) in enumerate(points):
+            if seen_high and seen_low:
+                break
+            if label in ("HH?", "HH", "LH"):
+                if not seen_high:
+                    points[k] = (t, v, "HH?")
+                    seen_high = True
+            elif not seen_low:
+                points[k] = (t, v, "HL?")
+                seen_low = True
+        return highs, lows, points
+
+    def last_trend_point(self) -> Optional[TrendPoint]:
+        return self.trend_points[-1] if self.trend_points else None
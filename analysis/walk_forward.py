@@ -0,0 +1,275 @@
+# analysis/walk_forward.py
+# Walk-forward optimizasyon: uzun geçmiş → (train, test) pencereleri (kayan ya da çapalı).
+# - Her fold'da parametre ızgarası train penceresinde denenir, en iyi kombinasyon sonraki test
+#   penceresinde (örneklem dışı, OOS) koşturulur
+# - Fold'lar süreç havuzunda paralel; OHLC + swing index'leri analysis.sweep ile paylaşımlı bellekte
+# - Swing'ler tüm seri için BİR KEZ hesaplanır: [a, b) penceresindeki swing'ler = index'i [a+L, b-L) olanlar
+#   (swing kontrolü yalnızca ±L komşuya bakar → pencereye detect_swing_points uygulamakla birebir aynı);
+#   etiketler (HH/HL/LH/LL) pencere içindeki swing'lerden yeniden sınıflandırılır
+# - Rapor: fold tablosu (seçilen parametreler, train/test metrikleri), birleştirilmiş OOS equity, parametre kararlılığı
+#
+# Kullanım:
+#   python -m analysis.walk_forward --symbol ETHUSDT --interval 1h --start 2021-01-01 \
+#       --train-bars 4000 --test-bars 1000 --grid rr_ratio=1.5,2,3 sl_buffer_pct=0.003,0.005
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.backtest import run_backtest
+from analysis.sweep import (
+    SWEEP_MAX_WORKERS, attach_symbol, expand_grid, open_times, parse_grid_args, share_frames,
+    summarize_results, swing_inputs, worker_init,
+)
+
+Fold = Tuple[int, int, int, int]   # (train_start, train_end, test_start, test_end) — bar index, end hariç
+
+DEFAULT_WARMUP_BARS = 300          # test penceresinden önce swing/HTF geçmişi için eklenen bar sayısı
+DEFAULT_MAX_FUTURE_BARS = 20       # run_backtest varsayılanı; OOS çıkışları için test sonrası bar payı
+
+
+def make_folds(n_bars: int, train_bars: int, test_bars: int, step: Optional[int] = None,
+               anchored: bool = False) -> List[Fold]:
+    """
+    Kayan: train [k·step, k·step+train), test hemen ardından `test_bars` bar.
+    Çapalı (anchored=True): train hep 0'dan başlar, sonu step kadar ilerler.
+    Son test penceresi veri sonunu aşıyorsa fold üretilmez.
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("train_bars ve test_bars pozitif olmalı")
+    step = int(step or test_bars)
+    folds: List[Fold] = []
+    k = 0
+    while True:
+        tr_end = train_bars + k * step
+        te_end = tr_end + test_bars
+        if te_end > n_bars:
+            break
+        tr_start = 0 if anchored else tr_end - train_bars
+        folds.append((tr_start, tr_end, tr_end, te_end))
+        k += 1
+    return folds
+
+
+def _window_inputs(df: pd.DataFrame, a: Dict[str, np.ndarray], start: int, end: int,
+                   signal_from: int, lookback: int, signal_to: Optional[int] = None):
+    """
+    [start, end) penceresi için (df, signals, swing_highs, swing_lows);
+    sinyaller [signal_from, signal_to) barlarından (signal_to verilmezse pencere sonuna kadar).
+    """
+    hi, lo = a["swing_hi"], a["swing_lo"]
+    hi = hi[(hi >= start + lookback) & (hi < end - lookback)] - start
+    lo = lo[(lo >= start + lookback) & (lo < end - lookback)] - start
+    wdf = df.iloc[start:end].reset_index(drop=True)
+    signals, swing_highs, swing_lows = swing_inputs(wdf, hi, lo)
+    if signal_from > start:
+        t0 = wdf["timestamp"].iloc[signal_from - start]
+        signals = [s for s in signals if s[0] >= t0]
+    if signal_to is not None and signal_to < end:
+        t1 = wdf["timestamp"].iloc[signal_to - start]
+        signals = [s for s in signals if s[0] < t1]
+    return wdf, signals, swing_highs, swing_lows
+
+
+def _score(summary: Dict[str, float], objective: str, min_trades: int) -> float:
+    if summary["trades"] < min_trades:
+        return float("-inf")
+    return float(summary[objective])
+
+
+def _run_fold(symbol: str, fold_id: int, fold: Fold, combos: List[Dict[str, Any]], base_params: Dict[str, Any],
+              objective: str, min_trades: int, warmup_bars: int, lookback: int) -> Dict[str, Any]:
+    df, a = attach_symbol(symbol)
+    tr_start, tr_end, te_start, te_end = fold
+    base = dict(base_params)
+    base.setdefault("symbol", symbol)
+
+    tdf, tsig, thi, tlo = _window_inputs(df, a, tr_start, tr_end, tr_start, lookback)
+    best_params, best_summary, best_score = None, None, float("-inf")
+    errors: List[str] = []
+    for params in combos:
+        kw = dict(base, **params)
+        try:
+            summary = summarize_results(run_backtest(tsig, tdf, thi, tlo, **kw))
+        except Exception as e:
+            print(f"⚠️ [walk_forward] {symbol} fold {fold_id} {params}: {e}")
+            errors.append(f"{json.dumps(params, sort_keys=True)}: {type(e).__name__}: {e}")
+            continue
+        score = _score(summary, objective, min_trades)
+        # min_trades'i hiçbir kombinasyon sağlamazsa (hepsi -inf) seçim yapılmaz
+        if score > best_score:
+            best_params, best_summary, best_score = params, summary, score
+
+    out = {"symbol": symbol, "fold": fold_id, "train_start": tr_start, "train_end": tr_end,
+           "test_start": te_start, "test_end": te_end, "params": best_params,
+           "selected": best_params is not None, "failed_combos": len(errors), "errors": errors,
+           "train": best_summary, "test": None, "oos_trades": []}
+    if best_params is None:
+        return out
+
+    # Girişler yalnızca [te_start, te_end); çıkışlar için fiyat penceresi max_future_bars kadar uzatılır
+    # (fold sonuna yakın işlemler yapay MAX_BARS kapanışına zorlanmasın)
+    kw = dict(base, **best_params)
+    horizon = int(kw.get("max_future_bars", DEFAULT_MAX_FUTURE_BARS)) + 1
+    x_end = min(len(df), te_end + horizon)
+    xdf, xsig, xhi, xlo = _window_inputs(df, a, max(0, te_start - warmup_bars), x_end, te_start, lookback,
+                                         signal_to=te_end)
+    oos = run_backtest(xsig, xdf, xhi, xlo, **kw)
+    out["test"] = summarize_results(oos)
+    out["oos_trades"] = [dict(r, fold=fold_id) for r in oos]
+    return out
+
+
+def parameter_stability(fold_params: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Parametre başına: farklı değer sayısı, en sık değer ve payı, (sayısal ise) ortalama / std."""
+    rows = []
+    keys = sorted({k for p in fold_params for k in p})
+    for k in keys:
+        vals = [p.get(k) for p in fold_params]
+        mode, cnt = Counter(map(json.dumps, vals)).most_common(1)[0]
+        row = {"param": k, "distinct": len(set(map(json.dumps, vals))), "mode": json.loads(mode),
+               "mode_share": cnt / len(vals), "mean": None, "std": None}
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in vals):
+            row["mean"], row["std"] = float(np.mean(vals)), float(np.std(vals))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["param", "distinct", "mode", "mode_share", "mean", "std"])
+
+
+def run_walk_forward(
+    df,
+    grid: Dict[str, Iterable[Any]],
+    train_bars: int,
+    test_bars: int,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    symbol: str = "SYMBOL",
+    base_params: Optional[Dict[str, Any]] = None,
+    objective: str = "pnl_percent_cum",
+    min_trades: int = 10,
+    warmup_bars: int = DEFAULT_WARMUP_BARS,
+    max_workers: Optional[int] = None,
+    lookback: int = 3,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    df: OHLC DataFrame ya da services.ohlc_archive.OhlcArchive (memmap; doğrudan paylaşımlı belleğe alınır).
+    Dönen sözlük:
+      folds       : DataFrame (fold başına seçilen parametreler + train/test özetleri)
+      oos_trades  : DataFrame (tüm test pencerelerinin işlemleri, zaman sıralı) + equity (kümülatif PnL %)
+      oos_summary : birleştirilmiş OOS özeti
+      stability   : parametre kararlılığı tablosu
+      failed_combos: hata veren (fold × kombinasyon) train koşusu sayısı (ayrıntı: folds.errors)
+    """
+    folds = make_folds(len(df), train_bars, test_bars, step=step, anchored=anchored)
+    if not folds:
+        raise ValueError(f"Veri yetersiz: {len(df)} bar < train_bars + test_bars")
+    combos = expand_grid(grid)
+    symbol = symbol.upper()
+    max_workers = int(max_workers or SWEEP_MAX_WORKERS or os.cpu_count() or 1)
+
+    results: List[Dict[str, Any]] = []
+    with share_frames({symbol: df}, lookback=lookback) as shm_specs:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(folds)),
+                                 initializer=worker_init, initargs=(shm_specs,)) as pool:
+            futs = [pool.submit(_run_fold, symbol, i, f, combos, dict(base_params or {}),
+                                objective, min_trades, warmup_bars, lookback)
+                    for i, f in enumerate(folds)]
+            for fut in as_completed(futs):
+                r = fut.result()
+                results.append(r)
+                if verbose:
+                    if not r["selected"]:
+                        print(f"[walk_forward] fold {r['fold']}: seçim yok (min_trades={min_trades} sağlayan "
+                              f"kombinasyon yok, {r['failed_combos']} hatalı) → OOS atlandı")
+                        continue
+                    t = r["test"] or {}
+                    print(f"[walk_forward] fold {r['fold']}: {r['params']} → OOS "
+                          f"{t.get('trades', 0)} işlem, {t.get('pnl_percent_cum', 0.0):.2f}%")
+    results.sort(key=lambda r: r["fold"])
+    failed = sum(r["failed_combos"] for r in results)
+    if verbose and failed:
+        print(f"⚠️ [walk_forward] {failed}/{len(combos) * len(folds)} (fold × kombinasyon) train koşusu hata verdi "
+              f"(fold tablosunda failed_combos / errors)")
+
+    ts = pd.Series(pd.to_datetime(open_times(df), unit="ms"))
+    fold_rows = []
+    for r in results:
+        row = {"fold": r["fold"], "selected": r["selected"], "failed_combos": r["failed_combos"],
+               "errors": "; ".join(r["errors"]) or None,
+               "train_from": ts.iloc[r["train_start"]], "train_to": ts.iloc[r["train_end"] - 1],
+               "test_from": ts.iloc[r["test_start"]], "test_to": ts.iloc[r["test_end"] - 1],
+               "params": json.dumps(r["params"], sort_keys=True) if r["params"] is not None else None}
+        for phase in ("train", "test"):
+            for k, v in (r[phase] or {}).items():
+                row[f"{phase}_{k}"] = v
+        fold_rows.append(row)
+
+    oos = [t for r in results for t in r["oos_trades"]]
+    oos_df = pd.DataFrame(oos)
+    if len(oos_df):
+        oos_df = oos_df.sort_values("entry_time", kind="stable").reset_index(drop=True)
+        oos_df["equity"] = oos_df["pnl_percent"].cumsum()
+    return {
+        "folds": pd.DataFrame(fold_rows),
+        "oos_trades": oos_df,
+        "oos_summary": summarize_results(oos_df.to_dict("records") if len(oos_df) else []),
+        "stability": parameter_stability([r["params"] for r in results if r["params"] is not None]),
+        "failed_combos": failed,
+    }
+
+
+if __name__ == "__main__":
+    from services.binance_service import load_history
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimizasyon (run_backtest)")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--start", required=True, help="yerel depodan (önce services.history_downloader)")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--train-bars", type=int, required=True)
+    parser.add_argument("--test-bars", type=int, required=True)
+    parser.add_argument("--step", type=int, default=None, help="varsayılan: test-bars")
+    parser.add_argument("--anchored", action="store_true", help="train penceresi hep baştan başlar")
+    parser.add_argument("--grid", nargs="+", required=True, help="ad=v1,v2 ... (run_backtest parametreleri)")
+    parser.add_argument("--base", default="{}", help="sabit parametreler (JSON)")
+    parser.add_argument("--objective", default="pnl_percent_cum",
+                        help="train'de maksimize edilecek özet metrik (örn. profit_factor, avg_r)")
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="walk_forward", help="çıktı dosyaları öneki")
+    parser.add_argument("--archive", action="store_true",
+                        help="Veriyi memmap kolon arşivinden oku (services/ohlc_archive; pandas kopyası yok)")
+    args = parser.parse_args()
+
+    if args.archive:
+        from services.ohlc_archive import open_archive
+        from services.intervals import to_epoch_ms
+        arc = open_archive(args.symbol, args.interval)
+        df = arc.between(to_epoch_ms(args.start), to_epoch_ms(args.end) if args.end else None) if arc else None
+    else:
+        df = load_history(args.symbol, args.interval, start=args.start, end=args.end)
+    if df is None or len(df) == 0:
+        raise SystemExit(f"⚠️ {args.symbol} {args.interval}: depoda veri yok")
+
+    rep = run_walk_forward(
+        df, parse_grid_args(args.grid), args.train_bars, args.test_bars, step=args.step,
+        anchored=args.anchored, symbol=args.symbol, base_params=json.loads(args.base),
+        objective=args.objective, min_trades=args.min_trades, max_workers=args.workers,
+    )
+    rep["folds"].to_csv(f"{args.out}_folds.csv", index=False)
+    rep["oos_trades"].to_csv(f"{args.out}_oos_trades.csv", index=False)
+    print("\n=== Parametre kararlılığı ===")
+    print(rep["stability"].to_string(index=False))
+    s = rep["oos_summary"]
+    print(f"\n=== OOS (birleştirilmiş) === işlem: {s['trades']}  win rate: {s['win_rate']:.2f}%  "
+          f"PF: {s['profit_factor']:.2f}  avg R: {s['avg_r']:.3f}  PnL: {s['pnl_percent_cum']:.2f}%  "
+          f"max DD: {s['max_drawdown_pct']:.2f}%")
+    if rep["failed_combos"]:
+        print(f"⚠️ {rep['failed_combos']} (fold × kombinasyon) train koşusu hata verdi → {args.out}_folds.csv")
@@ -1,11 +1,12 @@
 # ✅ main.py (GÜNCEL – gerçekçi backtest + repaint'siz live signal)
 
-from services.binance_service import get_klines
+from services.binance_service import get_klines, load_history
 from analysis.swing_points import detect_swing_points
 from analysis.trend_structure import classify_trend_structure
 from analysis.backtest import run_backtest
 from analysis.visualize import plot_signals
 from analysis.live_signal import get_live_signal
+from analysis.metrics import MetricsAccumulator
 
 def compute_r_multiple(row):
     """
@@ -31,9 +32,16 @@ def compute_r_multiple(row):
 symbol = "ETHUSDT"
 interval = "1h"
 limit = 500
+# Çok yıllık backtest: önce `python -m services.history_downloader --symbols ETHUSDT --intervals 1h --start 2021-01-01`
+# sonra burada başlangıç tarihini ver (örn. "2021-01-01") → veri ağsız, yerel depodan okunur.
+history_start = None
 
-print(f"Veri alınıyor: {symbol} - {interval} - {limit} mum")
-df = get_klines(symbol=symbol, interval=interval, limit=limit)
+if history_start:
+    print(f"Yerel depodan okunuyor: {symbol} - {interval} - {history_start} → bugün")
+    df = load_history(symbol, interval, start=history_start)
+else:
+    print(f"Veri alınıyor: {symbol} - {interval} - {limit} mum")
+    df = get_klines(symbol=symbol, interval=interval, limit=limit)
 
 # -------------------------------------------------
 # 2) Swing noktaları
@@ -95,32 +103,22 @@ results = run_backtest(
 # -------------------------------------------------
 # 6) Sonuçları yazdır (zengin metrikler)
 # -------------------------------------------------
-total_trades = len(results)
-wins     = sum(1 for r in results if r["result"] == "WIN")
-losses   = sum(1 for r in results if r["result"] == "LOSS")
-timeouts = sum(1 for r in results if r.get("exit_reason") == "TIMEOUT")
-win_rate = (wins / total_trades * 100.0) if total_trades else 0.0
-
-# R metrikleri (r_multiple yoksa dinamik hesapla)
-r_list = []
+# Tek geçiş: her işlem akümülatöre O(1) eklenir (r_multiple yoksa dinamik hesapla)
+acc = MetricsAccumulator(window=50)
 for r in results:
-    r_mult = r.get("r_multiple")
-    if r_mult is None:
-        r_mult = compute_r_multiple(r)
-        r["r_multiple"] = r_mult
-    r_list.append(r_mult)
-
-sum_win_r  = sum(r["r_multiple"] for r in results if r["result"] == "WIN")
-sum_loss_r = -sum(r["r_multiple"] for r in results if r["result"] == "LOSS")  # pozitifle
-profit_factor = (sum_win_r / sum_loss_r) if sum_loss_r > 0 else float("inf")
-avg_r = (sum(r_list) / total_trades) if total_trades else 0.0
-
-total_pnl_percent = sum(r["pnl_percent"] for r in results)
-
-print(f"Toplam İşlem: {total_trades}")
-print(f"Kazanılan: {wins}, Kaybedilen: {losses}, Timeout: {timeouts}")
-print(f"Win Rate: {win_rate:.2f}% | Profit Factor: {profit_factor:.2f} | Avg R: {avg_r:.2f}R")
-print(f"Toplam Yüzdelik Kar/Zarar (PnL%): {total_pnl_percent:.2f}%")
+    if r.get("r_multiple") is None:
+        r["r_multiple"] = compute_r_multiple(r)
+    acc.add_trade(r)
+m = acc.summary()
+
+print(f"Toplam İşlem: {m['trades']}")
+print(f"Kazanılan: {m['wins']}, Kaybedilen: {m['losses']}, Timeout: {m['timeouts']}")
+print(f"Win Rate: {m['win_rate']:.2f}% | Profit Factor: {m['profit_factor']:.2f} | Avg R: {m['avg_r']:.2f}R "
+      f"| Beklenti: {m['expectancy_pct']:.2f}%/işlem")
+print(f"Toplam Yüzdelik Kar/Zarar (PnL%): {m['pnl_percent_cum']:.2f}% | Max DD: {m['max_drawdown_pct']:.2f}% "
+      f"| En uzun kayıp serisi: {m['max_loss_streak']}")
+print(f"Son {m['rolling_trades']} işlem: Win Rate {m['rolling_win_rate']:.2f}% "
+      f"| PF {m['rolling_profit_factor']:.2f} | Avg R {m['rolling_avg_r']:.2f}R")
 
 for r in results:
     # telemetry (opsiyonel göstergeler)
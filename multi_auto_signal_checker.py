@@ -6,7 +6,8 @@ try:
 except Exception:
     pd = None
 
-from analysis.live_signal import get_live_signal
+from analysis.live_signal import get_live_signal, live_signal_requests, signal_frames
+from services.binance_service import get_klines_many
 
 def to_dt_utc(t):
     """signal['time'] -> timezone-aware UTC datetime"""
@@ -46,10 +47,16 @@ def run():
                 last_run_key = key
                 print(f"\n🕐 4 Saatlik kontrol ({now.strftime('%Y-%m-%d %H:%M')} UTC)")
 
+                # Tüm semboller için kline'lar eşzamanlı (tek tur) çekilir
+                sig_reqs = {s: live_signal_requests(s, interval="4h") for s in symbols}
+                frames = get_klines_many([r for reqs in sig_reqs.values() for r in reqs])
+
                 for symbol in symbols:
                     try:
+                        df, htf_df = signal_frames(sig_reqs[symbol], frames)
                         # Analiz kapanmış barlarda, entry yeni barın open'ı
-                        sig = get_live_signal(symbol=symbol, interval="4h")
+                        sig = get_live_signal(symbol=symbol, interval="4h",
+                                              df=df, htf_df=htf_df)
                         if sig:
                             t_utc = to_dt_utc(sig["time"])
                             print(f"📢 [{symbol}] SİNYAL: {sig['signal']}")
@@ -61,9 +68,6 @@ def run():
                     except Exception as e:
                         print(f"⚠️ [{symbol}] HATA: {e}")
 
-                    # Çok sembolde rate limit’e girmemek için minik bekleme
-                    time.sleep(0.2)
-
                 # Aynı saat içinde tekrar tetiklememek için biraz uyut
                 time.sleep(70)
 
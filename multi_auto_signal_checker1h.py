@@ -1,6 +1,7 @@
 import time
 from datetime import datetime, timezone
-from analysis.live_signal import get_live_signal
+from analysis.live_signal import get_live_signal, live_signal_requests, signal_frames
+from services.binance_service import get_klines_many
 
 try:
     import pandas as pd
@@ -38,9 +39,14 @@ def run():
         # Her saat başı tetikle
         if now.minute == 0 and now.second < 5:
             print(f"\n🕐 1 Saatlik kontrol ({now.strftime('%Y-%m-%d %H:%M')} UTC)")
+            # Tüm semboller için kline'lar eşzamanlı (tek tur) çekilir
+            sig_reqs = {s: live_signal_requests(s, interval="1h") for s in symbols}
+            frames = get_klines_many([r for reqs in sig_reqs.values() for r in reqs])
             for symbol in symbols:
                 try:
-                    sig = get_live_signal(symbol=symbol, interval="1h")
+                    df, htf_df = signal_frames(sig_reqs[symbol], frames)
+                    sig = get_live_signal(symbol=symbol, interval="1h",
+                                          df=df, htf_df=htf_df)
                     if sig:
                         t_utc = to_dt_utc(sig["time"])
                         print(f"📢 [{symbol}] SİNYAL: {sig['signal']}")
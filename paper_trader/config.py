@@ -36,3 +36,61 @@ AFTER_RUN_SLEEP_SEC = 1
 # En az risk yüzdesi (entry bazlı). Çok küçük riskli (fee/slippage'a duyarlı) işlemleri elemek için.
 MIN_RISK_PCT = 0.001   # %0.10
 
+
+# Yerel kline deposu (services/kline_store.py): get_klines önce buradan okur,
+# yalnızca eksik kuyruğu/delikleri Binance'ten çeker.
+KLINE_STORE_ENABLED = True
+KLINE_STORE_DIR = "kline_data"
+
+# Binance REST istemcisi (services/http_client.py)
+BINANCE_BASE_URL = "https://api.binance.com"   # yerel stand-in için: "http://127.0.0.1:8081" (veya env BINANCE_BASE_URL)
+HTTP_TIMEOUT = (3, 10)          # (connect, read) saniye
+HTTP_MAX_RETRIES = 4            # bağlantı hatası / 5xx / 429 / 418 sonrası tekrar
+HTTP_POOL_SIZE = 32             # keep-alive bağlantı havuzu
+BINANCE_WEIGHT_LIMIT = 6000     # REQUEST_WEIGHT / dakika
+BINANCE_WEIGHT_SAFETY = 0.8     # limitin bu oranında yavaşla (429/418 ban'ından önce)
+HTTP_MAX_BAN_WAIT_SEC = 60      # Retry-After bundan uzunsa bekleme, hata ver
+
+# Toplu kline çekimi (services/binance_service.get_klines_many)
+KLINES_MAX_CONCURRENCY = 16     # aynı anda uçuşta en fazla istek
+KLINES_WEIGHT_BUDGET = 200      # aynı anda uçuşta en fazla toplam Binance ağırlığı
+
+# Geçmiş indirici (services/history_downloader.py)
+HISTORY_MAX_WORKERS = 8         # paralel sayfa isteği
+
+# Memmap kolon arşivi (services/ohlc_archive.py)
+OHLC_ARCHIVE_DIR = "kline_data/archive"
+
+# WebSocket kline akışı (services/kline_stream.py, paper_trader --stream)
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+STREAM_GRACE_SEC = 3.0          # ilk bar kapanışından sonra diğer semboller için en fazla bekleme
+
+# Sembol filtreleri (services/binance_filters.py): tek toplu exchangeInfo, diskte TTL'li önbellek
+EXCHANGE_INFO_CACHE = "kline_data/exchange_info.json"
+EXCHANGE_INFO_TTL_SEC = 6 * 3600    # eskiyince arka planda yenilenir (eski değerler kullanılmaya devam eder)
+
+# Depolama arka ucu (paper_trader/storage.py): "csv" | "sqlite"
+# sqlite → tek dosyalık WAL veritabanı, index'li upsert'ler (ilk açılışta mevcut CSV'ler içeri alınır);
+# CSV'ler `python -m paper_trader.storage_sqlite --export` ile dökülür, equity CSV'ye satır eklenmeye devam eder
+STORAGE_BACKEND = "sqlite"
+SQLITE_PATH = f"{DATA_DIR}/paper_trader.db"
+
+# İşlem defteri (paper_trader/trade_book.py): açık işlemler bellekte, değişiklikler append-only journal'da
+# (turda bir fsync); SNAPSHOT_EVERY kayıtta bir kompakt snapshot → açılışta snapshot + journal kuyruğu okunur
+TRADE_BOOK_DIR = f"{DATA_DIR}/trade_book"
+TRADE_BOOK_SNAPSHOT_EVERY = 1000
+TRADE_BOOK_FSYNC_EVERY = 256
+
+# Artımlı metrikler (analysis/metrics.py): kayan pencere metrikleri için son N kapanan işlem
+METRICS_WINDOW = 50
+
+# Sinyal index'i (paper_trader/signal_index.py): tekrar kontrolü bellekte; en yeni sinyalden bu kadar saat
+# eski kayıtlar index'ten düşülür (None → hepsi tutulur). Depodaki kayıtlar etkilenmez.
+SIGNAL_INDEX_RETENTION_HOURS = 24 * 30
+
+# on_bar_open: sembol başına fetch + değerlendirme + sinyal için eşzamanlı worker sayısı
+# (yazmalar tur sonunda tek batch'te, SYMBOLS sırasıyla)
+PAPER_MAX_WORKERS = 8
+
+# Kline kesinleşme payı (services/binance_service.py): close_time'dan bu kadar saniye geçmeden bar depoya yazılmaz
+KLINE_SETTLE_SEC = 5
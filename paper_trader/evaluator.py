@@ -125,6 +125,10 @@ def _close_trade(trade: Dict[str, Any], exit_price: float, exit_reason: str,
 
     pnl_percent -= (fee_roundtrip * 100.0)
 
+    prev_close_time = trade.get("close_time_utc")
+    if isinstance(prev_close_time, float) and math.isnan(prev_close_time):
+        prev_close_time = ""   # CSV'den okunan boş hücre
+
     trade.update({
         "exit_price": float(exit_price),
         "exit_reason": exit_reason,
@@ -132,6 +136,6 @@ def _close_trade(trade: Dict[str, Any], exit_price: float, exit_reason: str,
         "r_multiple": float(r_multiple),
         "result": "WIN" if pnl_percent > 0 else ("LOSS" if pnl_percent < 0 else "FLAT"),
         "state": "CLOSED",
-        "close_time_utc": trade.get("close_time_utc") or _fmt_ts(exit_time),
+        "close_time_utc": prev_close_time or _fmt_ts(exit_time),
     })
     return trade
@@ -4,29 +4,58 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import time
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import pandas as pd
 
-from analysis.live_signal import get_live_signal
+from analysis.live_signal import get_live_signal, live_signal_requests, signal_frames
+from analysis.swing_stream import SwingTrendDetector
 from services.binance_service import get_klines
+from services.intervals import interval_to_ms
 from .config import (
     SYMBOLS, INTERVAL,
     FEE_ROUNDTRIP, CONSERVATIVE_DOUBLE_HIT, TIMEOUT_CLOSE, MAX_FUTURE_BARS,
     LOOP_SLEEP_SEC, AFTER_RUN_SLEEP_SEC
 )
-from .storage import (
-    ensure_data_dir, load_signals, load_trades, save_trades,
-    append_signal_row, upsert_trade_row, compute_metrics_from_trades, append_equity_row
-)
-
 try:
-    from .storage import TRADES_CSV, SIGNALS_CSV, EQUITY_CSV
+    from .config import STREAM_GRACE_SEC
 except Exception:
-    TRADES_CSV = "paper_trader_data/trades_live.csv"
-    SIGNALS_CSV = "paper_trader_data/signals_live.csv"
-    EQUITY_CSV = "paper_trader_data/equity_live.csv"
+    STREAM_GRACE_SEC = 3.0
+try:
+    from .config import PAPER_MAX_WORKERS
+except Exception:
+    PAPER_MAX_WORKERS = 8
+from .storage import (
+    ensure_data_dir, batch, storage_target,
+    append_signal_row, upsert_trade_row, upsert_trade_rows, append_equity_row
+)
 
 from .evaluator import evaluate_open_trade
+from .trade_book import TradeBook
+from .signal_index import SignalIndex
+
+# Sembol başına artımlı swing/trend detektörü (her turda yalnızca yeni kapanan bar işlenir)
+_DETECTORS = {}
+
+# Açık işlemlerin süreç içi defteri (ilk turda snapshot + journal'dan kurulur)
+_BOOK = None
+# Kaydedilmiş sinyallerin index'i (ilk turda storage'dan bir kez yüklenir)
+_SIGNALS = None
+
+
+def get_book():
+    global _BOOK
+    if _BOOK is None:
+        _BOOK = TradeBook.open()
+    return _BOOK
+
+
+def get_signal_index():
+    global _SIGNALS
+    if _SIGNALS is None:
+        _SIGNALS = SignalIndex.load()
+    return _SIGNALS
 
 
 def to_iso_utc(ts):
@@ -42,173 +71,226 @@ def make_trade_id(symbol, entry_time_iso):
     return f"{symbol}-{entry_time_iso}"
 
 
-def trade_exists(trades_df, trade_id):
-    if trades_df.empty:
-        return False
-    return (trades_df["trade_id"] == trade_id).any()
-
-
-def signal_already_logged(symbol, entry_time_iso):
-    sigs = load_signals()
-    if sigs.empty:
-        return False
-    mask = (sigs["symbol"] == symbol) & (sigs["timestamp_utc"] == entry_time_iso)
-    return mask.any()
-
-
-def has_open_trade_same_direction(trades_df, symbol, side):
-    if trades_df.empty:
-        return False
-    mask = (
-        (trades_df["symbol"] == symbol) &
-        (trades_df["state"] == "OPEN") &
-        (trades_df["side"] == side)
-    )
-    return mask.any()
-
-
-def on_bar_open():
-    trades_df = load_trades()
-    print(f"[DEBUG] load_trades(): {len(trades_df)} satır (kaynak: {TRADES_CSV})")
-
-    for symbol in SYMBOLS:
-        df = get_klines(symbol=symbol, interval=INTERVAL, limit=50)
-        if df is None or len(df) < 2:
-            print(f"[DEBUG] {symbol}: kline eksik (len<2), atlandı")
-            continue
-
-        closed_bar = df.iloc[-2]      # bir önceki kapanmış bar
-        live_bar   = df.iloc[-1]      # yeni bar
-        new_open   = float(live_bar["open"])
-        new_open_time = live_bar["timestamp"]
-
-        # --- Açık işlemleri değerlendir ---
-        open_mask = (trades_df["symbol"] == symbol) & (trades_df["state"] == "OPEN")
-        open_idx_list = trades_df[open_mask].index.tolist()
-
-        if open_idx_list:
-            print(f"[DEBUG] {symbol}: {len(open_idx_list)} OPEN trade değerlendiriliyor")
-
-        for idx in open_idx_list:
-            trade  = trades_df.loc[idx].to_dict()
-            before = trade.get("state", "UNKNOWN")
-            updated = evaluate_open_trade(
-                trade=trade,
-                closed_bar=closed_bar,
-                new_open=new_open,
-                fee_roundtrip=FEE_ROUNDTRIP,
-                conservative_double_hit=CONSERVATIVE_DOUBLE_HIT,
-                timeout_close=TIMEOUT_CLOSE,
-                max_future_bars=MAX_FUTURE_BARS,
-                new_open_time=new_open_time,   # gap çıkışlarının zamanı için
-            )
-
-            trades_df.loc[idx] = pd.Series(updated)
-            upsert_trade_row(updated)
-
-            after = updated.get("state", "UNKNOWN")
-            if before != after or updated.get("exit_reason"):
-                print(f"[DEBUG] {symbol}: {trade.get('trade_id')} {before}→{after} "
-                      f"reason={updated.get('exit_reason')} exit={updated.get('exit_price')}")
-
-        if open_idx_list:
-            trades_df = load_trades()
-            print(f"[DEBUG] {symbol}: evaluate sonrası reload → {len(trades_df)} satır")
-
-        # --- Yeni sinyal var mı? (BACKTEST PARAMLARIYLA) ---
-        sig = get_live_signal(
-    symbol=symbol,
-    interval=INTERVAL,
-    rr_ratio=1.5,
-    sl_buffer_pct=0.005,
-    max_tp_percent=0.05,
-    max_risk_pct=0.02,
-    max_bars_since_swing=50,
-    min_tp_percent=0.0,        # hâlâ kapalı (istersen açarız)
-    min_risk_pct=0.0,          # hâlâ kapalı
-    use_tick_quantize=False,   # backtest uyumu için kapalı
-    use_htf_filter=True,       # ✅ 4h trend filtresi aktif
-    htf_interval="4h",
-    htf_lookback=3,
-    htf_max_bars_since_swing=300,
+def trade_exists(book, trade_id):
+    return book.exists(trade_id)
+
+
+def signal_already_logged(signals, symbol, entry_time_iso):
+    return signals.contains(symbol, entry_time_iso)
+
+
+def has_open_trade_same_direction(trades, side):
+    """trades: sembolün bu turda değerlendirilmiş (güncel) işlemleri."""
+    return any(t.get("state") == "OPEN" and t.get("side") == side for t in trades)
+
+
+def _fetch_frames(reqs, stream=None, live_open=None):
+    """
+    Bir sembolün kline istekleri (HTF, LTF'ten üretilir → genelde tek istek); hata → None.
+    stream (KlineStream) verilirse pencere akış belleği + depodan kurulur (REST yok); yeni bar akıştan
+    STREAM_GRACE_SEC içinde gelmezse ya da depoda delik varsa o istek için get_klines'a düşülür.
+    """
+    out = {}
+    for symbol, interval, limit in reqs:
+        if stream is not None:
+            df = stream.window(symbol, interval, limit, live_open=live_open, timeout=STREAM_GRACE_SEC)
+            if df is not None:
+                out[(symbol, interval, limit)] = df
+                continue
+            print(f"[DEBUG] {symbol} {interval}: akış penceresi eksik → REST")
+        try:
+            out[(symbol, interval, limit)] = get_klines(symbol=symbol, interval=interval, limit=limit)
+        except Exception as e:
+            print(f"⚠️ [{symbol} {interval}] kline çekilemedi: {e}")
+            out[(symbol, interval, limit)] = None
+    return out
+
+
+def _process_symbol(symbol, open_trades, detector, stream=None, live_open=None):
+    """
+    Tek sembolün tur işi (worker'da çalışır): kline çek → açık işlemleri değerlendir → canlı sinyal.
+    Depoya / deftere yazmaz; sonuç on_bar_open'da SYMBOLS sırasıyla tek batch'te uygulanır.
+    Döner: {"log": [...], "updated": [trade...], "sig": dict|None} ya da veri yoksa None
+    """
+    reqs = live_signal_requests(symbol, interval=INTERVAL, use_htf_filter=True, htf_interval="4h")
+    df, htf_df = signal_frames(reqs, _fetch_frames(reqs, stream, live_open))
+    if df is None or len(df) < 2:
+        return None
+
+    log = []
+    closed_bar = df.iloc[-2]      # bir önceki kapanmış bar
+    live_bar   = df.iloc[-1]      # yeni bar
+    new_open   = float(live_bar["open"])
+    new_open_time = live_bar["timestamp"]
+
+    # --- Açık işlemleri değerlendir ---
+    if open_trades:
+        log.append(f"[DEBUG] {symbol}: {len(open_trades)} OPEN trade değerlendiriliyor")
+
+    updated_rows = []
+    for trade in open_trades:
+        before = trade.get("state", "UNKNOWN")
+        updated = evaluate_open_trade(
+            trade=dict(trade),
+            closed_bar=closed_bar,
+            new_open=new_open,
+            fee_roundtrip=FEE_ROUNDTRIP,
+            conservative_double_hit=CONSERVATIVE_DOUBLE_HIT,
+            timeout_close=TIMEOUT_CLOSE,
+            max_future_bars=MAX_FUTURE_BARS,
+            new_open_time=new_open_time,   # gap çıkışlarının zamanı için
+        )
+        updated_rows.append(updated)
+
+        after = updated.get("state", "UNKNOWN")
+        if before != after or updated.get("exit_reason"):
+            log.append(f"[DEBUG] {symbol}: {trade.get('trade_id')} {before}→{after} "
+                       f"reason={updated.get('exit_reason')} exit={updated.get('exit_price')}")
+
+    # --- Yeni sinyal var mı? (BACKTEST PARAMLARIYLA) ---
+    sig = get_live_signal(
+        symbol=symbol,
+        interval=INTERVAL,
+        rr_ratio=1.5,
+        sl_buffer_pct=0.005,
+        max_tp_percent=0.05,
+        max_risk_pct=0.02,
+        max_bars_since_swing=50,
+        min_tp_percent=0.0,        # hâlâ kapalı (istersen açarız)
+        min_risk_pct=0.0,          # hâlâ kapalı
+        use_tick_quantize=False,   # backtest uyumu için kapalı
+        use_htf_filter=True,       # ✅ 4h trend filtresi aktif
+        htf_interval="4h",
+        htf_lookback=3,
+        htf_max_bars_since_swing=300,
+        df=df,
+        htf_df=htf_df,
+        detector=detector,
     )
-        
-        if not sig:
-            print(f"[DEBUG] {symbol}: sinyal yok")
-            continue
-
-        if has_open_trade_same_direction(trades_df, symbol, sig["signal"]):
-            print(f"[DEBUG] {symbol}: aynı yönde OPEN mevcut, sinyal atlandı")
-            continue
-
-        entry_time_iso = to_iso_utc(sig["time"])
-        trade_id = make_trade_id(symbol, entry_time_iso)
-
-        # Sinyali kaydet
-        if not signal_already_logged(symbol, entry_time_iso):
-            append_signal_row({
-                "signal_id": trade_id,
-                "timestamp_utc": entry_time_iso,
-                "symbol": symbol,
-                "interval": INTERVAL,
-                "side": sig["signal"],
-                "entry_price": float(sig["price"]),
-                "sl": float(sig["sl"]),
-                "tp": float(sig["tp"]),
-                "rr_ratio": float(sig.get("rr_ratio", 1.5)),
-                "sl_buffer_pct": float(sig.get("sl_buffer_pct", 0.005)),
-                "status": "opened",
-                "note": ""
-            })
-            print(f"[DEBUG] {symbol}: signals_live.csv → {trade_id} yazıldı ({SIGNALS_CSV})")
-        else:
-            print(f"[DEBUG] {symbol}: sinyal zaten kayıtlı ({trade_id})")
-
-        # Aynı trade daha önce hiç yoksa ekle
-        if trade_exists(trades_df, trade_id):
-            print(f"[DEBUG] {symbol}: trade_exists=True ({trade_id}) → upsert yapılmadı")
-        else:
-            entry = float(sig["price"])
-            sl    = float(sig["sl"])
-            side  = sig["signal"]
-            # risk_abs: rapor/metrik için faydalı (backtest mantığını bozmaz)
-            risk_abs = max(entry - sl, 0.0) if side == "BUY" else max(sl - entry, 0.0)
-
-            new_row = {
-                "trade_id": trade_id,
-                "open_time_utc": entry_time_iso,
-                "close_time_utc": "",
-                "symbol": symbol,
-                "interval": INTERVAL,
-                "side": side,
-                "entry_price": entry,
-                "sl": sl,
-                "tp": float(sig["tp"]),
-                "exit_price": "",
-                "exit_reason": "",
-                "bars_held": 0,
-                "fee_roundtrip": FEE_ROUNDTRIP,
-                "risk_abs": risk_abs,
-                "r_multiple": "",
-                "pnl_percent": "",
-                "result": "",
-                "state": "OPEN"
-            }
-            upsert_trade_row(new_row)
-            trades_df = load_trades()
-            print(f"[DEBUG] {symbol}: trades_live.csv → {trade_id} eklendi → {TRADES_CSV}")
-
-    trades_df = load_trades()
-    save_trades(trades_df)
-
-    metrics = compute_metrics_from_trades()
+    return {"log": log, "updated": updated_rows, "sig": sig}
+
+
+def on_bar_open(stream=None, live_open=None):
+    """
+    Bar açılışı turu. stream (KlineStream) verilirse barlar akıştan/depodan okunur (sembol başına REST yok);
+    live_open: yeni barın açılışı (epoch-ms).
+    """
+    book = get_book()
+    signals = get_signal_index()
+    logged = []     # batch commit edildikten sonra index'e eklenecek sinyaller
+    pending = []    # batch commit edildikten sonra deftere yazılacak işlemler (depo geri alınırsa defter de değişmez)
+    print(f"[DEBUG] trade book: {len(book)} OPEN işlem (journal seq={book.seq}), "
+          f"signal index: {len(signals)} kayıt")
+
+    # --- Sembol başına fetch + değerlendirme + sinyal, sınırlı havuzda eşzamanlı ---
+    # Her sembol yalnızca kendi açık işlemlerini (kopya) ve kendi detektörünü görür → sonuçlar sıradan bağımsız
+    jobs = [(symbol, book.open_trades(symbol), _DETECTORS.setdefault(symbol, SwingTrendDetector(lookback=3)),
+             stream, live_open)
+            for symbol in SYMBOLS]
+    with ThreadPoolExecutor(max_workers=max(1, min(PAPER_MAX_WORKERS, len(jobs)))) as pool:
+        results = list(pool.map(lambda job: _process_symbol(*job), jobs))
+
+    # Tur boyunca tüm yazmalar tek batch'te, SYMBOLS sırasıyla (sqlite: tek transaction, csv: tek dosya yazımı)
+    with batch():
+        for symbol, res in zip(SYMBOLS, results):
+            if res is None:
+                print(f"[DEBUG] {symbol}: kline eksik (len<2), atlandı")
+                continue
+            for line in res["log"]:
+                print(line)
+
+            if res["updated"]:
+                pending.extend(res["updated"])
+                upsert_trade_rows(res["updated"])
+
+            sig = res["sig"]
+            if not sig:
+                print(f"[DEBUG] {symbol}: sinyal yok")
+                continue
+
+            # sembolün açık işlemlerinin hepsi res["updated"] içinde → tur sonrası açık küme budur
+            if has_open_trade_same_direction(res["updated"], sig["signal"]):
+                print(f"[DEBUG] {symbol}: aynı yönde OPEN mevcut, sinyal atlandı")
+                continue
+
+            entry_time_iso = to_iso_utc(sig["time"])
+            trade_id = make_trade_id(symbol, entry_time_iso)
+
+            # Sinyali kaydet
+            if not signal_already_logged(signals, symbol, entry_time_iso):
+                append_signal_row({
+                    "signal_id": trade_id,
+                    "timestamp_utc": entry_time_iso,
+                    "symbol": symbol,
+                    "interval": INTERVAL,
+                    "side": sig["signal"],
+                    "entry_price": float(sig["price"]),
+                    "sl": float(sig["sl"]),
+                    "tp": float(sig["tp"]),
+                    "rr_ratio": float(sig.get("rr_ratio", 1.5)),
+                    "sl_buffer_pct": float(sig.get("sl_buffer_pct", 0.005)),
+                    "status": "opened",
+                    "note": ""
+                })
+                logged.append((symbol, entry_time_iso))
+                print(f"[DEBUG] {symbol}: sinyal → {trade_id} yazıldı ({storage_target('signals')})")
+            else:
+                print(f"[DEBUG] {symbol}: sinyal zaten kayıtlı ({trade_id})")
+
+            # Aynı trade daha önce hiç yoksa ekle
+            if trade_exists(book, trade_id):
+                print(f"[DEBUG] {symbol}: trade_exists=True ({trade_id}) → upsert yapılmadı")
+            else:
+                entry = float(sig["price"])
+                sl    = float(sig["sl"])
+                side  = sig["signal"]
+                # risk_abs: rapor/metrik için faydalı (backtest mantığını bozmaz)
+                risk_abs = max(entry - sl, 0.0) if side == "BUY" else max(sl - entry, 0.0)
+
+                new_row = {
+                    "trade_id": trade_id,
+                    "open_time_utc": entry_time_iso,
+                    "close_time_utc": "",
+                    "symbol": symbol,
+                    "interval": INTERVAL,
+                    "side": side,
+                    "entry_price": entry,
+                    "sl": sl,
+                    "tp": float(sig["tp"]),
+                    "exit_price": "",
+                    "exit_reason": "",
+                    "bars_held": 0,
+                    "fee_roundtrip": FEE_ROUNDTRIP,
+                    "risk_abs": risk_abs,
+                    "r_multiple": "",
+                    "pnl_percent": "",
+                    "result": "",
+                    "state": "OPEN"
+                }
+                upsert_trade_row(new_row)
+                pending.append(new_row)
+                print(f"[DEBUG] {symbol}: trade → {trade_id} eklendi ({storage_target('trades')})")
+
+    # Depo batch'i başarıyla commit edildi → defter güncellenir, journal turda bir kez fsync'lenir
+    book.put_many(pending)
+    book.commit()
+    for symbol, ts in logged:
+        signals.add(symbol, ts)
+
+    # Metrikler defterle birlikte artımlı tutulur (kapanışta O(1)); trades tablosu yeniden taranmaz
+    now = datetime.now(timezone.utc)
+    metrics = book.metrics.equity_row(now.strftime("%Y-%m-%d %H:%M:%S"))
     append_equity_row(metrics)
+    summary = book.metrics.summary()
 
-    print(f"[{datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S} UTC] "
+    print(f"[{now:%Y-%m-%d %H:%M:%S} UTC] "
           f"EquityIndex:{metrics['equity_index']:.2f}  "
           f"Closed:{metrics['trades_closed']}  WinRate:{metrics['win_rate']:.2f}%  "
           f"PF:{metrics['profit_factor']:.2f}  PnLcum:{metrics['pnl_percent_cum']:.2f}%  "
-          f"(files: trades={TRADES_CSV}, signals={SIGNALS_CSV}, equity={EQUITY_CSV})")
+          f"MaxDD:{summary['max_drawdown_pct']:.2f}%  LossStreak:{summary['max_loss_streak']}  "
+          f"WinRate(son {summary['rolling_trades']}):{summary['rolling_win_rate']:.2f}%  "
+          f"(trades={storage_target('trades')}, signals={storage_target('signals')}, "
+          f"equity={storage_target('equity')})")
 
 
 def loop_forever():
@@ -248,6 +330,55 @@ def loop_forever():
         time.sleep(LOOP_SLEEP_SEC)
 
 
+def stream_forever(ws_url=None):
+    """
+    WebSocket kline akışı ile tetik (polling yok):
+    - Tüm SYMBOLS için <symbol>@kline_<INTERVAL> combined stream'e abone olunur
+    - Bir bar kapanınca (x=true) bar deposa yazılır; tüm semboller kapandığında
+      (ya da ilk kapanıştan STREAM_GRACE_SEC sonra) on_bar_open hemen çalışır
+    - Tur barları REST'ten değil akış belleği + depodan okur (KlineStream.window); yalnızca pencerede
+      delik varsa (ilk açılış, kopma) o sembol için get_klines çağrılır
+    """
+    iv = interval_to_ms(INTERVAL)
+    from services.kline_stream import KlineStream
+
+    print(f"📡 Paper trader (stream) başladı. ({INTERVAL} / UTC; bar kapanışında tek tetik)")
+    ensure_data_dir()
+
+    closed_by_bar = {}          # open_time → kapanışı gelen semboller
+    state = {"last_run": None}
+    run_lock = threading.Lock()
+
+    def _run_for(open_time):
+        with run_lock:
+            if state["last_run"] is not None and open_time <= state["last_run"]:
+                return
+            state["last_run"] = open_time
+            closed_by_bar.pop(open_time, None)
+            try:
+                on_bar_open(stream=stream, live_open=open_time + iv)
+            except Exception as e:
+                print(f"⚠️ on_bar_open hata: {e}")
+
+    def on_bar_closed(symbol, interval, bar):
+        t = bar["open_time"]
+        if state["last_run"] is not None and t <= state["last_run"]:
+            return
+        seen = closed_by_bar.setdefault(t, set())
+        first = not seen
+        seen.add(symbol)
+        if len(seen) >= len(SYMBOLS):
+            threading.Thread(target=_run_for, args=(t,), daemon=True).start()
+        elif first:
+            threading.Timer(STREAM_GRACE_SEC, _run_for, args=(t,)).start()
+
+    stream = KlineStream(SYMBOLS, [INTERVAL], on_bar_closed=on_bar_closed, ws_url=ws_url)
+    try:
+        stream.run_forever()
+    except KeyboardInterrupt:
+        print("\nStream durduruldu.")
+
+
 def run_once():
     print("▶️ Tek seferlik tetik (laboratuvar testi).")
     ensure_data_dir()
@@ -257,9 +388,13 @@ def run_once():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--once", action="store_true", help="Tek sefer çalıştır ve çık")
+    parser.add_argument("--stream", action="store_true", help="Polling yerine WebSocket bar kapanışıyla tetikle")
+    parser.add_argument("--ws-url", default=None, help="WebSocket taban adresi (varsayılan: config BINANCE_WS_URL)")
     args = parser.parse_args()
 
     if args.once:
         run_once()
+    elif args.stream:
+        stream_forever(ws_url=args.ws_url)
     else:
         loop_forever()
@@ -0,0 +1,69 @@
+# paper_trader/signal_index.py
+# Kaydedilmiş sinyallerin bellek içi index'i: (symbol, timestamp_utc) kümesi.
+# - Açılışta bir kez storage'dan yüklenir; her append_signal_row sonrası add() ile senkron tutulur
+# - signal_already_logged → O(1) küme sorgusu (signals tablosu/CSV her sinyalde yeniden okunmaz)
+# - İsteğe bağlı zaman penceresi (retention_hours): görülen en yeni sinyalden daha eski kayıtlar
+#   index'ten düşülür → bellek geçmiş uzunluğundan bağımsız kalır (depodaki kayıtlar silinmez)
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Set, Tuple
+
+try:
+    from .config import SIGNAL_INDEX_RETENTION_HOURS
+except Exception:
+    SIGNAL_INDEX_RETENTION_HOURS = None
+
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class SignalIndex:
+    """
+      idx = SignalIndex.load()                     # storage'daki sinyallerden (tek okuma)
+      idx.contains("BTCUSDT", "2024-01-01 10:00:00")
+      idx.add("BTCUSDT", "2024-01-01 10:00:00")    # append_signal_row ile birlikte
+    """
+
+    def __init__(self, retention_hours: Optional[float] = SIGNAL_INDEX_RETENTION_HOURS):
+        self.retention = timedelta(hours=retention_hours) if retention_hours else None
+        self._keys: Set[Tuple[str, str]] = set()
+        self._heap = []              # (timestamp_utc, symbol) — en eski önce, retention için
+        self._latest = ""
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, retention_hours: Optional[float] = SIGNAL_INDEX_RETENTION_HOURS) -> "SignalIndex":
+        from .storage import load_signals
+        idx = cls(retention_hours)
+        sigs = load_signals()
+        if not sigs.empty:
+            for symbol, ts in zip(sigs["symbol"].astype(str), sigs["timestamp_utc"].astype(str)):
+                idx.add(symbol, ts)
+        return idx
+
+    def add(self, symbol: str, timestamp_utc: str) -> None:
+        key = (symbol, timestamp_utc)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            if self.retention is not None:
+                heapq.heappush(self._heap, (timestamp_utc, symbol))
+                if timestamp_utc > self._latest:
+                    self._latest = timestamp_utc
+                    self._evict()
+
+    def _evict(self) -> None:
+        try:
+            cutoff = (datetime.strptime(self._latest, _TS_FORMAT) - self.retention).strftime(_TS_FORMAT)
+        except ValueError:
+            return                   # beklenmeyen zaman biçimi → düşürme yapma
+        while self._heap and self._heap[0][0] < cutoff:
+            ts, symbol = heapq.heappop(self._heap)
+            self._keys.discard((symbol, ts))
+
+    def contains(self, symbol: str, timestamp_utc: str) -> bool:
+        return (symbol, timestamp_utc) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -1,7 +1,16 @@
 # paper_trader/storage.py
+# Arka uç: config STORAGE_BACKEND = "sqlite" (varsayılan; paper_trader/storage_sqlite.py, WAL) | "csv".
+# Aynı fonksiyonlar iki arka uçta da geçerli; batch() içinde tur boyunca yapılan yazmalar tek seferde işlenir.
+# sqlite'ta trades_live.csv / signals_live.csv artık güncellenmez; yalnızca
+# `python -m paper_trader.storage_sqlite --export` ile dökülür (equity_live.csv'ye satır eklenmeye devam eder).
 import os
+from contextlib import contextmanager
 import pandas as pd
 from .config import DATA_DIR, SIGNALS_CSV, TRADES_CSV, EQUITY_CSV
+try:
+    from .config import STORAGE_BACKEND
+except Exception:
+    STORAGE_BACKEND = "sqlite"
 
 SIGNALS_COLUMNS = [
     "signal_id","timestamp_utc","symbol","interval","side",
@@ -17,7 +26,51 @@ EQUITY_COLUMNS = [
     "timestamp_utc","equity_index","trades_closed","win_rate","profit_factor","pnl_percent_cum"
 ]
 
+def storage_target(table: str) -> str:
+    """Log için: tablonun ("trades" | "signals" | "equity") gerçekte yazıldığı yer."""
+    if _db() is not None and table != "equity":
+        return f"sqlite {_db().SQLITE_PATH} [{table}]"
+    return {"trades": TRADES_CSV, "signals": SIGNALS_CSV, "equity": EQUITY_CSV}[table]
+
+def _db():
+    """sqlite arka ucu seçiliyse modülü, değilse None döndürür."""
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+        return storage_sqlite
+    return None
+
+# CSV arka ucu için tur içi tampon: batch() boyunca trades tek kez okunur, çıkışta tek kez yazılır
+_CSV_BATCH = None
+
+@contextmanager
+def batch():
+    """
+    Bir paper trader turu boyunca yapılan upsert/append'leri tek yazmada topla:
+    sqlite → tek transaction; csv → trades/signals bellekte güncellenir, çıkışta dosyalar bir kez yazılır.
+    """
+    global _CSV_BATCH
+    db = _db()
+    if db is not None:
+        with db.batch():
+            yield
+        return
+    if _CSV_BATCH is not None:          # iç içe batch → dıştakine katıl
+        yield
+        return
+    _CSV_BATCH = {"trades": load_trades(), "signals": [], "dirty": False}
+    try:
+        yield
+        if _CSV_BATCH["dirty"]:
+            save_trades(_CSV_BATCH["trades"])
+        if _CSV_BATCH["signals"]:
+            df = pd.concat([_read_signals_csv(), pd.DataFrame(_CSV_BATCH["signals"])], ignore_index=True)
+            df.to_csv(SIGNALS_CSV, index=False)
+    finally:
+        _CSV_BATCH = None
+
 def ensure_data_dir():
+    if _db() is not None:
+        return _db().ensure_data_dir()
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(SIGNALS_CSV):
         pd.DataFrame(columns=SIGNALS_COLUMNS).to_csv(SIGNALS_CSV, index=False)
@@ -26,13 +79,27 @@ def ensure_data_dir():
     if not os.path.exists(EQUITY_CSV):
         pd.DataFrame(columns=EQUITY_COLUMNS).to_csv(EQUITY_CSV, index=False)
 
-def load_signals() -> pd.DataFrame:
+def _read_signals_csv() -> pd.DataFrame:
     return pd.read_csv(SIGNALS_CSV) if os.path.exists(SIGNALS_CSV) else pd.DataFrame(columns=SIGNALS_COLUMNS)
 
+def load_signals() -> pd.DataFrame:
+    if _db() is not None:
+        return _db().load_signals()
+    df = _read_signals_csv()
+    if _CSV_BATCH is not None and _CSV_BATCH["signals"]:
+        df = pd.concat([df, pd.DataFrame(_CSV_BATCH["signals"])], ignore_index=True)
+    return df
+
 def load_trades() -> pd.DataFrame:
+    if _db() is not None:
+        return _db().load_trades()
+    if _CSV_BATCH is not None:
+        return _CSV_BATCH["trades"].copy()
     return pd.read_csv(TRADES_CSV) if os.path.exists(TRADES_CSV) else pd.DataFrame(columns=TRADES_COLUMNS)
 
 def save_trades(df: pd.DataFrame) -> None:
+    if _db() is not None:
+        return _db().save_trades(df)
     df = df.copy()
     # tip normalize
     for c in ["bars_held"]:
@@ -41,21 +108,64 @@ def save_trades(df: pd.DataFrame) -> None:
     df.to_csv(TRADES_CSV, index=False)
 
 def append_signal_row(row: dict) -> None:
+    if _db() is not None:
+        return _db().append_signal_row(row)
+    if _CSV_BATCH is not None:
+        _CSV_BATCH["signals"].append(row)
+        return
     df = load_signals()
     df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
     df.to_csv(SIGNALS_CSV, index=False)
 
+def _upsert_into(df: pd.DataFrame, rows) -> pd.DataFrame:
+    pos = {}
+    if "trade_id" in df.columns:
+        for i, tid in enumerate(df["trade_id"].tolist()):
+            pos.setdefault(tid, i)          # tekrar eden trade_id → ilk satır (eski davranış)
+    new_rows = []
+    for row in rows:
+        i = pos.get(row["trade_id"])
+        if i is None:
+            new_rows.append(row)
+            continue
+        idx = df.index[i]
+        for k, v in row.items():
+            try:
+                df.at[idx, k] = v
+            except (TypeError, ValueError):
+                # boş (NaN → float) kolona metin yazılıyor → kolonu object'e çevir
+                df[k] = df[k].astype(object)
+                df.at[idx, k] = v
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+    return df
+
 def upsert_trade_row(row: dict) -> None:
+    upsert_trade_rows([row])
+
+def upsert_trade_rows(rows) -> None:
+    """Birden çok trade satırını tek yazmada upsert et (trade_id anahtar)."""
+    rows = list(rows)
+    if not rows:
+        return
+    if _db() is not None:
+        return _db().upsert_trade_rows(rows)
+    if _CSV_BATCH is not None:
+        _CSV_BATCH["trades"] = _upsert_into(_CSV_BATCH["trades"], rows)
+        _CSV_BATCH["dirty"] = True
+        return
+    save_trades(_upsert_into(load_trades(), rows))
+
+def trade_exists(trade_id: str) -> bool:
+    """Depoda (açık ya da kapanmış) bu trade_id'li satır var mı."""
+    if _db() is not None:
+        return _db().trade_exists(trade_id)
     df = load_trades()
-    if "trade_id" in df.columns and (df["trade_id"] == row["trade_id"]).any():
-        idx = df.index[df["trade_id"] == row["trade_id"]][0]
-        for k, v in row.items():
-            df.at[idx, k] = v
-    else:
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    save_trades(df)
+    return bool(len(df)) and bool((df["trade_id"] == trade_id).any())
 
 def compute_metrics_from_trades() -> dict:
+    if _db() is not None:
+        return _db().compute_metrics_from_trades()
     df = load_trades()
     ts = pd.Timestamp.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     if df.empty:
@@ -95,6 +205,13 @@ def compute_metrics_from_trades() -> dict:
     }
 
 def append_equity_row(metrics: dict) -> None:
-    df = pd.read_csv(EQUITY_CSV) if os.path.exists(EQUITY_CSV) else pd.DataFrame(columns=EQUITY_COLUMNS)
-    df = pd.concat([df, pd.DataFrame([metrics])], ignore_index=True)
-    df.to_csv(EQUITY_CSV, index=False)
+    if _db() is not None:
+        return _db().append_equity_row(metrics)
+    # yalnızca bir satır eklenir (dosya okunup yeniden yazılmaz)
+    header = not os.path.exists(EQUITY_CSV)
+    pd.DataFrame([metrics], columns=EQUITY_COLUMNS).to_csv(EQUITY_CSV, mode="a", header=header, index=False)
+
+def export_csv() -> None:
+    """sqlite arka ucunda tabloları eski CSV dosyalarına dök (csv arka ucunda zaten CSV)."""
+    if _db() is not None:
+        _db().export_csv()
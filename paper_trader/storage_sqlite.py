@@ -0,0 +1,308 @@
+# paper_trader/storage_sqlite.py
+# Gömülü SQLite (WAL) depolama — storage.py'deki CSV arka ucunun yerine (config: STORAGE_BACKEND = "sqlite").
+# - trades: trade_id PRIMARY KEY, (symbol, state) index'i → açık işlem sorguları geçmişle büyümez
+# - signals: UNIQUE(symbol, timestamp_utc) + signal_id index'i → tekrar kontrolü tek index araması;
+#   ekleme INSERT OR IGNORE (--import-csv tekrar çalıştırılsa da sinyal satırları çoğalmaz)
+# - Upsert'ler tek satır güncellemesi (dosyanın tamamı yeniden yazılmaz); batch() içinde tur başına tek transaction
+# - CSV uyumluluğu: equity satırı EQUITY_CSV'ye de eklenir (plot_equity), export_csv() tüm tabloları döker
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .config import DATA_DIR, SIGNALS_CSV, TRADES_CSV, EQUITY_CSV
+from .storage import SIGNALS_COLUMNS, TRADES_COLUMNS, EQUITY_COLUMNS
+
+try:
+    from .config import SQLITE_PATH
+except Exception:
+    SQLITE_PATH = f"{DATA_DIR}/paper_trader.db"
+
+_REAL = {"entry_price", "sl", "tp", "exit_price", "fee_roundtrip", "risk_abs", "r_multiple", "pnl_percent",
+         "rr_ratio", "sl_buffer_pct", "equity_index", "win_rate", "profit_factor", "pnl_percent_cum"}
+_INT = {"bars_held", "trades_closed"}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    {", ".join(f"{c} {'REAL' if c in _REAL else 'INTEGER' if c in _INT else 'TEXT'}" for c in TRADES_COLUMNS[1:])}
+);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_state ON trades(symbol, state);
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{c} {'REAL' if c in _REAL else 'TEXT'}" for c in SIGNALS_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_signals_id ON signals(signal_id);
+CREATE TABLE IF NOT EXISTS equity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{c} {'REAL' if c in _REAL else 'INTEGER' if c in _INT else 'TEXT'}" for c in EQUITY_COLUMNS)}
+);
+"""
+
+_lock = threading.RLock()
+_conn: Optional[sqlite3.Connection] = None
+_batch_depth = 0
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        d = os.path.dirname(SQLITE_PATH)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = sqlite3.connect(SQLITE_PATH, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        fresh = conn.execute("SELECT name FROM sqlite_master WHERE name = 'trades'").fetchone() is None
+        conn.executescript(_SCHEMA)
+        _migrate_signals_unique(conn)
+        _conn = conn
+        if fresh and (os.path.exists(TRADES_CSV) or os.path.exists(SIGNALS_CSV)):
+            # CSV → SQLite geçişi: mevcut geçmiş ilk açılışta bir kez alınır
+            import_csv()
+            print(f"[storage] CSV geçmişi {SQLITE_PATH} içine alındı")
+    return _conn
+
+
+def _migrate_signals_unique(conn: sqlite3.Connection) -> None:
+    """(symbol, timestamp_utc) tekilliği; eski veritabanındaki kopyalar (ilk kayıt kalır) silinerek eklenir."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'uq_signals_symbol_ts'").fetchone():
+        return
+    conn.execute("BEGIN")
+    try:
+        conn.execute("DELETE FROM signals WHERE id NOT IN "
+                     "(SELECT MIN(id) FROM signals GROUP BY symbol, timestamp_utc)")
+        conn.execute("DROP INDEX IF EXISTS idx_signals_symbol_ts")
+        conn.execute("CREATE UNIQUE INDEX uq_signals_symbol_ts ON signals(symbol, timestamp_utc)")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def close() -> None:
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+@contextmanager
+def _tx():
+    """batch() içindeyse mevcut transaction'a katıl, değilse tek işlemlik transaction aç."""
+    with _lock:
+        conn = _connect()
+        if _batch_depth:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+@contextmanager
+def batch():
+    """Tur başına tek transaction: tüm upsert/append'ler çıkışta birlikte commit edilir."""
+    global _batch_depth
+    with _lock:
+        conn = _connect()
+        if _batch_depth == 0:
+            conn.execute("BEGIN")
+        _batch_depth += 1
+        try:
+            yield
+        except Exception:
+            _batch_depth -= 1
+            if _batch_depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        _batch_depth -= 1
+        if _batch_depth == 0:
+            conn.execute("COMMIT")
+
+
+def _clean(v):
+    """CSV'deki boş hücre ("" / NaN) → NULL."""
+    if v is None or (isinstance(v, str) and v == ""):
+        return None
+    if isinstance(v, float) and v != v:
+        return None
+    if hasattr(v, "item"):          # numpy skaler
+        return v.item()
+    return v
+
+
+def _frame(cur: sqlite3.Cursor, columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame(cur.fetchall(), columns=columns)
+
+
+# -------------------------------------------------
+# storage.py ile aynı arayüz
+# -------------------------------------------------
+def ensure_data_dir():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with _lock:
+        _connect()
+    if not os.path.exists(EQUITY_CSV):
+        pd.DataFrame(columns=EQUITY_COLUMNS).to_csv(EQUITY_CSV, index=False)
+
+
+def load_signals() -> pd.DataFrame:
+    with _lock:
+        cur = _connect().execute(f"SELECT {', '.join(SIGNALS_COLUMNS)} FROM signals ORDER BY id")
+        return _frame(cur, SIGNALS_COLUMNS)
+
+
+def load_trades(symbol: Optional[str] = None, state: Optional[str] = None) -> pd.DataFrame:
+    where, args = [], []
+    if symbol is not None:
+        where.append("symbol = ?")
+        args.append(symbol)
+    if state is not None:
+        where.append("state = ?")
+        args.append(state)
+    sql = f"SELECT {', '.join(TRADES_COLUMNS)} FROM trades"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with _lock:
+        return _frame(_connect().execute(sql + " ORDER BY rowid", args), TRADES_COLUMNS)
+
+
+def save_trades(df: pd.DataFrame) -> None:
+    """Tabloyu df ile değiştir (CSV arka ucundaki tam yeniden yazmanın karşılığı)."""
+    with _tx() as conn:
+        conn.execute("DELETE FROM trades")
+        _upsert(conn, df.to_dict("records"))
+
+
+def _upsert(conn: sqlite3.Connection, rows: Iterable[Dict]) -> None:
+    # aynı kolon kümesine sahip satırlar tek executemany ile
+    groups: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        cols = tuple(c for c in row if c in TRADES_COLUMNS)
+        groups.setdefault(cols, []).append(tuple(_clean(row[c]) for c in cols))
+    for cols, values in groups.items():
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "trade_id")
+        sql = (f"INSERT INTO trades ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+               f"ON CONFLICT(trade_id) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING"))
+        conn.executemany(sql, values)
+
+
+def upsert_trade_row(row: dict) -> None:
+    with _tx() as conn:
+        _upsert(conn, [row])
+
+
+def upsert_trade_rows(rows: Iterable[dict]) -> None:
+    with _tx() as conn:
+        _upsert(conn, rows)
+
+
+def append_signal_row(row: dict) -> None:
+    cols = [c for c in SIGNALS_COLUMNS if c in row]
+    with _tx() as conn:
+        conn.execute(f"INSERT OR IGNORE INTO signals ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                     [_clean(row[c]) for c in cols])
+
+
+def signal_exists(symbol: str, timestamp_utc: str) -> bool:
+    with _lock:
+        cur = _connect().execute("SELECT 1 FROM signals WHERE symbol = ? AND timestamp_utc = ? LIMIT 1",
+                                 (symbol, timestamp_utc))
+        return cur.fetchone() is not None
+
+
+def trade_exists(trade_id: str) -> bool:
+    with _lock:
+        return _connect().execute("SELECT 1 FROM trades WHERE trade_id = ?", (trade_id,)).fetchone() is not None
+
+
+def compute_metrics_from_trades() -> dict:
+    ts = pd.Timestamp.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    with _lock:
+        n, wins, sum_win_r, sum_loss_r, pnl_cum = _connect().execute(
+            "SELECT COUNT(*), "
+            "       COALESCE(SUM(result = 'WIN'), 0), "
+            "       COALESCE(SUM(CASE WHEN result = 'WIN' THEN r_multiple END), 0), "
+            "       -COALESCE(SUM(CASE WHEN result = 'LOSS' THEN r_multiple END), 0), "
+            "       COALESCE(SUM(pnl_percent), 0) "
+            "FROM trades WHERE state = 'CLOSED'"
+        ).fetchone()
+    if n == 0:
+        return {
+            "timestamp_utc": ts, "equity_index": 100.0,
+            "trades_closed": 0, "win_rate": 0.0,
+            "profit_factor": 0.0, "pnl_percent_cum": 0.0
+        }
+    profit_factor = (sum_win_r / sum_loss_r) if sum_loss_r > 0 else 9999.0
+    return {
+        "timestamp_utc": ts,
+        "equity_index": float(100.0 + pnl_cum),
+        "trades_closed": int(n),
+        "win_rate": float(100.0 * wins / n),
+        "profit_factor": float(profit_factor),
+        "pnl_percent_cum": float(pnl_cum),
+    }
+
+
+def append_equity_row(metrics: dict) -> None:
+    cols = [c for c in EQUITY_COLUMNS if c in metrics]
+    with _tx() as conn:
+        conn.execute(f"INSERT INTO equity ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                     [_clean(metrics[c]) for c in cols])
+    # plot_equity uyumluluğu: CSV'ye yalnızca bir satır eklenir (dosya yeniden yazılmaz)
+    header = not os.path.exists(EQUITY_CSV)
+    pd.DataFrame([metrics], columns=EQUITY_COLUMNS).to_csv(EQUITY_CSV, mode="a", header=header, index=False)
+
+
+# -------------------------------------------------
+# CSV dışa/içe aktarım
+# -------------------------------------------------
+def export_csv(trades_csv: Optional[str] = None, signals_csv: Optional[str] = None,
+               equity_csv: Optional[str] = None) -> None:
+    """Tabloları eski CSV formatında dök (harici araçlar / geriye dönük uyumluluk). Varsayılan: config yolları."""
+    trades_csv, signals_csv, equity_csv = trades_csv or TRADES_CSV, signals_csv or SIGNALS_CSV, equity_csv or EQUITY_CSV
+    load_trades().to_csv(trades_csv, index=False)
+    load_signals().to_csv(signals_csv, index=False)
+    with _lock:
+        cur = _connect().execute(f"SELECT {', '.join(EQUITY_COLUMNS)} FROM equity ORDER BY id")
+        _frame(cur, EQUITY_COLUMNS).to_csv(equity_csv, index=False)
+
+
+def import_csv(trades_csv: Optional[str] = None, signals_csv: Optional[str] = None) -> None:
+    """
+    Mevcut CSV geçmişini veritabanına al (CSV → SQLite geçişinde). Tekrar çalıştırmak güvenli:
+    trades trade_id ile upsert, signals (symbol, timestamp_utc) tekilliğiyle INSERT OR IGNORE.
+    """
+    trades_csv, signals_csv = trades_csv or TRADES_CSV, signals_csv or SIGNALS_CSV
+    with _tx() as conn:
+        if os.path.exists(trades_csv):
+            _upsert(conn, pd.read_csv(trades_csv).to_dict("records"))
+        if os.path.exists(signals_csv):
+            sigs = pd.read_csv(signals_csv)
+            cols = [c for c in SIGNALS_COLUMNS if c in sigs.columns]
+            conn.executemany(f"INSERT OR IGNORE INTO signals ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                             [tuple(_clean(v) for v in r) for r in sigs[cols].itertuples(index=False)])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="paper_trader SQLite deposu")
+    parser.add_argument("--export", action="store_true", help="tabloları CSV'ye dök")
+    parser.add_argument("--import-csv", action="store_true", help="mevcut CSV'leri veritabanına al")
+    args = parser.parse_args()
+    if args.import_csv:
+        import_csv()
+        print(f"CSV → {SQLITE_PATH}")
+    if args.export:
+        export_csv()
+        print(f"{SQLITE_PATH} → CSV")
@@ -0,0 +1,265 @@
+# paper_trader/trade_book.py
+# Süreç içi işlem defteri: açık işlemlerin tek doğruluk kaynağı.
+# - Açık işlemler bellekte, (symbol, side) → {trade_id: trade} index'inde (sorgular sözlük erişimi)
+# - Her durum değişikliği append-only journal'a (JSON satırı) yazılır; fsync toplu yapılır
+#   (commit() → tur sonunda bir kez, ya da FSYNC_EVERY kayıtta bir)
+# - SNAPSHOT_EVERY kayıtta bir kompakt snapshot (yalnızca açık işlemler + son kapananların id'leri) yazılır,
+#   journal sıfırlanır → açılışta kurtarma = son snapshot + journal kuyruğu (geçmiş uzunluğundan bağımsız)
+# - Yarım kalmış son journal satırı (çökme) yok sayılır
+# - exists(): açık + son kapanan id'ler bellekte; bulunamazsa depoya sorulur (eski kapanmış işlemler yeniden açılmasın)
+# - Kapanış metrikleri (analysis.metrics.MetricsAccumulator) defterle birlikte tutulur: OPEN → CLOSED geçişinde
+#   O(1) güncellenir, durumu snapshot'a yazılır, journal kuyruğundaki kapanışlar kurtarmada yeniden eklenir
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from analysis.metrics import MetricsAccumulator
+from .config import DATA_DIR
+
+try:
+    from .config import TRADE_BOOK_DIR
+except Exception:
+    TRADE_BOOK_DIR = f"{DATA_DIR}/trade_book"
+try:
+    from .config import TRADE_BOOK_SNAPSHOT_EVERY
+except Exception:
+    TRADE_BOOK_SNAPSHOT_EVERY = 1000
+try:
+    from .config import TRADE_BOOK_FSYNC_EVERY
+except Exception:
+    TRADE_BOOK_FSYNC_EVERY = 256
+try:
+    from .config import METRICS_WINDOW
+except Exception:
+    METRICS_WINDOW = 50
+
+RECENT_CLOSED_MAX = 5000     # trade_exists için hatırlanan son kapanan işlem id'leri
+
+
+class TradeBook:
+    """
+      book = TradeBook.open()              # snapshot + journal'dan kur (ilk açılışta storage'dan açık işlemler)
+      book.open_trades("BTCUSDT")          # o sembolün açık işlemleri
+      book.has_open("BTCUSDT", "BUY")      # aynı yönde açık işlem var mı (O(1))
+      book.put(trade)                      # ekle / güncelle (state == CLOSED → açıklardan çıkar)
+      book.commit()                        # journal'ı fsync'le (tur sonu), gerekirse snapshot al
+      book.metrics.equity_row(ts)          # kapanmış işlemlerin metrikleri (geçmiş taranmaz)
+    """
+
+    def __init__(self, path: str = TRADE_BOOK_DIR, snapshot_every: int = TRADE_BOOK_SNAPSHOT_EVERY,
+                 fsync_every: int = TRADE_BOOK_FSYNC_EVERY, lookup=None):
+        self.path = path
+        self._lookup = lookup or _trade_in_storage      # trade_id → depoda var mı (bellekte yoksa)
+        self.snapshot_every = int(snapshot_every)
+        self.fsync_every = int(fsync_every)
+        self._lock = threading.RLock()
+        self._open: Dict[str, Dict[str, Any]] = {}                       # trade_id → trade
+        self._by_key: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}  # (symbol, side) → {trade_id: trade}
+        self._by_symbol: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._recent_closed: "OrderedDict[str, None]" = OrderedDict()
+        self.seq = 0
+        self._since_snapshot = 0
+        self._unsynced = 0
+        self._journal = None
+        self.metrics: Optional[MetricsAccumulator] = None
+
+    # -------------------------------------------------
+    # Dosyalar
+    # -------------------------------------------------
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.path, "snapshot.json")
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.path, "journal.jsonl")
+
+    @classmethod
+    def open(cls, path: str = TRADE_BOOK_DIR, bootstrap=None, **kw) -> "TradeBook":
+        """
+        Defteri diskten kur. Hiç snapshot/journal yoksa `bootstrap()` (varsayılan: storage'daki işlemler)
+        ile doldurulur (OPEN → defter, CLOSED → metrikler + kapanmış id'ler) ve ilk snapshot yazılır. Snapshot'ta metrik
+        durumu yoksa (eski defter) metrikler bir kez storage'daki kapanmış işlemlerden kurulur.
+        """
+        book = cls(path, **kw)
+        os.makedirs(path, exist_ok=True)
+        fresh = not os.path.exists(book.snapshot_path) and not os.path.exists(book.journal_path)
+        book._recover()
+        book._journal = open(book.journal_path, "a", encoding="utf-8")
+        if fresh or book.metrics is None:
+            trades = (bootstrap or _trades_from_storage)()
+            book.metrics = MetricsAccumulator(window=METRICS_WINDOW)
+            closed = sorted((t for t in trades if t.get("state") == "CLOSED"),
+                            key=lambda t: str(t.get("close_time_utc") or ""))
+            for trade in closed:
+                book.metrics.add_trade(trade)
+            if fresh:
+                for trade in closed:
+                    book._remember_closed(trade["trade_id"])
+                for trade in trades:
+                    if trade.get("state") == "OPEN":
+                        book._apply(trade)
+            book.snapshot()
+        return book
+
+    def _recover(self) -> None:
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self.seq = int(snap.get("seq", 0))
+            if "metrics" in snap:
+                self.metrics = MetricsAccumulator.from_dict(snap["metrics"])
+            for trade in snap.get("open", []):
+                self._apply(trade)
+            for tid in snap.get("recent_closed", []):
+                self._remember_closed(tid)
+        if os.path.exists(self.journal_path):
+            good = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break                       # yarım kalmış son satır
+                    good += len(line)
+                    if int(rec["seq"]) <= self.seq:
+                        continue                    # snapshot'a zaten dahil
+                    self.seq = int(rec["seq"])
+                    self._since_snapshot += 1
+                    self._apply(rec["trade"])
+            # yarım satırı kes; yoksa sonraki kayıt onunla aynı satıra yazılır
+            if good < os.path.getsize(self.journal_path):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+            elif good and not line.endswith(b"\n"):
+                with open(self.journal_path, "ab") as f:
+                    f.write(b"\n")
+
+    def _write_journal(self, trade: Dict[str, Any]) -> None:
+        self.seq += 1
+        self._journal.write(json.dumps({"seq": self.seq, "trade": trade}, default=str) + "\n")
+        self._since_snapshot += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self._journal is not None and self._unsynced:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def commit(self) -> None:
+        """Tur sonu: bekleyen journal kayıtlarını diske indir; eşik aşıldıysa snapshot al."""
+        with self._lock:
+            self._sync()
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    def snapshot(self) -> None:
+        """Açık işlemler + son kapanan id'ler → snapshot.json (atomik), ardından journal sıfırlanır."""
+        with self._lock:
+            self._sync()
+            snap = {"seq": self.seq, "open": list(self._open.values()), "recent_closed": list(self._recent_closed)}
+            if self.metrics is not None:
+                snap["metrics"] = self.metrics.to_dict()
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            # snapshot kalıcı → journal'daki tüm kayıtlar artık gereksiz
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, "w", encoding="utf-8")
+            self._since_snapshot = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    # -------------------------------------------------
+    # Bellek içi index
+    # -------------------------------------------------
+    def _remember_closed(self, trade_id: str) -> None:
+        self._recent_closed[trade_id] = None
+        self._recent_closed.move_to_end(trade_id)
+        while len(self._recent_closed) > RECENT_CLOSED_MAX:
+            self._recent_closed.popitem(last=False)
+
+    def _apply(self, trade: Dict[str, Any]) -> None:
+        tid = trade["trade_id"]
+        old = self._open.pop(tid, None)
+        if old is not None:
+            self._by_key.get((old["symbol"], old["side"]), {}).pop(tid, None)
+            self._by_symbol.get(old["symbol"], {}).pop(tid, None)
+        if trade.get("state") == "CLOSED":
+            self._remember_closed(tid)
+            if old is not None and self.metrics is not None:
+                self.metrics.add_trade(trade)
+            return
+        self._open[tid] = trade
+        self._by_key.setdefault((trade["symbol"], trade["side"]), {})[tid] = trade
+        self._by_symbol.setdefault(trade["symbol"], {})[tid] = trade
+
+    # -------------------------------------------------
+    # Arayüz
+    # -------------------------------------------------
+    def put(self, trade: Dict[str, Any]) -> None:
+        """İşlemi ekle/güncelle (journal'a bir satır). state == CLOSED → açıklardan çıkar."""
+        trade = dict(trade)
+        with self._lock:
+            self._write_journal(trade)
+            self._apply(trade)
+
+    def put_many(self, trades: Iterable[Dict[str, Any]]) -> None:
+        for t in trades:
+            self.put(t)
+
+    def open_trades(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Açık işlemler (kopya; açılış sırasıyla)."""
+        with self._lock:
+            src = self._open if symbol is None else self._by_symbol.get(symbol, {})
+            return [dict(t) for t in src.values()]
+
+    def has_open(self, symbol: str, side: str) -> bool:
+        return bool(self._by_key.get((symbol, side)))
+
+    def exists(self, trade_id: str) -> bool:
+        """
+        Açık ya da kapanmış işlem (aynı swing tekrar sinyal verirse kapanmış kayıt OPEN ile ezilmesin).
+        Son RECENT_CLOSED_MAX kapanış bellekte; daha eskisi için depoya sorulur.
+        """
+        with self._lock:
+            if trade_id in self._open or trade_id in self._recent_closed:
+                return True
+        if not self._lookup(trade_id):
+            return False
+        with self._lock:
+            self._remember_closed(trade_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+
+def _trade_in_storage(trade_id: str) -> bool:
+    from .storage import trade_exists
+    return trade_exists(trade_id)
+
+
+def _trades_from_storage() -> List[Dict[str, Any]]:
+    """İlk açılış: mevcut depodaki işlemler (CSV / SQLite geçmişinden geçiş)."""
+    from .storage import load_trades
+    df = load_trades()
+    if df.empty:
+        return []
+    df = df.astype(object)
+    return [{k: (None if (isinstance(v, float) and v != v) else v) for k, v in row.items()}
+            for row in df.to_dict("records")]
@@ -1,49 +1,169 @@
 # services/binance_filters.py
+# Sembol filtreleri (PRICE_FILTER / LOT_SIZE / MIN_NOTIONAL | NOTIONAL):
+# - Tüm semboller TEK toplu /api/v3/exchangeInfo çağrısıyla yüklenir (200 sembol → 1 istek)
+# - Diskte TTL'li önbellek (EXCHANGE_INFO_CACHE); süresi dolunca arka planda yenilenir,
+#   o sırada eski değerler kullanılmaya devam eder
+# - Hata önbelleğe yazılmaz: kısa bir beklemeden sonra tekrar denenir
+# - allow_network=False → yalnızca bellek/disk (backtest'ler ağa hiç çıkmaz)
+import json
 import math
+import os
 import threading
-from typing import Optional
-import requests
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from services.http_client import get_json, EXCHANGE_INFO_WEIGHT
 
 # (opsiyonel) config override
 try:
     from paper_trader.config import PRICE_TICKS
 except Exception:
     PRICE_TICKS = {}
+try:
+    from paper_trader.config import EXCHANGE_INFO_CACHE, EXCHANGE_INFO_TTL_SEC
+except Exception:
+    EXCHANGE_INFO_CACHE = "kline_data/exchange_info.json"
+    EXCHANGE_INFO_TTL_SEC = 6 * 3600
+
+FAILURE_RETRY_SEC = 60   # başarısız yüklemeden sonra bu kadar ağa gitme
+
+
+def _positive(x) -> Optional[float]:
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 0 else None
+
+
+def parse_exchange_info(data: dict) -> Dict[str, dict]:
+    """exchangeInfo yanıtı → {SYMBOL: {"tick", "step", "min_qty", "min_notional"}} (yoksa None)."""
+    out: Dict[str, dict] = {}
+    for sym in data.get("symbols", []):
+        f = {"tick": None, "step": None, "min_qty": None, "min_notional": None}
+        for flt in sym.get("filters", []):
+            ft = flt.get("filterType")
+            if ft == "PRICE_FILTER":
+                # Bazı sembollerde 0.00000000 gibi olabilir; 0’dan büyük en küçük
+                f["tick"] = _positive(flt.get("tickSize"))
+            elif ft == "LOT_SIZE":
+                f["step"] = _positive(flt.get("stepSize"))
+                f["min_qty"] = _positive(flt.get("minQty"))
+            elif ft in ("MIN_NOTIONAL", "NOTIONAL") and f["min_notional"] is None:
+                f["min_notional"] = _positive(flt.get("minNotional"))
+        out[str(sym["symbol"]).upper()] = f
+    return out
+
+
+class FilterRegistry:
+    def __init__(self, cache_path: str = EXCHANGE_INFO_CACHE, ttl_sec: float = EXCHANGE_INFO_TTL_SEC):
+        self.cache_path = cache_path
+        self.ttl_sec = float(ttl_sec)
+        self._filters: Dict[str, dict] = {}
+        self._fetched_at = 0.0
+        self._disk_loaded = False
+        self._retry_after = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Thread] = None
+
+    # -------------------------------------------------
+    # Disk
+    # -------------------------------------------------
+    def _load_disk(self) -> None:
+        self._disk_loaded = True
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._filters = {k.upper(): v for k, v in data.get("symbols", {}).items()}
+            self._fetched_at = float(data.get("fetched_at", 0.0))
+        except Exception as e:
+            print(f"⚠️ [filters] önbellek okunamadı ({self.cache_path}): {e}")
+
+    def _save_disk(self) -> None:
+        d = os.path.dirname(self.cache_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self._fetched_at, "symbols": self._filters}, f)
+        os.replace(tmp, self.cache_path)
+
+    # -------------------------------------------------
+    # Yenileme
+    # -------------------------------------------------
+    def refresh(self) -> bool:
+        """Tek toplu exchangeInfo çağrısı. Başarısızsa mevcut (eski) değerler korunur."""
+        try:
+            filters = parse_exchange_info(get_json("/api/v3/exchangeInfo", weight=EXCHANGE_INFO_WEIGHT))
+        except Exception as e:
+            with self._lock:
+                self._retry_after = time.time() + FAILURE_RETRY_SEC
+            print(f"⚠️ [filters] exchangeInfo alınamadı: {e}")
+            return False
+        with self._lock:
+            self._filters = filters
+            self._fetched_at = time.time()
+            self._retry_after = 0.0
+            try:
+                self._save_disk()
+            except Exception as e:
+                print(f"⚠️ [filters] önbellek yazılamadı ({self.cache_path}): {e}")
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self.refresh, name="exchange-info-refresh", daemon=True)
+            self._refreshing.start()
+
+    def get(self, symbol: str, allow_network: bool = True) -> Optional[dict]:
+        s = symbol.upper()
+        with self._lock:
+            if not self._disk_loaded:
+                self._load_disk()
+            have = bool(self._filters)
+            stale = (time.time() - self._fetched_at) > self.ttl_sec
+            may_fetch = allow_network and time.time() >= self._retry_after
+        if not have:
+            if not may_fetch or not self.refresh():
+                return None
+        elif stale and may_fetch:
+            self._refresh_in_background()
+        with self._lock:
+            return self._filters.get(s)
+
 
-_EXINFO_CACHE = {}
-_LOCK = threading.Lock()
-
-def _fetch_price_tick(symbol: str) -> Optional[float]:
-    url = f"https://api.binance.com/api/v3/exchangeInfo?symbol={symbol.upper()}"
-    r = requests.get(url, timeout=(3, 10))
-    r.raise_for_status()
-    data = r.json()
-    sym = data["symbols"][0]
-    for f in sym.get("filters", []):
-        if f.get("filterType") == "PRICE_FILTER":
-            tick = float(f.get("tickSize"))
-            # Bazı sembollerde 0.00000000 gibi olabilir; 0’dan büyük en küçük
-            return tick if tick > 0 else None
-    return None
-
-def get_price_tick(symbol: str) -> Optional[float]:
+REGISTRY = FilterRegistry()
+
+
+def get_filters(symbol: str, allow_network: bool = True) -> Optional[dict]:
+    return REGISTRY.get(symbol, allow_network=allow_network)
+
+
+def get_price_tick(symbol: str, allow_network: bool = True) -> Optional[float]:
     s = symbol.upper()
     # 1) Config override
     if s in PRICE_TICKS:
         return float(PRICE_TICKS[s])
+    # 2) Kayıt (bellek → disk → tek toplu çekim)
+    f = get_filters(s, allow_network=allow_network)
+    return f.get("tick") if f else None
+
+
+def get_lot_step(symbol: str, allow_network: bool = True) -> Optional[float]:
+    f = get_filters(symbol, allow_network=allow_network)
+    return f.get("step") if f else None
+
+
+def get_min_notional(symbol: str, allow_network: bool = True) -> Optional[float]:
+    f = get_filters(symbol, allow_network=allow_network)
+    return f.get("min_notional") if f else None
 
-    # 2) Cache
-    with _LOCK:
-        if s in _EXINFO_CACHE:
-            return _EXINFO_CACHE[s]
-    # 3) Fetch
-    try:
-        tick = _fetch_price_tick(s)
-    except Exception:
-        tick = None
-    with _LOCK:
-        _EXINFO_CACHE[s] = tick
-    return tick
 
 def round_to_tick(value: float, tick: Optional[float]) -> float:
     if not tick or tick <= 0:
@@ -59,3 +179,33 @@ def ceil_to_tick(value: float, tick: Optional[float]) -> float:
     if not tick or tick <= 0:
         return float(value)
     return math.ceil(value / tick) * tick
+
+
+# -------------------------------------------------
+# Vektörel (fiyat/miktar dizileri)
+# -------------------------------------------------
+_QUANTIZE = {"round": np.round, "floor": np.floor, "ceil": np.ceil}
+
+
+def quantize_prices(values, tick: Optional[float], mode: str = "round") -> np.ndarray:
+    """round_to_tick / floor_to_tick / ceil_to_tick'in dizi hali (mode: round | floor | ceil)."""
+    arr = np.asarray(values, dtype=np.float64)
+    if not tick or tick <= 0:
+        return arr.copy()
+    return _QUANTIZE[mode](arr / tick) * tick
+
+
+def quantize_qty(qty, step: Optional[float], min_qty: Optional[float] = None) -> np.ndarray:
+    """LOT_SIZE: miktarı step'e aşağı yuvarla; min_qty altı → 0."""
+    q = quantize_prices(qty, step, mode="floor")
+    if min_qty:
+        q = np.where(q < min_qty, 0.0, q)
+    return q
+
+
+def meets_min_notional(prices, qty, min_notional: Optional[float]) -> np.ndarray:
+    """fiyat * miktar >= min_notional (dizi)."""
+    notional = np.asarray(prices, dtype=np.float64) * np.asarray(qty, dtype=np.float64)
+    if not min_notional:
+        return np.ones(notional.shape, dtype=bool)
+    return notional >= min_notional
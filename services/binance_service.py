@@ -1,26 +1,265 @@
-import requests
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 
-def get_klines(symbol="BTCUSDT", interval="4h", limit=500):
-    url = f"https://api.binance.com/api/v3/klines"
+from services import kline_store
+from services.http_client import get_json, klines_weight
+from services.intervals import interval_to_ms, is_grid_aligned, to_epoch_ms
+
+# (opsiyonel) config override
+try:
+    from paper_trader.config import KLINE_STORE_ENABLED
+except Exception:
+    KLINE_STORE_ENABLED = True
+try:
+    from paper_trader.config import KLINES_MAX_CONCURRENCY, KLINES_WEIGHT_BUDGET
+except Exception:
+    KLINES_MAX_CONCURRENCY = 16   # aynı anda uçuşta en fazla istek
+    KLINES_WEIGHT_BUDGET = 200    # aynı anda uçuşta en fazla toplam ağırlık
+try:
+    from paper_trader.config import KLINE_SETTLE_SEC
+except Exception:
+    KLINE_SETTLE_SEC = 5          # kapanıştan bu kadar sonra bar kesinleşmiş sayılır (saat kayması payı)
+
+KLINES_PATH = "/api/v3/klines"
+MAX_KLINES_PER_REQUEST = 1000
+
+
+def _fetch_raw(symbol: str, interval: str, limit: int,
+               start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> list:
     params = {
         "symbol": symbol,
         "interval": interval,
         "limit": limit
     }
-    response = requests.get(url, params=params)
-    data = response.json()
-
-    klines = []
-    for k in data:
-        klines.append({
-            "timestamp": datetime.fromtimestamp(k[0] / 1000),
-            "open": float(k[1]),
-            "high": float(k[2]),
-            "low": float(k[3]),
-            "close": float(k[4]),
-        })
-
-    df = pd.DataFrame(klines)
+    if start_ms is not None:
+        params["startTime"] = int(start_ms)
+    if end_ms is not None:
+        params["endTime"] = int(end_ms)
+    data = get_json(KLINES_PATH, params=params, weight=klines_weight(limit))
+    if not isinstance(data, list):
+        raise RuntimeError(f"Binance klines hatası ({symbol} {interval}): {data}")
+    return data
+
+
+def fetch_klines_range(symbol: str, interval: str, start_ms: int, end_ms: int) -> List[list]:
+    """start_ms..end_ms (open_time, dahil) aralığını 1000'lik sayfalarla çek."""
+    iv = interval_to_ms(interval)
+    out: List[list] = []
+    cursor = int(start_ms)
+    while cursor <= end_ms:
+        n = min(MAX_KLINES_PER_REQUEST, (end_ms - cursor) // iv + 1)
+        page = _fetch_raw(symbol, interval, n, start_ms=cursor, end_ms=end_ms)
+        if not page:
+            break
+        out.extend(page)
+        if len(page) < n:
+            break
+        cursor = int(page[-1][0]) + iv
+    return out
+
+
+def decode_klines(data: List[list], price_dtype="float64") -> pd.DataFrame:
+    """
+    Ham /api/v3/klines yanıtı → depo formatı, satır döngüsü olmadan:
+      open_time: int64 UTC epoch-ms, open/high/low/close/volume: price_dtype (float64 | float32)
+    """
+    if len(data) == 0:
+        df = pd.DataFrame({c: np.empty(0, dtype=price_dtype) for c in kline_store.STORE_COLUMNS})
+        df["open_time"] = np.empty(0, dtype=np.int64)
+        return df
+    arr = np.array(data, dtype=object)
+    vals = arr[:, 1:6].astype(np.float64).astype(price_dtype, copy=False)
+    return pd.DataFrame({
+        "open_time": arr[:, 0].astype(np.int64),
+        "open": vals[:, 0],
+        "high": vals[:, 1],
+        "low": vals[:, 2],
+        "close": vals[:, 3],
+        "volume": vals[:, 4],
+    }, columns=kline_store.STORE_COLUMNS)
+
+
+def ms_to_timestamp(ms):
+    """Uyumluluk: epoch-ms (int / dizi) → UTC (naive) pd.Timestamp / DatetimeIndex."""
+    if np.ndim(ms) == 0:
+        return pd.Timestamp(int(ms), unit="ms")
+    return pd.to_datetime(np.asarray(ms, dtype=np.int64), unit="ms")
+
+
+def with_timestamp(df: pd.DataFrame) -> pd.DataFrame:
+    """open_time (epoch-ms) kolonundan 'timestamp' kolonunu türet (yoksa)."""
+    if "timestamp" in df.columns or "open_time" not in df.columns:
+        return df
+    df = df.copy()
+    df.insert(0, "timestamp", ms_to_timestamp(df["open_time"].values))
     return df
+
+
+def _to_frame(store_df: pd.DataFrame, price_dtype="float64", timestamps: bool = True) -> pd.DataFrame:
+    """
+    Depo formatı → get_klines çıktısı:
+      timestamp (UTC, naive pd.Timestamp; timestamps=False ise yok), open, high, low, close, volume,
+      open_time (int64 UTC epoch-ms → karşılaştırma / bisect için kanonik zaman)
+    """
+    out = pd.DataFrame({
+        c: store_df[c].to_numpy(dtype=price_dtype) for c in kline_store.STORE_COLUMNS[1:]
+    })
+    out["open_time"] = store_df["open_time"].to_numpy(dtype=np.int64)
+    return with_timestamp(out) if timestamps else out
+
+
+def _get_klines_stored(symbol: str, interval: str, limit: int) -> pd.DataFrame:
+    """
+    Depo öncelikli okuma:
+      - İstenen pencere = oluşmakta olan bar dahil son `limit` bar
+      - Depoda olmayan (kuyruk + delikler) aralıklar çekilir, kesinleşmiş olanlar depoya yazılır
+      - Kesinleşme borsanın close_time'ına (k[6]) göre, KLINE_SETTLE_SEC payıyla: yerel saat biraz ileri
+        olsa da / son işlemler henüz oturmamışsa da yarım bar depoya donmaz
+      - Depodaki son bar her çağrıda kuyruk isteğiyle birlikte yeniden çekilir (fark varsa üzerine yazılır)
+      - Oluşmakta olan bar hiçbir zaman depolanmaz, her çağrıda taze gelir
+    """
+    iv = interval_to_ms(interval)
+    now_ms = int(time.time() * 1000)
+    settled_ms = now_ms - int(KLINE_SETTLE_SEC * 1000)
+    last_open = (now_ms // iv) * iv
+    start_ms = last_open - (limit - 1) * iv
+
+    with kline_store.key_lock(symbol, interval):
+        runs = kline_store.missing_runs(symbol, interval, start_ms, last_open + iv)
+        have = kline_store.window(symbol, interval, start_ms, last_open + iv)["open_time"]
+        if len(have):
+            tail = int(have.iloc[-1])
+            runs = [(tail, b) if a == tail + iv else (a, b) for a, b in runs]
+            if not any(a <= tail <= b for a, b in runs):
+                runs.append((tail, tail))
+
+        fetched: List[list] = []
+        for a, b in runs:
+            rows = fetch_klines_range(symbol, interval, a, b)
+            fetched.extend(rows)
+            got = {int(k[0]) for k in rows}
+            # borsada karşılığı olmayan kesinleşmiş açılışlar (listeleme öncesi / bakım boşluğu);
+            # yalnızca borsa daha sonraki bir barı döndürdüyse gerçek boşluktur (sınırdaki bar henüz gelmemiş olabilir)
+            newest = max(got) if got else None
+            gone = [o for o in range(a, b + 1, iv)
+                    if o not in got and newest is not None and o < newest and o + iv <= settled_ms]
+            if gone:
+                kline_store.mark_unavailable(symbol, interval, gone)
+
+        fresh = decode_klines(fetched)
+        close_time = np.array([int(k[6]) for k in fetched], dtype=np.int64) if fetched else np.empty(0, np.int64)
+        settled = close_time < settled_ms
+        kline_store.merge(symbol, interval, fresh[settled])
+
+        stored = kline_store.window(symbol, interval, start_ms, last_open + iv)
+        live = fresh[~settled]
+
+    out = pd.concat([stored, live], ignore_index=True) if len(live) else stored
+    out = out.drop_duplicates(subset=["open_time"], keep="last").sort_values("open_time")
+    return out.tail(limit).reset_index(drop=True)
+
+
+def get_klines(symbol="BTCUSDT", interval="4h", limit=500, use_store=None,
+               price_dtype="float64", timestamps=True):
+    """
+    Son `limit` bar (oluşmakta olan bar dahil): timestamp, open, high, low, close, volume, open_time.
+    - timestamp: UTC (naive) pd.Timestamp; open_time: int64 UTC epoch-ms
+    - price_dtype="float32" → fiyat kolonları float32 (bellek / bant genişliği)
+    - timestamps=False → timestamp kolonu üretilmez (sadece open_time)
+    use_store=True (varsayılan: config KLINE_STORE_ENABLED) → yerel kline deposundan okur,
+    sadece eksik kuyruğu/delikleri ağdan tamamlar.
+    """
+    if use_store is None:
+        use_store = KLINE_STORE_ENABLED
+
+    if use_store and is_grid_aligned(interval):
+        return _to_frame(_get_klines_stored(symbol, interval, int(limit)), price_dtype, timestamps)
+
+    if int(limit) > MAX_KLINES_PER_REQUEST and is_grid_aligned(interval):
+        # tek istek en fazla 1000 bar döner → pencereyi sayfalayarak çek
+        iv = interval_to_ms(interval)
+        last_open = (int(time.time() * 1000) // iv) * iv
+        data = fetch_klines_range(symbol, interval, last_open - (int(limit) - 1) * iv, last_open)
+        return _to_frame(decode_klines(data).tail(int(limit)).reset_index(drop=True), price_dtype, timestamps)
+
+    data = _fetch_raw(symbol, interval, limit)
+    return _to_frame(decode_klines(data), price_dtype, timestamps)
+
+
+# -------------------------------------------------
+# Toplu (eşzamanlı) çekim
+# -------------------------------------------------
+KlineRequest = Tuple[str, str, int]   # (symbol, interval, limit)
+
+
+async def get_klines_many_async(
+    reqs: Iterable[KlineRequest],
+    max_concurrency: Optional[int] = None,
+    weight_budget: Optional[int] = None,
+    use_store=None,
+) -> Dict[KlineRequest, Optional[pd.DataFrame]]:
+    """
+    get_klines'ı birçok (symbol, interval, limit) için eşzamanlı çalıştırır.
+    - max_concurrency: uçuştaki istek sayısı üst sınırı
+    - weight_budget: uçuştaki isteklerin toplam (tahmini) Binance ağırlığı üst sınırı
+      (dakikalık limit ayrıca http_client.WEIGHTS tarafından korunur)
+    Hata alan istek için değer None olur; diğerleri etkilenmez.
+    """
+    keys = list(dict.fromkeys((s, iv, int(n)) for s, iv, n in reqs))
+    if not keys:
+        return {}
+    max_concurrency = int(max_concurrency or KLINES_MAX_CONCURRENCY)
+    weight_budget = int(weight_budget or KLINES_WEIGHT_BUDGET)
+
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(max_concurrency)
+    cond = asyncio.Condition()
+    in_flight = {"weight": 0}
+    out: Dict[KlineRequest, Optional[pd.DataFrame]] = {}
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(keys))) as pool:
+        async def _one(key: KlineRequest):
+            symbol, interval, limit = key
+            w = min(klines_weight(min(limit, MAX_KLINES_PER_REQUEST)), weight_budget)
+            async with sem:
+                async with cond:
+                    await cond.wait_for(lambda: in_flight["weight"] + w <= weight_budget)
+                    in_flight["weight"] += w
+                try:
+                    out[key] = await loop.run_in_executor(
+                        pool, lambda: get_klines(symbol=symbol, interval=interval, limit=limit, use_store=use_store)
+                    )
+                except Exception as e:
+                    print(f"⚠️ [{symbol} {interval}] kline çekilemedi: {e}")
+                    out[key] = None
+                finally:
+                    async with cond:
+                        in_flight["weight"] -= w
+                        cond.notify_all()
+
+        await asyncio.gather(*(_one(k) for k in keys))
+    return out
+
+
+def get_klines_many(
+    reqs: Iterable[KlineRequest],
+    max_concurrency: Optional[int] = None,
+    weight_budget: Optional[int] = None,
+    use_store=None,
+) -> Dict[KlineRequest, Optional[pd.DataFrame]]:
+    """get_klines_many_async'in senkron sarmalayıcısı → {(symbol, interval, limit): DataFrame|None}"""
+    return asyncio.run(get_klines_many_async(reqs, max_concurrency, weight_budget, use_store))
+
+
+def load_history(symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+    """
+    Sadece yerel depodan (ağ yok) geçmiş barlar: start <= open_time < end.
+    Çok yıllık veri için depo önce services/history_downloader ile doldurulmalı.
+    """
+    start_ms = to_epoch_ms(start) if start is not None else 0
+    end_ms = to_epoch_ms(end) if end is not None else int(time.time() * 1000)
+    return _to_frame(kline_store.window(symbol, interval, start_ms, end_ms))
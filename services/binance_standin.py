@@ -0,0 +1,475 @@
+# services/binance_standin.py
+# Ağsız çalışma / benchmark için yerel Binance REST taklidi.
+# Sunulan uçlar: /api/v3/klines, /api/v3/exchangeInfo, /api/v3/ping
+#
+# Modlar:
+#   synthetic → (symbol, interval, open_time)'dan deterministik üretilen barlar (saat: gerçek UTC)
+#   fixtures  → {fixtures}/klines/{SYMBOL}_{interval}.json + {fixtures}/exchangeInfo.json
+#               Tekrar saati: istemci pencereyi gerçek saatten hesapladığı için (get_klines / kline deposu)
+#               kayıtlar sunucu açılışında tam gün katı kadar ileri kaydırılır → kaydın sonu "şimdi"ye denk
+#               gelir, zaman gerçek hızda ilerler, henüz "gelmemiş" barlar verilmez. Kaydın kendi zamanları
+#               gerekiyorsa (örn. geçmiş tarihli history_downloader) --no-replay-shift.
+#   record    → istekleri upstream'e (gerçek Binance) iletir, yanıtları fixtures'a kaydeder
+# Ayarlar: gecikme (latency_ms ± jitter_ms), hata oranı (500), dakikalık ağırlık limiti
+#          (X-MBX-USED-WEIGHT-1M başlığı, limit aşılınca 429 + Retry-After)
+#
+# Kullanım:
+#   python -m services.binance_standin --port 8081 --mode synthetic --latency-ms 40 --error-rate 0.01
+#   BINANCE_BASE_URL=http://127.0.0.1:8081 python -m paper_trader.paper_trader --once
+#   python -m services.binance_standin --bench-cycles 20      # uçtan uca döngü gecikmesi ölçümü
+#   python -m services.binance_standin --ws-port 8082 --bar-seconds 2   # hızlandırılmış kline WebSocket akışı
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import functools
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from services.http_client import EXCHANGE_INFO_WEIGHT, klines_weight
+from services.intervals import interval_to_ms
+
+DAY_MS = 86_400_000
+
+DEFAULT_SYMBOLS = [
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT",
+    "ADAUSDT", "XRPUSDT", "AVAXUSDT", "DOGEUSDT", "LINKUSDT", "DOTUSDT",
+]
+
+
+# -------------------------------------------------
+# Sentetik veri
+# -------------------------------------------------
+def _bar_rng(symbol: str, interval: str, k: int) -> random.Random:
+    return random.Random(zlib.crc32(f"{symbol}|{interval}|{k}".encode()))
+
+
+def _synthetic_close(symbol: str, interval: str, k: int) -> float:
+    """k. barın kapanışı: sembole özgü taban + üst üste binmiş dalgalar + bar gürültüsü (deterministik)."""
+    base = 10.0 + (zlib.crc32(symbol.encode()) % 50000)
+    phase = (zlib.crc32(symbol.encode()) % 1000) / 100.0
+    wave = 0.06 * math.sin(k / 40.0 + phase) + 0.025 * math.sin(k / 9.0 + 2 * phase)
+    noise = (_bar_rng(symbol, interval, k).random() - 0.5) * 0.01
+    return base * (1.0 + wave + noise)
+
+
+def synthetic_kline(symbol: str, interval: str, open_time: int) -> list:
+    iv = interval_to_ms(interval)
+    k = open_time // iv
+    o = _synthetic_close(symbol, interval, k - 1)
+    c = _synthetic_close(symbol, interval, k)
+    rng = _bar_rng(symbol, interval, -k)
+    h = max(o, c) * (1.0 + rng.random() * 0.004)
+    l = min(o, c) * (1.0 - rng.random() * 0.004)
+    v = 100.0 + rng.random() * 900.0
+    return [open_time, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}",
+            open_time + iv - 1, f"{v * c:.8f}", 100, f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"]
+
+
+def _select_opens(iv: int, limit: int, start: Optional[int], end: Optional[int], now_ms: int) -> List[int]:
+    last_open = (min(end, now_ms) if end is not None else now_ms) // iv * iv
+    if start is not None:
+        first = (start + iv - 1) // iv * iv
+        return list(range(first, last_open + 1, iv))[:limit]
+    return list(range(max(last_open - (limit - 1) * iv, 0), last_open + 1, iv))
+
+
+def synthetic_exchange_info(symbols: List[str]) -> dict:
+    return {
+        "timezone": "UTC",
+        "serverTime": int(time.time() * 1000),
+        "symbols": [{
+            "symbol": s,
+            "status": "TRADING",
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.00010000", "maxPrice": "1000000.00000000", "tickSize": "0.00010000"},
+                {"filterType": "LOT_SIZE", "minQty": "0.00100000", "maxQty": "9000000.00000000", "stepSize": "0.00100000"},
+                {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True},
+            ],
+        } for s in symbols],
+    }
+
+
+# -------------------------------------------------
+# Sunucu
+# -------------------------------------------------
+class StandinState:
+    def __init__(self, mode: str = "synthetic", fixtures_dir: str = "binance_fixtures",
+                 upstream: str = "https://api.binance.com", symbols: Optional[List[str]] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 weight_limit: int = 6000, seed: int = 0, replay_shift: bool = True):
+        if mode not in ("synthetic", "fixtures", "record"):
+            raise ValueError(f"Bilinmeyen mod: {mode}")
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.upstream = upstream.rstrip("/")
+        self.symbols = [s.upper() for s in (symbols or DEFAULT_SYMBOLS)]
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.weight_limit = int(weight_limit)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._minute = int(time.time() // 60)
+        self._used = 0
+        self._fixtures: Dict[Tuple[str, str], List[list]] = {}
+        self.requests = 0
+        self.replay_shift = bool(replay_shift)
+        self._started_ms = int(time.time() * 1000)
+        self._shift_ms: Optional[int] = None
+
+    # --- ağırlık / hata / gecikme ---
+    def admit(self, weight: int) -> Tuple[int, Optional[int], float]:
+        """→ (kullanılan ağırlık, hata kodu | None, uygulanacak gecikme sn)"""
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            m = int(now // 60)
+            if m != self._minute:
+                self._minute, self._used = m, 0
+            self._used += weight
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            if self._used > self.weight_limit:
+                return self._used, 429, delay
+            if self.error_rate > 0 and self._rng.random() < self.error_rate:
+                return self._used, 500, delay
+            return self._used, None, delay
+
+    def retry_after(self) -> int:
+        return max(1, int((self._minute + 1) * 60 - time.time()) + 1)
+
+    # --- fixtures ---
+    def _kline_fixture_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.fixtures_dir, "klines", f"{symbol.upper()}_{interval}.json")
+
+    def fixture_klines(self, symbol: str, interval: str) -> List[list]:
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key not in self._fixtures:
+                path = self._kline_fixture_path(symbol, interval)
+                rows: List[list] = []
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        rows = json.load(f)
+                rows.sort(key=lambda k: k[0])
+                self._fixtures[key] = rows
+            return self._fixtures[key]
+
+    def fixtures_end(self) -> Optional[int]:
+        """Tüm kline kayıtlarının sonu (son barın kapanışı, epoch-ms); kayıt yoksa None."""
+        d = os.path.join(self.fixtures_dir, "klines")
+        end = None
+        for name in (os.listdir(d) if os.path.isdir(d) else []):
+            if not name.endswith(".json"):
+                continue
+            symbol, _, interval = name[:-5].rpartition("_")
+            rows = self.fixture_klines(symbol, interval)
+            if rows:
+                last = int(rows[-1][0]) + interval_to_ms(interval)
+                end = last if end is None else max(end, last)
+        return end
+
+    def shift_ms(self) -> int:
+        """
+        fixtures modu tekrar saati: kayıt zamanlarına eklenen kaydırma (tam gün katı → 1m..1d ızgaraları korunur).
+        Sunucu açıldığında kaydın sonu ile "şimdi" arasındaki en küçük gün katı; kayıt zaten güncelse 0.
+        """
+        if self._shift_ms is None:
+            end = self.fixtures_end() if self.replay_shift else None
+            gap = self._started_ms - end if end is not None else 0
+            self._shift_ms = -(-gap // DAY_MS) * DAY_MS if gap > 0 else 0
+        return self._shift_ms
+
+    def record_klines(self, symbol: str, interval: str, rows: List[list]) -> None:
+        if not rows:
+            return
+        iv = interval_to_ms(interval)
+        now_ms = int(time.time() * 1000)
+        closed = [k for k in rows if int(k[0]) + iv <= now_ms]
+        merged = {int(k[0]): k for k in self.fixture_klines(symbol, interval)}
+        merged.update({int(k[0]): k for k in closed})
+        out = [merged[t] for t in sorted(merged)]
+        path = self._kline_fixture_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(out, f)
+            self._fixtures[(symbol.upper(), interval)] = out
+
+    def klines(self, symbol: str, interval: str, limit: int,
+               start: Optional[int], end: Optional[int], query: str) -> List[list]:
+        limit = max(1, min(int(limit), 1000))
+        if self.mode == "record":
+            r = requests.get(f"{self.upstream}/api/v3/klines?{query}", timeout=(3, 10))
+            r.raise_for_status()
+            rows = r.json()
+            self.record_klines(symbol, interval, rows)
+            return rows
+        if self.mode == "fixtures":
+            shift = self.shift_ms()
+            rows = self.fixture_klines(symbol, interval)
+            # tekrar saatine göre henüz açılmamış barlar verilmez (gerçek borsa gibi)
+            last = int(time.time() * 1000) if end is None else min(int(end), int(time.time() * 1000))
+            if start is not None:
+                sel = [k for k in rows if start <= k[0] + shift <= last][:limit]
+            else:
+                sel = [k for k in rows if k[0] + shift <= last][-limit:]
+            if not shift:
+                return sel
+            return [[k[0] + shift] + k[1:6] + [k[6] + shift] + k[7:] for k in sel]
+        iv = interval_to_ms(interval)
+        opens = _select_opens(iv, limit, start, end, int(time.time() * 1000))
+        return [synthetic_kline(symbol.upper(), interval, o) for o in opens]
+
+    def exchange_info(self, symbol: Optional[str], query: str) -> dict:
+        path = os.path.join(self.fixtures_dir, "exchangeInfo.json")
+        if self.mode == "record":
+            r = requests.get(f"{self.upstream}/api/v3/exchangeInfo" + (f"?{query}" if query else ""), timeout=(3, 10))
+            r.raise_for_status()
+            data = r.json()
+            if symbol is None:
+                os.makedirs(self.fixtures_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+            return data
+        if self.mode == "fixtures" and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            data = synthetic_exchange_info(self.symbols if symbol is None else [symbol.upper()])
+        if symbol is not None:
+            data = dict(data, symbols=[s for s in data["symbols"] if s["symbol"] == symbol.upper()])
+        return data
+
+
+def _make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload, used: int, extra: Optional[dict] = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-MBX-USED-WEIGHT", str(used))
+            self.send_header("X-MBX-USED-WEIGHT-1M", str(used))
+            for k, v in (extra or {}).items():
+                self.send_header(k, str(v))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/api/v3/klines":
+                weight = klines_weight(int(q.get("limit", 500)))
+            elif url.path == "/api/v3/exchangeInfo":
+                weight = EXCHANGE_INFO_WEIGHT
+            else:
+                weight = 1
+
+            used, err, delay = state.admit(weight)
+            if delay:
+                time.sleep(delay)
+            if err == 429:
+                return self._send(429, {"code": -1003, "msg": "Too many requests (standin)."}, used,
+                                  {"Retry-After": state.retry_after()})
+            if err is not None:
+                return self._send(err, {"code": -1000, "msg": "Injected error (standin)."}, used)
+
+            try:
+                if url.path == "/api/v3/ping":
+                    return self._send(200, {}, used)
+                if url.path == "/api/v3/klines":
+                    if "symbol" not in q or "interval" not in q:
+                        return self._send(400, {"code": -1102, "msg": "symbol/interval gerekli"}, used)
+                    rows = state.klines(
+                        q["symbol"], q["interval"], int(q.get("limit", 500)),
+                        int(q["startTime"]) if "startTime" in q else None,
+                        int(q["endTime"]) if "endTime" in q else None,
+                        url.query,
+                    )
+                    return self._send(200, rows, used)
+                if url.path == "/api/v3/exchangeInfo":
+                    return self._send(200, state.exchange_info(q.get("symbol"), url.query), used)
+                return self._send(404, {"code": -1, "msg": "not found"}, used)
+            except ValueError as e:
+                return self._send(400, {"code": -1120, "msg": str(e)}, used)
+            except Exception as e:
+                return self._send(502, {"code": -1000, "msg": f"standin: {e}"}, used)
+
+    return Handler
+
+
+def start_standin(host: str = "127.0.0.1", port: int = 0, **opts) -> Tuple[ThreadingHTTPServer, str]:
+    """Sunucuyu arka plan thread'inde başlat → (server, base_url). Kapatmak için server.shutdown()."""
+    state = StandinState(**opts)
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# -------------------------------------------------
+# WebSocket kline akışı (hızlandırılmış saat)
+# -------------------------------------------------
+def _kline_event(symbol: str, interval: str, kline: list, closed: bool) -> dict:
+    return {
+        "e": "kline", "E": int(time.time() * 1000), "s": symbol,
+        "k": {
+            "t": kline[0], "T": kline[6], "s": symbol, "i": interval,
+            "o": kline[1], "h": kline[2], "l": kline[3], "c": kline[4], "v": kline[5],
+            "n": kline[8], "x": closed, "q": kline[7],
+        },
+    }
+
+
+async def _ws_handler(websocket, path=None, bar_seconds: float = 2.0, updates_per_bar: int = 3):
+    """
+    /stream?streams=btcusdt@kline_1h/... → her stream için 'bar_seconds' gerçek saniyede bir bar kapatır.
+    Bar başına updates_per_bar adet x=false güncellemesi, ardından x=true kapanış gönderilir.
+    """
+    request = getattr(websocket, "request", None)
+    path = request.path if request is not None else (path or getattr(websocket, "path", ""))
+    q = parse_qs(urlparse(path).query)
+    streams = [s for s in q.get("streams", [""])[-1].split("/") if "@kline_" in s]
+    subs = []
+    for name in streams:
+        sym, iv = name.split("@kline_")
+        subs.append((sym.upper(), iv, interval_to_ms(iv)))
+    if not subs:
+        await websocket.close()
+        return
+
+    # her stream kendi ızgarasında, şimdiki gerçek bardan başlayarak ilerler
+    opens = {(s, iv): (int(time.time() * 1000) // ms) * ms for s, iv, ms in subs}
+    step = bar_seconds / (updates_per_bar + 1)
+    while True:
+        for u in range(updates_per_bar + 1):
+            await asyncio.sleep(step)
+            closed = u == updates_per_bar
+            for s, iv, ms in subs:
+                k = synthetic_kline(s, iv, opens[(s, iv)])
+                if not closed:
+                    # kısmi bar: kapanış açılıştan sona doğru ilerler
+                    frac = (u + 1) / (updates_per_bar + 1)
+                    c = float(k[1]) + (float(k[4]) - float(k[1])) * frac
+                    k = list(k)
+                    k[4] = f"{c:.8f}"
+                    k[2] = f"{max(float(k[1]), c):.8f}"
+                    k[3] = f"{min(float(k[1]), c):.8f}"
+                await websocket.send(json.dumps({"stream": f"{s.lower()}@kline_{iv}",
+                                                 "data": _kline_event(s, iv, k, closed)}))
+        for s, iv, ms in subs:
+            opens[(s, iv)] += ms
+
+
+def start_stream_standin(host: str = "127.0.0.1", port: int = 0, bar_seconds: float = 2.0,
+                         updates_per_bar: int = 3) -> Tuple[object, str]:
+    """WebSocket akışını arka plan thread'inde başlat → (stop fonksiyonu, ws_url). 'websockets' gerekir."""
+    import websockets
+
+    ready = threading.Event()
+    box = {}
+
+    async def _main():
+        handler = functools.partial(_ws_handler, bar_seconds=bar_seconds, updates_per_bar=updates_per_bar)
+        async with websockets.serve(handler, host, port) as server:
+            sock = next(iter(server.sockets))
+            box["url"] = f"ws://{host}:{sock.getsockname()[1]}"
+            box["stop"] = asyncio.Event()
+            box["loop"] = asyncio.get_running_loop()
+            ready.set()
+            await box["stop"].wait()
+
+    threading.Thread(target=lambda: asyncio.run(_main()), daemon=True).start()
+    ready.wait(10)
+
+    def stop():
+        box["loop"].call_soon_threadsafe(box["stop"].set)
+
+    return stop, box["url"]
+
+
+def run_bench(cycles: int, symbols: List[str], interval: str, use_store: bool, **opts) -> None:
+    """Yerel sunucuya karşı on_bar_open'daki çekim + sinyal hesabını tekrarla, döngü gecikmesini ölç."""
+    from services import http_client
+    from services.binance_service import get_klines_many
+    from analysis.live_signal import get_live_signal, live_signal_requests, signal_frames
+
+    server, base_url = start_standin(symbols=symbols, **opts)
+    http_client.BINANCE_BASE_URL = base_url
+    times = []
+    try:
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            sig_reqs = {s: live_signal_requests(s, interval=interval) for s in symbols}
+            frames = get_klines_many([r for reqs in sig_reqs.values() for r in reqs], use_store=use_store)
+            for s, reqs in sig_reqs.items():
+                df, htf_df = signal_frames(reqs, frames)
+                get_live_signal(symbol=s, interval=interval, df=df, htf_df=htf_df)
+            times.append(time.perf_counter() - t0)
+    finally:
+        server.shutdown()
+    times.sort()
+
+    def _pct(p):
+        return times[min(len(times) - 1, int(round(p / 100.0 * (len(times) - 1))))] * 1000
+
+    print(f"[bench] {cycles} döngü, {len(symbols)} sembol, {server.state.requests} istek | "
+          f"p50:{_pct(50):.1f}ms p95:{_pct(95):.1f}ms max:{times[-1] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yerel Binance REST taklidi (kayıt/tekrar/sentetik)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--mode", choices=["synthetic", "fixtures", "record"], default="synthetic")
+    parser.add_argument("--fixtures", default="binance_fixtures")
+    parser.add_argument("--upstream", default="https://api.binance.com")
+    parser.add_argument("--symbols", nargs="+", default=None)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--weight-limit", type=int, default=6000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-replay-shift", action="store_true",
+                        help="fixtures: kayıtları kendi zamanlarıyla sun (varsayılan: sonu şimdiye kaydırılır)")
+    parser.add_argument("--bench-cycles", type=int, default=0, help=">0 → sunucuyu başlat, döngü benchmark'ı çalıştır, çık")
+    parser.add_argument("--bench-interval", default="1h")
+    parser.add_argument("--bench-store", action="store_true", help="benchmark'ta yerel kline deposunu kullan")
+    parser.add_argument("--ws-port", type=int, default=0, help=">0 → kline WebSocket akışı da bu porttan sunulur")
+    parser.add_argument("--bar-seconds", type=float, default=2.0, help="WebSocket akışında bir barın gerçek süresi")
+    args = parser.parse_args()
+
+    opts = dict(mode=args.mode, fixtures_dir=args.fixtures, upstream=args.upstream,
+                latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                weight_limit=args.weight_limit, seed=args.seed, replay_shift=not args.no_replay_shift)
+    if args.bench_cycles > 0:
+        run_bench(args.bench_cycles, [s.upper() for s in (args.symbols or DEFAULT_SYMBOLS)],
+                  args.bench_interval, args.bench_store, **opts)
+    else:
+        if args.ws_port > 0:
+            _stop_ws, ws_url = start_stream_standin(args.host, args.ws_port, bar_seconds=args.bar_seconds)
+            print(f"🧪 Kline WebSocket stand-in → {ws_url}  (BINANCE_WS_URL ile yönlendir)")
+        server = ThreadingHTTPServer((args.host, args.port), _make_handler(StandinState(symbols=args.symbols, **opts)))
+        print(f"🧪 Binance stand-in ({args.mode}) → http://{args.host}:{args.port}  "
+              f"(BINANCE_BASE_URL ile yönlendir)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStand-in kapatıldı.")
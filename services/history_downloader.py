@@ -0,0 +1,210 @@
+# services/history_downloader.py
+# Çok yıllık kline geçmişini startTime/endTime ile 1000'lik sayfalar halinde indirir.
+# - Sayfalar (tüm sembol/interval'ler) paralel çekilir; dakikalık ağırlık http_client tarafından korunur
+# - Her (symbol, interval) için checkpoint: {KLINE_STORE_DIR}/_checkpoints/{SYMBOL}_{interval}.json
+#   → yarıda kalan indirme kaldığı sayfadan devam eder
+# - Sonuç yerel kline deposuna yazılır (services/kline_store) → load_history / run_backtest
+#
+# Kullanım:
+#   python -m services.history_downloader --symbols BTCUSDT ETHUSDT --intervals 1h 4h --start 2021-01-01
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from services import kline_store
+from services.binance_service import MAX_KLINES_PER_REQUEST, decode_klines, fetch_klines_range
+from services.intervals import interval_to_ms, is_grid_aligned, to_epoch_ms
+
+try:
+    from paper_trader.config import HISTORY_MAX_WORKERS
+except Exception:
+    HISTORY_MAX_WORKERS = 8
+
+FLUSH_EVERY_PAGES = 20   # bu kadar sayfada bir depoya yaz + checkpoint kaydet
+
+
+def checkpoint_path(symbol: str, interval: str) -> str:
+    return os.path.join(kline_store.KLINE_STORE_DIR, "_checkpoints", f"{symbol.upper()}_{interval}.json")
+
+
+def load_checkpoint(symbol: str, interval: str, start_ms: int) -> Set[int]:
+    """Tamamlanmış sayfa başlangıçları. Farklı start ile alınmış checkpoint yok sayılır."""
+    path = checkpoint_path(symbol, interval)
+    if not os.path.exists(path):
+        return set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return set()
+    if int(data.get("start_ms", -1)) != int(start_ms):
+        return set()
+    return {int(p) for p in data.get("done", [])}
+
+
+def save_checkpoint(symbol: str, interval: str, start_ms: int, end_ms: int, done: Iterable[int]) -> None:
+    path = checkpoint_path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"start_ms": int(start_ms), "end_ms": int(end_ms), "done": sorted(int(p) for p in done)}, f)
+    os.replace(tmp, path)
+
+
+def plan_pages(start_ms: int, end_ms: int, interval: str) -> List[Tuple[int, int]]:
+    """
+    [start_ms, end_ms) aralığını ızgaraya hizalı sayfalara böl → [(ilk_open, son_open), ...]
+    Sayfa sınırları yalnızca start_ms'e bağlıdır; end uzatılınca eski sayfalar geçerli kalır.
+    """
+    iv = interval_to_ms(interval)
+    first = ((int(start_ms) + iv - 1) // iv) * iv
+    page_span = MAX_KLINES_PER_REQUEST * iv
+    pages = []
+    a = first
+    while a < end_ms:
+        b = min(a + page_span - iv, ((int(end_ms) - 1) // iv) * iv)
+        pages.append((a, b))
+        a += page_span
+    return pages
+
+
+def download_history(
+    symbols: List[str],
+    intervals: List[str],
+    start,
+    end=None,
+    max_workers: Optional[int] = None,
+    verbose: bool = True,
+) -> Dict[Tuple[str, str], int]:
+    """
+    Her (symbol, interval) için start..end aralığındaki KAPANMIŞ barları depoya indir.
+    Dönen: {(symbol, interval): depodaki bar sayısı}
+    """
+    max_workers = int(max_workers or HISTORY_MAX_WORKERS)
+    start_ms = to_epoch_ms(start)
+    now_ms = int(time.time() * 1000)
+    end_ms = min(to_epoch_ms(end), now_ms) if end is not None else now_ms
+
+    jobs: List[Tuple[str, str, int, int]] = []
+    done: Dict[Tuple[str, str], Set[int]] = {}
+    total: Dict[Tuple[str, str], int] = {}
+    for symbol in symbols:
+        for interval in intervals:
+            if not is_grid_aligned(interval):
+                raise ValueError(f"history_downloader {interval!r} desteklemiyor (1m..1d)")
+            iv = interval_to_ms(interval)
+            # yalnızca kapanmış barlar: son sayfa oluşmakta olan barı içermesin
+            key_end = min(end_ms, (now_ms // iv) * iv)
+            key = (symbol.upper(), interval)
+            done[key] = load_checkpoint(symbol, interval, start_ms)
+            pages = plan_pages(start_ms, key_end, interval)
+            total[key] = len(pages)
+            for a, b in pages:
+                if a in done[key]:
+                    continue
+                # depoda zaten tam olan sayfa → ağa gitmeden tamam say
+                if not kline_store.missing_runs(symbol, interval, a, b + iv):
+                    done[key].add(a)
+                    continue
+                jobs.append((key[0], interval, a, b))
+            if verbose:
+                print(f"[history] {key[0]} {interval}: {len(pages)} sayfa, {len(pages) - len(done[key])} indirilecek")
+
+    # Sayfalar as_completed sırasıyla biter; depoya ise sayfa sırasıyla yazılır → kline_store.merge ekleme
+    # yolunu kullanır (dosya baştan yazılmaz). Depoda indirilen aralıktan sonraki barlar zaten varsa
+    # (ör. canlı kullanımdan kalan son barlar) birleştirme bellekte yapılır, dosya sonda bir kez yazılır.
+    order: Dict[Tuple[str, str], List[int]] = {k: [] for k in done}
+    for s, iv, a, b in jobs:
+        order[(s, iv)].append(a)
+    for k in order:
+        order[k].sort()
+    ready: Dict[Tuple[str, str], Dict[int, Optional[pd.DataFrame]]] = {k: {} for k in done}
+    cursor: Dict[Tuple[str, str], int] = {k: 0 for k in done}
+    failed: Dict[Tuple[str, str], Set[int]] = {k: set() for k in done}
+    in_memory: Set[Tuple[str, str]] = set()     # disk kopyası eski; sonda kline_store.flush gerekir
+    pending: Dict[Tuple[str, str], List[pd.DataFrame]] = {k: [] for k in done}
+    pending_pages: Dict[Tuple[str, str], List[int]] = {k: [] for k in done}
+
+    def _advance(key: Tuple[str, str]) -> None:
+        """Sıradaki sayfa(lar) hazırsa pending'e al (hatalı sayfa atlanır, checkpoint'e girmez)."""
+        pages = order[key]
+        while cursor[key] < len(pages) and pages[cursor[key]] in ready[key]:
+            a = pages[cursor[key]]
+            cursor[key] += 1
+            df = ready[key].pop(a)
+            if a in failed[key]:
+                continue
+            if df is not None:
+                pending[key].append(df)
+            pending_pages[key].append(a)
+
+    def _flush(key: Tuple[str, str]) -> None:
+        if pending[key]:
+            rows = pd.concat(pending[key], ignore_index=True)
+            cur = kline_store.load(*key)
+            if len(cur) and int(rows["open_time"].min()) <= int(cur["open_time"].iloc[-1]):
+                in_memory.add(key)
+            kline_store.merge(key[0], key[1], rows, persist=key not in in_memory)
+        done[key].update(pending_pages[key])
+        if key not in in_memory:
+            save_checkpoint(key[0], key[1], start_ms, end_ms, done[key])
+        pending[key].clear()
+        pending_pages[key].clear()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futs = {pool.submit(fetch_klines_range, s, iv, a, b): (s, iv, a) for s, iv, a, b in jobs}
+        for i, fut in enumerate(as_completed(futs), start=1):
+            s, iv, a = futs[fut]
+            key = (s, iv)
+            try:
+                rows = fut.result()
+                ready[key][a] = decode_klines(rows) if rows else None
+            except Exception as e:
+                # checkpoint'e yazılmaz → bir sonraki çalıştırmada tekrar denenir
+                print(f"⚠️ [history] {s} {iv} sayfa {pd.Timestamp(a, unit='ms')}: {e}")
+                failed[key].add(a)
+                ready[key][a] = None
+            _advance(key)
+            if len(pending_pages[key]) >= FLUSH_EVERY_PAGES:
+                _flush(key)
+            if verbose and i % 50 == 0:
+                print(f"[history] {i}/{len(jobs)} sayfa indirildi")
+
+    for key in done:
+        _flush(key)
+        if key in in_memory:
+            kline_store.flush(*key)
+            save_checkpoint(key[0], key[1], start_ms, end_ms, done[key])
+
+    out = {key: len(kline_store.load(*key)) for key in done}
+    if verbose:
+        for (s, iv), n in out.items():
+            missing = total[(s, iv)] - len(done[(s, iv)])
+            note = f", {missing} sayfa eksik (tekrar çalıştır)" if missing else ""
+            print(f"[history] {s} {iv}: depoda {n} bar{note}")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binance kline geçmişi indirici (devam ettirilebilir)")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--intervals", nargs="+", default=["1h"])
+    parser.add_argument("--start", required=True, help="örn. 2021-01-01 (UTC)")
+    parser.add_argument("--end", default=None, help="varsayılan: şimdi")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--archive", action="store_true",
+                        help="İndirme sonrası memmap kolon arşivini de güncelle (services/ohlc_archive)")
+    args = parser.parse_args()
+
+    counts = download_history(args.symbols, args.intervals, args.start, args.end, max_workers=args.workers)
+    if args.archive:
+        from services.ohlc_archive import build_archive_from_store
+        for s, iv in counts:
+            print(f"[archive] {s} {iv}: {build_archive_from_store(s, iv)} bar")
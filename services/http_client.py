@@ -0,0 +1,184 @@
+# services/http_client.py
+# Binance REST için ortak istemci katmanı:
+# - Tek requests.Session + bağlantı havuzu (TLS keep-alive)
+# - Zaman aşımı, jitter'lı üstel geri çekilme (connection error / 5xx / 429 / 418)
+# - X-MBX-USED-WEIGHT-1M başlığı ile ağırlık takibi: limite yaklaşınca dakika dolana kadar bekle
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (opsiyonel) config override
+try:
+    from paper_trader.config import BINANCE_BASE_URL
+except Exception:
+    BINANCE_BASE_URL = "https://api.binance.com"
+# Ortam değişkeni config'i ezer (örn. yerel stand-in: services/binance_standin.py)
+BINANCE_BASE_URL = os.environ.get("BINANCE_BASE_URL", BINANCE_BASE_URL)
+try:
+    from paper_trader.config import (
+        HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_POOL_SIZE,
+        BINANCE_WEIGHT_LIMIT, BINANCE_WEIGHT_SAFETY, HTTP_MAX_BAN_WAIT_SEC,
+    )
+except Exception:
+    HTTP_TIMEOUT = (3, 10)          # (connect, read) saniye
+    HTTP_MAX_RETRIES = 4
+    HTTP_POOL_SIZE = 32
+    BINANCE_WEIGHT_LIMIT = 6000     # REQUEST_WEIGHT / dakika
+    BINANCE_WEIGHT_SAFETY = 0.8     # limitin bu oranına gelince yavaşla
+    HTTP_MAX_BAN_WAIT_SEC = 60      # 429/418 sonrası en fazla bu kadar bekle, fazlası → hata
+
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_CAP_SEC = 8.0
+
+
+class RateLimitError(RuntimeError):
+    """Binance 429/418 sonrası bekleme süresi HTTP_MAX_BAN_WAIT_SEC'i aşıyor."""
+
+
+def klines_weight(limit: int) -> int:
+    """/api/v3/klines ağırlığı (Binance dokümanı: limit'e göre 1/2/5/10)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+EXCHANGE_INFO_WEIGHT = 20
+
+
+class WeightTracker:
+    """
+    Dakikalık kullanılan ağırlığın yerel takibi.
+    Sunucunun bildirdiği değer (X-MBX-USED-WEIGHT-1M) geldikçe düzeltilir;
+    arada yerel sayaç ile tahmin edilir.
+    """
+
+    def __init__(self, limit: int = BINANCE_WEIGHT_LIMIT, safety: float = BINANCE_WEIGHT_SAFETY):
+        self.limit = int(limit)
+        self.safety = float(safety)
+        self._lock = threading.Lock()
+        self._minute = int(time.time() // 60)
+        self._used = 0
+        self._blocked_until = 0.0
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            self._roll(time.time())
+            return self._used
+
+    def _roll(self, now: float) -> None:
+        m = int(now // 60)
+        if m != self._minute:
+            self._minute = m
+            self._used = 0
+
+    def acquire(self, weight: int) -> None:
+        """İstekten önce çağır: bütçe yoksa dakika dönene (veya ban bitene) kadar bekler."""
+        budget = int(self.limit * self.safety)
+        while True:
+            with self._lock:
+                now = time.time()
+                self._roll(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                    if wait > HTTP_MAX_BAN_WAIT_SEC:
+                        raise RateLimitError(f"Binance rate-limit: {wait:.0f} sn beklemek gerekiyor")
+                elif self._used + weight <= budget or self._used == 0:
+                    self._used += weight
+                    return
+                else:
+                    wait = (self._minute + 1) * 60 - now
+            time.sleep(max(wait, 0.01))
+
+    def update(self, headers, status_code: int) -> None:
+        """Yanıt başlıklarından ağırlığı/ban süresini güncelle."""
+        now = time.time()
+        used = None
+        for k, v in headers.items():
+            lk = k.lower()
+            if lk == "x-mbx-used-weight-1m" or (used is None and lk == "x-mbx-used-weight"):
+                try:
+                    used = int(v)
+                except (TypeError, ValueError):
+                    pass
+        with self._lock:
+            self._roll(now)
+            if used is not None:
+                self._used = max(self._used, used)
+            if status_code in (418, 429):
+                try:
+                    retry_after = float(headers.get("Retry-After", 0))
+                except (TypeError, ValueError):
+                    retry_after = 0.0
+                # Retry-After yoksa dakikanın sonuna kadar bekle
+                until = now + retry_after if retry_after > 0 else (self._minute + 1) * 60
+                self._blocked_until = max(self._blocked_until, until)
+
+
+WEIGHTS = WeightTracker()
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+        return _SESSION
+
+
+def _backoff(attempt: int) -> float:
+    # "full jitter": [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_CAP_SEC, BACKOFF_BASE_SEC * (2 ** attempt)))
+
+
+def get_json(path: str, params: Optional[Dict[str, Any]] = None, weight: int = 1,
+             timeout=None, max_retries: Optional[int] = None) -> Any:
+    """
+    BINANCE_BASE_URL + path için GET → JSON.
+    Bağlantı hatası, zaman aşımı, 5xx, 429 ve 418'de geri çekilip tekrar dener.
+    4xx (429/418 hariç) anında requests.HTTPError fırlatır.
+    """
+    url = BINANCE_BASE_URL.rstrip("/") + path
+    timeout = HTTP_TIMEOUT if timeout is None else timeout
+    retries = HTTP_MAX_RETRIES if max_retries is None else int(max_retries)
+    session = get_session()
+
+    last_exc: Optional[Exception] = None
+    for attempt in range(retries + 1):
+        WEIGHTS.acquire(weight)
+        try:
+            r = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_exc = e
+            if attempt < retries:
+                time.sleep(_backoff(attempt))
+            continue
+
+        WEIGHTS.update(r.headers, r.status_code)
+        if r.status_code in (418, 429) or r.status_code >= 500:
+            last_exc = requests.HTTPError(f"{r.status_code} {r.reason} ({url})", response=r)
+            if attempt < retries and r.status_code >= 500:
+                time.sleep(_backoff(attempt))
+            # 418/429: bekleme WeightTracker.acquire içinde (Retry-After)
+            continue
+
+        r.raise_for_status()
+        return r.json()
+
+    raise last_exc if last_exc is not None else RuntimeError(f"İstek başarısız: {url}")
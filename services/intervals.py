@@ -0,0 +1,53 @@
+# services/intervals.py
+# Binance kline aralıkları → milisaniye
+import pandas as pd
+
+_UNIT_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 7 * 86_400_000,
+}
+
+DAY_MS = _UNIT_MS["d"]
+
+
+def interval_to_ms(interval: str) -> int:
+    """'15m' → 900000, '4h' → 14400000. Ay ('1M') sabit uzunlukta olmadığı için desteklenmez."""
+    if not interval or interval[-1] not in _UNIT_MS:
+        raise ValueError(f"Desteklenmeyen interval: {interval!r}")
+    try:
+        n = int(interval[:-1])
+    except ValueError:
+        raise ValueError(f"Desteklenmeyen interval: {interval!r}")
+    if n <= 0:
+        raise ValueError(f"Desteklenmeyen interval: {interval!r}")
+    return n * _UNIT_MS[interval[-1]]
+
+
+def is_grid_aligned(interval: str) -> bool:
+    """
+    Bar açılışları epoch'a göre sabit ızgarada mı? (open_time % interval_ms == 0)
+    Günü tam bölen aralıklar (1m..1d) UTC 00:00'a hizalıdır; 3d/1w/1M değildir.
+    """
+    try:
+        ms = interval_to_ms(interval)
+    except ValueError:
+        return False
+    return ms <= DAY_MS and DAY_MS % ms == 0
+
+
+def bar_open_floor(ts_ms: int, interval: str) -> int:
+    """ts_ms'i içeren barın açılış zamanı (epoch ms)."""
+    ms = interval_to_ms(interval)
+    return (int(ts_ms) // ms) * ms
+
+
+def to_epoch_ms(value) -> int:
+    """int (epoch-ms) / 'YYYY-MM-DD[ HH:MM]' / datetime / pd.Timestamp → epoch-ms (naive = UTC)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp() * 1000)
@@ -0,0 +1,168 @@
+# services/kline_store.py
+# Diskte (symbol, interval) başına kline deposu.
+# - Dosya: {KLINE_STORE_DIR}/{SYMBOL}_{interval}.csv  (open_time epoch-ms + OHLCV)
+# - Yalnızca KAPANMIŞ barlar saklanır; oluşmakta olan bar her çağrıda yeniden çekilir.
+# - Süreç içinde bellek önbelleği: dosya ilk erişimde bir kez okunur.
+import os
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.intervals import interval_to_ms
+
+# (opsiyonel) config override
+try:
+    from paper_trader.config import KLINE_STORE_DIR
+except Exception:
+    KLINE_STORE_DIR = "kline_data"
+
+STORE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume"]
+
+_FRAMES: Dict[Tuple[str, str], pd.DataFrame] = {}
+# Borsada hiç olmayan bar açılışları (listeleme öncesi, bakım boşlukları) → tekrar tekrar istenmesin
+_UNAVAILABLE: Dict[Tuple[str, str], Set[int]] = {}
+_LOCK = threading.Lock()
+_KEY_LOCKS: Dict[Tuple[str, str], threading.RLock] = {}
+
+
+def _key(symbol: str, interval: str) -> Tuple[str, str]:
+    return symbol.upper(), interval
+
+
+def key_lock(symbol: str, interval: str) -> threading.RLock:
+    """Aynı (symbol, interval) için oku-çek-yaz akışını seri hale getiren kilit."""
+    k = _key(symbol, interval)
+    with _LOCK:
+        lock = _KEY_LOCKS.get(k)
+        if lock is None:
+            lock = _KEY_LOCKS[k] = threading.RLock()
+        return lock
+
+
+def store_path(symbol: str, interval: str) -> str:
+    s, iv = _key(symbol, interval)
+    return os.path.join(KLINE_STORE_DIR, f"{s}_{iv}.csv")
+
+
+def _empty_frame() -> pd.DataFrame:
+    df = pd.DataFrame({c: pd.Series(dtype="float64") for c in STORE_COLUMNS})
+    df["open_time"] = df["open_time"].astype("int64")
+    return df
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[STORE_COLUMNS].copy()
+    df["open_time"] = df["open_time"].astype("int64")
+    for c in STORE_COLUMNS[1:]:
+        df[c] = df[c].astype("float64")
+    return (
+        df.drop_duplicates(subset=["open_time"], keep="last")
+          .sort_values("open_time")
+          .reset_index(drop=True)
+    )
+
+
+def load(symbol: str, interval: str) -> pd.DataFrame:
+    """Depodaki tüm kapanmış barlar (open_time artan). Dönen frame değiştirilmemeli."""
+    k = _key(symbol, interval)
+    with key_lock(symbol, interval):
+        df = _FRAMES.get(k)
+        if df is None:
+            path = store_path(symbol, interval)
+            if os.path.exists(path):
+                try:
+                    df = _normalize(pd.read_csv(path))
+                except Exception:
+                    # bozuk dosya → sıfırdan doldurulur
+                    df = _empty_frame()
+            else:
+                df = _empty_frame()
+            _FRAMES[k] = df
+        return df
+
+
+def merge(symbol: str, interval: str, rows: pd.DataFrame, persist: bool = True) -> pd.DataFrame:
+    """
+    Yeni kapanmış barları depoya ekle (open_time'a göre dedupe, son gelen kazanır).
+    Depodakiyle birebir aynı olan satırlar atlanır (yeniden çekilen son bar değişmediyse);
+    kalan yeni barların hepsi mevcut son bardan sonraysa dosyaya sadece ekleme yapılır,
+    aksi halde dosya baştan yazılır.
+    """
+    if rows is None or len(rows) == 0:
+        return load(symbol, interval)
+    k = _key(symbol, interval)
+    with key_lock(symbol, interval):
+        cur = load(symbol, interval)
+        new = _normalize(rows)
+        if len(cur):
+            t = cur["open_time"].values
+            pos = np.minimum(np.searchsorted(t, new["open_time"].values), len(t) - 1)
+            same = (t[pos] == new["open_time"].values) & \
+                   (cur[STORE_COLUMNS].values[pos] == new[STORE_COLUMNS].values).all(axis=1)
+            if same.all():
+                return cur
+            new = new[~same].reset_index(drop=True)
+        append_only = len(cur) == 0 or int(new["open_time"].iloc[0]) > int(cur["open_time"].iloc[-1])
+        merged = new if len(cur) == 0 else _normalize(pd.concat([cur, new], ignore_index=True))
+        _FRAMES[k] = merged
+        if persist:
+            _write(symbol, interval, merged, new if append_only else None)
+        return merged
+
+
+def flush(symbol: str, interval: str) -> None:
+    """Bellekteki frame'i diske tam yaz (persist=False ile yapılan merge'lerden sonra)."""
+    with key_lock(symbol, interval):
+        _write(symbol, interval, load(symbol, interval), None)
+
+
+def _write(symbol: str, interval: str, full: pd.DataFrame, appended) -> None:
+    path = store_path(symbol, interval)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if appended is not None and os.path.exists(path) and len(full) > len(appended):
+        appended.to_csv(path, mode="a", header=False, index=False)
+        return
+    tmp = path + ".tmp"
+    full.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def window(symbol: str, interval: str, start_ms: int, end_ms: int) -> pd.DataFrame:
+    """start_ms <= open_time < end_ms aralığındaki barlar (kopya)."""
+    df = load(symbol, interval)
+    t = df["open_time"].values
+    lo = int(np.searchsorted(t, start_ms, side="left"))
+    hi = int(np.searchsorted(t, end_ms, side="left"))
+    return df.iloc[lo:hi].reset_index(drop=True)
+
+
+def mark_unavailable(symbol: str, interval: str, opens: Iterable[int]) -> None:
+    """Borsanın döndürmediği (var olmayan) bar açılışlarını işaretle."""
+    k = _key(symbol, interval)
+    with _LOCK:
+        _UNAVAILABLE.setdefault(k, set()).update(int(o) for o in opens)
+
+
+def missing_runs(symbol: str, interval: str, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+    """
+    [start_ms, end_ms) ızgarasında depoda olmayan bar açılışlarını ardışık
+    (ilk_open, son_open) aralıkları olarak döndür. Delikler de dahildir.
+    """
+    iv = interval_to_ms(interval)
+    first = ((int(start_ms) + iv - 1) // iv) * iv
+    grid = np.arange(first, int(end_ms), iv, dtype=np.int64)
+    if grid.size == 0:
+        return []
+    have = window(symbol, interval, first, int(end_ms))["open_time"].values
+    miss = grid[~np.isin(grid, have)]
+    unavailable = _UNAVAILABLE.get(_key(symbol, interval))
+    if unavailable and miss.size:
+        miss = miss[~np.isin(miss, np.fromiter(unavailable, dtype=np.int64, count=len(unavailable)))]
+    if miss.size == 0:
+        return []
+    breaks = np.nonzero(np.diff(miss) != iv)[0]
+    starts = np.concatenate(([miss[0]], miss[breaks + 1]))
+    ends = np.concatenate((miss[breaks], [miss[-1]]))
+    return [(int(a), int(b)) for a, b in zip(starts, ends)]
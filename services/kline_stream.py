@@ -0,0 +1,244 @@
+# services/kline_stream.py
+# Binance combined stream (<symbol>@kline_<interval>) ile canlı bar takibi.
+# - Her (symbol, interval) için bellekte bar serisi (kapanmış barlar + oluşmakta olan bar)
+# - Kapanan bar (k.x == true) → yerel kline deposuna yazılır + on_bar_closed(symbol, interval, bar) çağrılır
+# - Bağlantı koparsa jitter'lı üstel geri çekilme ile yeniden bağlanır (Binance 24 saatte bir keser)
+# - window(): get_klines(limit) karşılığı ağsız pencere (depo + akıştaki kapanmış barlar + oluşmakta olan bar)
+#   → bar açılışı turunda sembol başına REST isteği gerekmez; pencerede delik varsa None (çağıran REST'e düşer)
+# Not: 'websockets' paketi opsiyoneldir; sadece bu modül kullanılırken gerekir.
+import asyncio
+import json
+import random
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import kline_store
+from services.binance_service import _to_frame, with_timestamp
+from services.intervals import interval_to_ms
+
+try:
+    import websockets
+except Exception:
+    websockets = None
+
+# (opsiyonel) config override
+try:
+    from paper_trader.config import BINANCE_WS_URL
+except Exception:
+    BINANCE_WS_URL = "wss://stream.binance.com:9443"
+
+MAX_STREAMS_PER_CONNECTION = 1024
+
+BarCallback = Callable[[str, str, dict], None]
+
+
+def parse_kline_event(msg) -> Optional[Tuple[str, str, dict, bool]]:
+    """
+    Combined stream mesajı ({"stream": ..., "data": {"e": "kline", ...}}) veya tekil kline olayı
+    → (symbol, interval, bar, is_closed). bar: open_time/open/high/low/close/volume.
+    """
+    if isinstance(msg, (str, bytes)):
+        msg = json.loads(msg)
+    data = msg.get("data", msg)
+    if data.get("e") != "kline":
+        return None
+    k = data["k"]
+    bar = {
+        "open_time": int(k["t"]),
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": float(k["v"]),
+    }
+    return str(k.get("s") or data["s"]).upper(), str(k["i"]), bar, bool(k["x"])
+
+
+class KlineStream:
+    def __init__(
+        self,
+        symbols: List[str],
+        intervals: List[str],
+        on_bar_closed: Optional[BarCallback] = None,
+        ws_url: Optional[str] = None,
+        max_bars: int = 1000,
+        persist: bool = True,
+        seed_limit: int = 0,
+    ):
+        """
+        symbols × intervals için tek (veya gerekirse birkaç) combined stream bağlantısı.
+        seed_limit > 0 → bağlanınca her seri get_klines ile bu kadar barla doldurulur (REST, tek sefer).
+        persist=True → kapanan barlar services/kline_store'a yazılır (get_klines kuyruğu ağsız bulur).
+        """
+        if websockets is None:
+            raise ImportError("KlineStream için 'websockets' paketi gerekli: pip install websockets")
+        self.symbols = [s.upper() for s in symbols]
+        self.intervals = list(intervals)
+        self.on_bar_closed = on_bar_closed
+        self.ws_url = (ws_url or BINANCE_WS_URL).rstrip("/")
+        self.persist = persist
+        self.seed_limit = int(seed_limit)
+        self.max_bars = int(max_bars)
+        self._closed: Dict[Tuple[str, str], Deque[dict]] = {
+            (s, iv): deque(maxlen=self.max_bars) for s in self.symbols for iv in self.intervals
+        }
+        self._forming: Dict[Tuple[str, str], dict] = {}
+        self._cond = threading.Condition()     # seriler akış thread'inde değişir, window() başka thread'den okur
+        self._stop: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # -------------------------------------------------
+    # Durum
+    # -------------------------------------------------
+    def stream_names(self) -> List[str]:
+        return [f"{s.lower()}@kline_{iv}" for s in self.symbols for iv in self.intervals]
+
+    def stream_urls(self) -> List[str]:
+        names = self.stream_names()
+        return [
+            f"{self.ws_url}/stream?streams=" + "/".join(names[i:i + MAX_STREAMS_PER_CONNECTION])
+            for i in range(0, len(names), MAX_STREAMS_PER_CONNECTION)
+        ]
+
+    def handle_message(self, msg) -> Optional[dict]:
+        """Tek mesajı işle; bar kapandıysa kapanan barı döndür (ve callback'i çağır)."""
+        ev = parse_kline_event(msg)
+        if ev is None:
+            return None
+        symbol, interval, bar, is_closed = ev
+        key = (symbol, interval)
+        series = self._closed.get(key)
+        if series is None:
+            return None
+        with self._cond:
+            if not is_closed:
+                self._forming[key] = bar
+                self._cond.notify_all()
+                return None
+
+            if series and bar["open_time"] <= series[-1]["open_time"]:
+                return None  # tekrar gelen kapanış (yeniden bağlanma sonrası)
+            series.append(bar)
+            forming = self._forming.get(key)
+            if forming is not None and forming["open_time"] <= bar["open_time"]:
+                self._forming.pop(key, None)
+        if self.persist:
+            kline_store.merge(symbol, interval, pd.DataFrame([bar], columns=kline_store.STORE_COLUMNS))
+        if self.on_bar_closed is not None:
+            self.on_bar_closed(symbol, interval, bar)
+        return bar
+
+    def frame(self, symbol: str, interval: str, include_forming: bool = True) -> pd.DataFrame:
+        """Bellekteki seri → get_klines formatında DataFrame."""
+        key = (symbol.upper(), interval)
+        with self._cond:
+            rows = list(self._closed.get(key, ()))
+            forming = self._forming.get(key)
+        if include_forming and forming is not None:
+            rows.append(forming)
+        df = pd.DataFrame(rows, columns=kline_store.STORE_COLUMNS)
+        df["open_time"] = df["open_time"].astype(np.int64)
+        return with_timestamp(df[kline_store.STORE_COLUMNS[1:] + ["open_time"]])
+
+    def window(self, symbol: str, interval: str, limit: int, live_open: Optional[int] = None,
+               timeout: float = 0.0) -> Optional[pd.DataFrame]:
+        """
+        get_klines(symbol, interval, limit) ile aynı formatta son `limit` bar, ağa gitmeden:
+        kapanmış barlar depodan + akış belleğinden, son satır oluşmakta olan bar (yeni barın open'ı = entry).
+        live_open: beklenen oluşmakta olan barın açılışı (verilmezse son kapanış + interval); bu bar `timeout`
+        sn içinde akıştan gelmezse ya da kapanmış barlarda delik varsa None → çağıran get_klines'a düşer.
+        """
+        key = (symbol.upper(), interval)
+        if key not in self._closed:
+            return None
+        iv = interval_to_ms(interval)
+        with self._cond:
+            series = self._closed[key]
+            if live_open is None:
+                if not series:
+                    return None
+                live_open = series[-1]["open_time"] + iv
+            self._cond.wait_for(lambda: (self._forming.get(key) or {}).get("open_time") == live_open,
+                                timeout=timeout)
+            forming = self._forming.get(key)
+            start = live_open - (int(limit) - 1) * iv
+            recent = [b for b in series if start <= b["open_time"] < live_open]
+        if forming is None or forming["open_time"] != live_open:
+            return None
+
+        closed = kline_store.window(symbol, interval, start, live_open)
+        if recent:
+            closed = pd.concat([closed, pd.DataFrame(recent, columns=kline_store.STORE_COLUMNS)], ignore_index=True)
+            closed = closed.drop_duplicates(subset=["open_time"], keep="last").sort_values("open_time")
+        have = set(closed["open_time"].astype(np.int64).tolist())
+        for a, b in kline_store.missing_runs(symbol, interval, start, live_open):
+            if any(o not in have for o in range(a, b + 1, iv)):
+                return None
+
+        rows = pd.concat([closed, pd.DataFrame([forming], columns=kline_store.STORE_COLUMNS)], ignore_index=True)
+        return _to_frame(rows.tail(int(limit)).reset_index(drop=True))
+
+    def _seed(self) -> None:
+        from services.binance_service import get_klines_many
+        frames = get_klines_many([(s, iv, self.seed_limit) for (s, iv) in self._closed])
+        for (s, iv, _n), df in frames.items():
+            if df is None or len(df) < 2:
+                continue
+            closed = df.iloc[:-1]
+            with self._cond:
+                series = self._closed[(s.upper(), iv)]
+                last = series[-1]["open_time"] if series else -1
+                for row in closed[kline_store.STORE_COLUMNS].itertuples(index=False):
+                    if int(row[0]) > last:
+                        series.append(dict(zip(kline_store.STORE_COLUMNS, row)))
+                # yeniden sırala (seed, stream'den gelen barlardan sonra çalışmış olabilir)
+                ordered = sorted(series, key=lambda b: b["open_time"])
+                series.clear()
+                series.extend(ordered)
+
+    # -------------------------------------------------
+    # Bağlantı döngüsü
+    # -------------------------------------------------
+    async def _consume(self, url: str) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20, max_size=2 ** 22) as ws:
+                    attempt = 0
+                    while not self._stop.is_set():
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        try:
+                            self.handle_message(raw)
+                        except Exception as e:
+                            print(f"⚠️ [stream] mesaj işlenemedi: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                wait = random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+                attempt += 1
+                print(f"⚠️ [stream] bağlantı koptu ({e}); {wait:.1f} sn sonra yeniden bağlanılıyor")
+                await asyncio.sleep(wait)
+
+    async def run(self) -> None:
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self.seed_limit > 0:
+            await asyncio.get_running_loop().run_in_executor(None, self._seed)
+        await asyncio.gather(*(self._consume(u) for u in self.stream_urls()))
+
+    def stop(self) -> None:
+        """Başka bir thread'den de çağrılabilir."""
+        if self._stop is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def run_forever(self) -> None:
+        asyncio.run(self.run())
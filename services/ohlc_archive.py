@@ -0,0 +1,159 @@
+# services/ohlc_archive.py
+# Bellek eşlemeli (numpy.memmap) kolon bazlı OHLC arşivi.
+# - Dizin: {OHLC_ARCHIVE_DIR}/{SYMBOL}_{interval}/
+#     open_time.i8, open.f8, high.f8, low.f8, close.f8, volume.f8  (ham, little-endian, bitişik)
+#     meta.json → {"rows": n, "columns": {...}}
+# - Okuma: dosyalar kopyalanmadan memmap ile açılır; dilimler (view) veri yüklemez,
+#   aynı dosyayı açan süreçler aynı sayfa önbelleğini paylaşır.
+# - Ekleme: kolon dosyalarının sonuna yazılır, en son meta.json'daki satır sayısı güncellenir
+#   (yarıda kalan ekleme → meta'daki satır sayısı geçerli kalır).
+import os
+import json
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from services import kline_store
+
+try:
+    from paper_trader.config import OHLC_ARCHIVE_DIR
+except Exception:
+    OHLC_ARCHIVE_DIR = os.path.join(kline_store.KLINE_STORE_DIR, "archive")
+
+ARCHIVE_COLUMNS: Dict[str, str] = {
+    "open_time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<f8",
+}
+
+
+def archive_dir(symbol: str, interval: str) -> str:
+    return os.path.join(OHLC_ARCHIVE_DIR, f"{symbol.upper()}_{interval}")
+
+
+def _col_path(d: str, col: str) -> str:
+    return os.path.join(d, f"{col}.{ARCHIVE_COLUMNS[col][1:]}")
+
+
+def _read_meta(d: str) -> Optional[dict]:
+    path = os.path.join(d, "meta.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(d: str, rows: int) -> None:
+    tmp = os.path.join(d, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"rows": int(rows), "columns": ARCHIVE_COLUMNS}, f)
+    os.replace(tmp, os.path.join(d, "meta.json"))
+
+
+class OhlcArchive:
+    """
+    Kolon dizileri (memmap veya view): open_time, open, high, low, close, volume.
+    Dilimleme kopya üretmez; to_frame() uyumluluk için kopya üretir.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        for name, arr in columns.items():
+            setattr(self, name, arr)
+
+    def __len__(self) -> int:
+        return len(self.columns["open_time"])
+
+    def __getitem__(self, key) -> "OhlcArchive":
+        if not isinstance(key, slice):
+            raise TypeError("OhlcArchive yalnızca slice ile dilimlenir (view)")
+        return OhlcArchive({c: a[key] for c, a in self.columns.items()})
+
+    def index_range(self, start_ms=None, end_ms=None):
+        """start_ms <= open_time < end_ms aralığının (lo, hi) index'leri (ikili arama)."""
+        t = self.columns["open_time"]
+        lo = 0 if start_ms is None else int(np.searchsorted(t, int(start_ms), side="left"))
+        hi = len(t) if end_ms is None else int(np.searchsorted(t, int(end_ms), side="left"))
+        return lo, hi
+
+    def between(self, start_ms=None, end_ms=None) -> "OhlcArchive":
+        lo, hi = self.index_range(start_ms, end_ms)
+        return self[lo:hi]
+
+    def to_frame(self, timestamps: bool = True) -> pd.DataFrame:
+        """get_klines formatında DataFrame (kopya)."""
+        from services.binance_service import with_timestamp
+        df = pd.DataFrame({c: np.asarray(a) for c, a in self.columns.items() if c != "open_time"})
+        df["open_time"] = np.asarray(self.columns["open_time"])
+        return with_timestamp(df) if timestamps else df
+
+
+def open_archive(symbol: str, interval: str) -> Optional[OhlcArchive]:
+    """Arşivi salt-okunur memmap olarak aç (yoksa None)."""
+    d = archive_dir(symbol, interval)
+    meta = _read_meta(d)
+    if meta is None:
+        return None
+    rows = int(meta["rows"])
+    cols = {}
+    for col, dtype in ARCHIVE_COLUMNS.items():
+        if rows == 0:
+            cols[col] = np.empty(0, dtype=dtype)
+        else:
+            cols[col] = np.memmap(_col_path(d, col), dtype=dtype, mode="r", shape=(rows,))
+    return OhlcArchive(cols)
+
+
+def write_archive(symbol: str, interval: str, df: pd.DataFrame) -> int:
+    """Depo formatındaki frame'den (open_time + OHLCV) arşivi baştan yaz."""
+    d = archive_dir(symbol, interval)
+    os.makedirs(d, exist_ok=True)
+    df = df.sort_values("open_time").drop_duplicates(subset=["open_time"], keep="last")
+    _write_meta(d, 0)
+    for col, dtype in ARCHIVE_COLUMNS.items():
+        df[col].to_numpy(dtype=dtype).tofile(_col_path(d, col))
+    _write_meta(d, len(df))
+    return len(df)
+
+
+def append_archive(symbol: str, interval: str, df: pd.DataFrame) -> int:
+    """Arşivin son barından SONRAKİ satırları ekle. Dönen: toplam satır sayısı."""
+    d = archive_dir(symbol, interval)
+    arc = open_archive(symbol, interval)
+    if arc is None:
+        return write_archive(symbol, interval, df)
+    rows = len(arc)
+    last = int(arc.open_time[-1]) if rows else None
+    del arc  # memmap'leri bırak
+    new = df.sort_values("open_time").drop_duplicates(subset=["open_time"], keep="last")
+    if last is not None:
+        new = new[new["open_time"] > last]
+    if len(new) == 0:
+        return rows
+    for col, dtype in ARCHIVE_COLUMNS.items():
+        path = _col_path(d, col)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            # meta'dan sonraki (yarım kalmış) baytları at
+            f.truncate(rows * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(new[col].to_numpy(dtype=dtype).tobytes())
+    _write_meta(d, rows + len(new))
+    return rows + len(new)
+
+
+def build_archive_from_store(symbol: str, interval: str) -> int:
+    """
+    Yerel kline deposundaki (services/kline_store) barları arşive aktar.
+    Normalde yalnızca yeni kuyruk eklenir; depo arşivden daha eskiye uzanıyorsa baştan yazılır.
+    """
+    df = kline_store.load(symbol, interval)
+    arc = open_archive(symbol, interval)
+    if arc is not None and len(arc) and len(df) and int(df["open_time"].iloc[0]) >= int(arc.open_time[0]):
+        del arc
+        return append_archive(symbol, interval, df)
+    del arc
+    return write_archive(symbol, interval, df)
@@ -0,0 +1,57 @@
+# tests/conftest.py
+# Testler depo kökünden import eder (analysis, services, paper_trader)
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage_backend(request, tmp_path, monkeypatch):
+    """paper_trader.storage'ı geçici dizinde verilen arka uçla çalıştır (csv | sqlite)."""
+    from paper_trader import storage, storage_sqlite
+
+    paths = {
+        "DATA_DIR": str(tmp_path),
+        "SIGNALS_CSV": str(tmp_path / "signals_live.csv"),
+        "TRADES_CSV": str(tmp_path / "trades_live.csv"),
+        "EQUITY_CSV": str(tmp_path / "equity_live.csv"),
+    }
+    for mod in (storage, storage_sqlite):
+        for name, value in paths.items():
+            monkeypatch.setattr(mod, name, value)
+    monkeypatch.setattr(storage_sqlite, "SQLITE_PATH", str(tmp_path / "paper_trader.db"))
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", request.param)
+    storage_sqlite.close()
+    yield request.param
+    storage_sqlite.close()
+
+
+@pytest.fixture
+def kline_store_tmp(tmp_path, monkeypatch):
+    """services.kline_store'u boş geçici dizinle çalıştır (bellek önbelleği / boşluk işaretleri dahil)."""
+    from services import kline_store
+
+    monkeypatch.setattr(kline_store, "KLINE_STORE_DIR", str(tmp_path / "klines"))
+    monkeypatch.setattr(kline_store, "_FRAMES", {})
+    monkeypatch.setattr(kline_store, "_UNAVAILABLE", {})
+    return tmp_path / "klines"
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """Yerel Binance taklidini başlat ve http_client'ı ona yönlendir: standin(**opts) → server."""
+    from services import http_client
+    from services.binance_standin import start_standin
+
+    servers = []
+
+    def _start(**opts):
+        server, url = start_standin(**opts)
+        servers.append(server)
+        monkeypatch.setattr(http_client, "BINANCE_BASE_URL", url)
+        return server
+
+    yield _start
+    for server in servers:
+        server.shutdown()
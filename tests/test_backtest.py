@@ -0,0 +1,21 @@
+# tests/test_backtest.py
+import pandas as pd
+
+from analysis import backtest
+from services import binance_filters
+
+
+def _frame(n=30):
+    ts = pd.date_range("2024-01-01", periods=n, freq="1h")
+    return pd.DataFrame({"timestamp": ts, "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.0})
+
+
+def test_missing_tick_warns_once_per_symbol(monkeypatch, capsys):
+    monkeypatch.setattr(binance_filters, "get_price_tick", lambda symbol, allow_network=True: None)
+    monkeypatch.setattr(backtest, "_TICK_WARNED", set())
+    df = _frame()
+    for symbol in ["AAAUSDT", "AAAUSDT", "BBBUSDT", "AAAUSDT"]:
+        backtest.run_backtest([], df, [], [], symbol=symbol, use_tick_quantize=True)
+    out = capsys.readouterr().out
+    assert out.count("AAAUSDT tick-size önbellekte yok") == 1
+    assert out.count("BBBUSDT tick-size önbellekte yok") == 1
@@ -0,0 +1,53 @@
+# tests/test_binance_standin.py
+# Stand-in fixtures modu: eski kayıtlar tekrar saatiyle "şimdi"ye kaydırılarak sunulur
+import json
+import time
+
+import numpy as np
+
+from services.binance_service import get_klines
+from services.binance_standin import DAY_MS, synthetic_kline
+
+IV = 3600_000
+
+
+def write_fixture(root, symbol, interval, opens):
+    path = root / "klines" / f"{symbol}_{interval}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [synthetic_kline(symbol, interval, int(o)) for o in opens]
+    path.write_text(json.dumps(rows))
+    return rows
+
+
+def test_fixture_replay_is_shifted_to_now(tmp_path, standin, kline_store_tmp):
+    now = int(time.time() * 1000)
+    last = (now - 10 * DAY_MS) // IV * IV                    # 10 gün önce biten kayıt
+    rows = write_fixture(tmp_path, "BTCUSDT", "1h", last - np.arange(299, -1, -1) * IV)
+    server = standin(mode="fixtures", fixtures_dir=str(tmp_path))
+    shift = server.state.shift_ms()
+    assert shift % DAY_MS == 0 and 0 < shift <= 11 * DAY_MS
+
+    df = get_klines("BTCUSDT", "1h", limit=100, use_store=True)
+    assert len(df) == 100
+    assert int(df["open_time"].iloc[-1]) == now // IV * IV     # son satır = oluşmakta olan bar
+    by_open = {int(k[0]) + shift: float(k[4]) for k in rows}
+    assert all(by_open[int(t)] == c for t, c in zip(df["open_time"], df["close"]))
+
+
+def test_fixture_replay_hides_future_bars(tmp_path, standin, kline_store_tmp):
+    now = int(time.time() * 1000)
+    last = (now - 3 * DAY_MS) // IV * IV + 12 * IV          # kaydırma sonrası ~12 saat "gelecekte" veri
+    write_fixture(tmp_path, "BTCUSDT", "1h", last - np.arange(199, -1, -1) * IV)
+    server = standin(mode="fixtures", fixtures_dir=str(tmp_path))
+    df = get_klines("BTCUSDT", "1h", limit=50, use_store=False)
+    assert int(df["open_time"].iloc[-1]) <= now
+    assert int(df["open_time"].iloc[-1]) + IV > now
+
+
+def test_no_replay_shift_serves_recorded_times(tmp_path, standin):
+    last = 1_704_067_200_000
+    rows = write_fixture(tmp_path, "BTCUSDT", "1h", last - np.arange(9, -1, -1) * IV)
+    server = standin(mode="fixtures", fixtures_dir=str(tmp_path), replay_shift=False)
+    assert server.state.shift_ms() == 0
+    got = server.state.klines("BTCUSDT", "1h", 1000, rows[0][0], None, "")
+    assert got == rows
@@ -0,0 +1,120 @@
+# tests/test_exits.py
+# resolve_exits (vektörel) ↔ referans döngüler:
+#   mode="backtest" → eski run_backtest bar döngüsü
+#   mode="live"     → paper_trader.evaluator.evaluate_open_trade'in bar bar uygulanması
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.exits import REASONS, resolve_exits
+from paper_trader.evaluator import evaluate_open_trade
+
+
+def _market(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    o = np.concatenate([[100.0], c[:-1]]) * (1 + rng.normal(0, 0.003, n))   # açılış gap'leri
+    h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.004, n)))
+    l = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.004, n)))
+    return o, h, l, c
+
+
+def _trades(o, count=400, seed=5):
+    rng = np.random.default_rng(seed)
+    n = len(o)
+    e = rng.integers(0, n, count)                 # sona yakın girişler: pencere eksik / açık kalır
+    buy = rng.random(count) < 0.5
+    entry = o[e]
+    risk = entry * rng.uniform(0.002, 0.02, count)
+    rr = rng.uniform(0.5, 2.5, count)
+    sl = np.where(buy, entry - risk, entry + risk)
+    tp = np.where(buy, entry + rr * risk, entry - rr * risk)
+    # eşit SL/TP ile double-hit'i zorla
+    tight = rng.random(count) < 0.1
+    sl = np.where(tight, np.where(buy, entry * 0.9995, entry * 1.0005), sl)
+    tp = np.where(tight, np.where(buy, entry * 1.0005, entry * 0.9995), tp)
+    return e, buy, sl, tp
+
+
+def _ref_backtest(e, buy, sl, tp, o, h, l, c, M, conservative, timeout):
+    """Vektörleştirme öncesi run_backtest döngüsü (aynı kurallar, işlem başına)."""
+    fut = range(e + 1, min(e + 1 + M, len(o)))
+    if not len(fut):
+        return None
+    reason, price, held = "", None, 0
+    for i, j in enumerate(fut, start=1):
+        held = i
+        if buy:
+            if o[j] >= tp: reason, price = "OPEN_GAP_TP", tp; break
+            if o[j] <= sl: reason, price = "OPEN_GAP_SL", sl; break
+            hit_sl, hit_tp = l[j] <= sl, h[j] >= tp
+        else:
+            if o[j] <= tp: reason, price = "OPEN_GAP_TP", tp; break
+            if o[j] >= sl: reason, price = "OPEN_GAP_SL", sl; break
+            hit_sl, hit_tp = h[j] >= sl, l[j] <= tp
+        if hit_sl and hit_tp:
+            reason, price = ("SL_HIT", sl) if conservative else ("TP_HIT", tp); break
+        if hit_sl: reason, price = "SL_HIT", sl; break
+        if hit_tp: reason, price = "TP_HIT", tp; break
+        if timeout is not None and held >= timeout:
+            reason = "TIMEOUT"; break
+    if reason in ("", "TIMEOUT"):
+        reason, price = "MAX_BARS", c[fut[-1]]
+    return reason, price, held
+
+
+def _ref_live(e, buy, sl, tp, o, h, l, c, ts, M, conservative, timeout):
+    """Açılıştan itibaren her yeni bar açılışında evaluate_open_trade (canlıdaki gibi)."""
+    trade = {"side": "BUY" if buy else "SELL", "entry_price": o[e], "sl": sl, "tp": tp,
+             "bars_held": 0, "state": "OPEN"}
+    for j in range(e + 1, len(o)):
+        closed_bar = {"open": o[j - 1], "high": h[j - 1], "low": l[j - 1], "close": c[j - 1],
+                      "timestamp": ts[j - 1]}
+        trade = evaluate_open_trade(trade, closed_bar, o[j], 0.0, conservative, timeout, M,
+                                    new_open_time=ts[j])
+        if trade["state"] == "CLOSED":
+            return trade
+    return trade
+
+
+CONFIGS = list(itertools.product([20, 3], [True, False], [None, 1, 5]))
+
+
+@pytest.mark.parametrize("M, conservative, timeout", CONFIGS)
+def test_backtest_mode_matches_bar_loop(M, conservative, timeout):
+    o, h, l, c = _market()
+    e, buy, sl, tp = _trades(o)
+    ex = resolve_exits(e, buy, sl, tp, o, h, l, c, max_future_bars=M,
+                       conservative_double_hit=conservative, timeout_close=timeout, mode="backtest")
+    for k in range(len(e)):
+        ref = _ref_backtest(e[k], buy[k], sl[k], tp[k], o, h, l, c, M, conservative, timeout)
+        if ref is None:
+            assert not ex["closed"][k]
+            continue
+        reason, price, held = ref
+        assert ex["closed"][k]
+        assert REASONS[ex["reason"][k]] == reason, k
+        assert ex["exit_price"][k] == pytest.approx(price)
+        assert ex["bars_held"][k] == held
+
+
+@pytest.mark.parametrize("M, conservative, timeout", CONFIGS)
+def test_live_mode_matches_evaluator(M, conservative, timeout):
+    o, h, l, c = _market()
+    ts = list(pd.date_range("2024-01-01", periods=len(o), freq="1h"))
+    e, buy, sl, tp = _trades(o)
+    ex = resolve_exits(e, buy, sl, tp, o, h, l, c, max_future_bars=M,
+                       conservative_double_hit=conservative, timeout_close=timeout, mode="live")
+    for k in range(len(e)):
+        ref = _ref_live(e[k], buy[k], sl[k], tp[k], o, h, l, c, ts, M, conservative, timeout)
+        assert ex["bars_held"][k] == ref["bars_held"], k
+        if ref["state"] != "CLOSED":
+            assert not ex["closed"][k]
+            assert np.isnan(ex["exit_price"][k])
+            continue
+        assert ex["closed"][k]
+        assert REASONS[ex["reason"][k]] == ref["exit_reason"], k
+        assert ex["exit_price"][k] == pytest.approx(ref["exit_price"])
+        assert ts[ex["exit_idx"][k]].strftime("%Y-%m-%d %H:%M:%S") == ref["close_time_utc"]
@@ -0,0 +1,103 @@
+# tests/test_kline_store.py
+# kline_store: merge (dedupe / ekleme / yeniden yazma, diskten geri okuma) ve missing_runs
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import kline_store
+
+H1 = 3_600_000
+T0 = 1_704_067_200_000        # 2024-01-01 00:00 UTC
+
+
+def _rows(opens, price=1.0):
+    opens = np.asarray(opens, dtype=np.int64)
+    p = price + opens / H1 % 97
+    return pd.DataFrame({"open_time": opens, "open": p, "high": p + 1, "low": p - 1, "close": p + 0.5,
+                         "volume": 10.0})
+
+
+def _reload(symbol, interval):
+    """Bellek önbelleğini at → dosyadan oku."""
+    kline_store._FRAMES.pop(kline_store._key(symbol, interval), None)
+    return kline_store.load(symbol, interval)
+
+
+def test_merge_dedupes_sorts_and_persists(kline_store_tmp):
+    opens = T0 + H1 * np.array([5, 1, 3, 2, 4, 0])
+    kline_store.merge("btcusdt", "1h", _rows(opens))
+    got = kline_store.load("BTCUSDT", "1h")
+    assert got["open_time"].tolist() == sorted(opens.tolist())
+
+    # ekleme (son bardan sonra) + yeniden çekilen son bar değişmiş → son gelen kazanır
+    upd = _rows(T0 + H1 * np.array([5, 6, 7]), price=50.0)
+    kline_store.merge("BTCUSDT", "1h", upd)
+    # eski bir deliğe ekleme → dosya baştan yazılır
+    kline_store.merge("BTCUSDT", "1h", _rows([T0 - H1]))
+
+    mem = kline_store.load("BTCUSDT", "1h")
+    disk = _reload("BTCUSDT", "1h")
+    pd.testing.assert_frame_equal(mem, disk)
+    assert disk["open_time"].tolist() == (T0 + H1 * np.arange(-1, 8)).tolist()
+    assert disk.loc[disk["open_time"] == T0 + 5 * H1, "open"].item() == upd["open"].iloc[0]
+
+
+def test_merge_skips_identical_rows(kline_store_tmp):
+    rows = _rows(T0 + H1 * np.arange(10))
+    kline_store.merge("BTCUSDT", "1h", rows)
+    path = kline_store.store_path("BTCUSDT", "1h")
+    before = open(path, "rb").read()
+    cur = kline_store.load("BTCUSDT", "1h")
+    assert kline_store.merge("BTCUSDT", "1h", rows.tail(3)) is cur
+    assert open(path, "rb").read() == before
+
+
+def test_merge_without_persist_then_flush(kline_store_tmp):
+    kline_store.merge("BTCUSDT", "1h", _rows(T0 + H1 * np.arange(3)))
+    kline_store.merge("BTCUSDT", "1h", _rows(T0 + H1 * np.arange(3, 6)), persist=False)
+    assert len(_reload("BTCUSDT", "1h")) == 3
+    kline_store.merge("BTCUSDT", "1h", _rows(T0 + H1 * np.arange(3, 6)), persist=False)
+    kline_store.flush("BTCUSDT", "1h")
+    assert _reload("BTCUSDT", "1h")["open_time"].tolist() == (T0 + H1 * np.arange(6)).tolist()
+
+
+def test_corrupt_file_loads_empty(kline_store_tmp):
+    kline_store_tmp.mkdir(parents=True)
+    with open(kline_store.store_path("BTCUSDT", "1h"), "w") as f:
+        f.write("not,a\nkline,file\n")
+    assert len(kline_store.load("BTCUSDT", "1h")) == 0
+
+
+def _brute_missing(have, unavailable, start, end):
+    first = -(-start // H1) * H1
+    miss = [o for o in range(first, end, H1) if o not in have and o not in unavailable]
+    runs = []
+    for o in miss:
+        if runs and runs[-1][1] == o - H1:
+            runs[-1][1] = o
+        else:
+            runs.append([o, o])
+    return [tuple(r) for r in runs]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_missing_runs_matches_brute_force(kline_store_tmp, seed):
+    rng = np.random.default_rng(seed)
+    all_opens = T0 + H1 * np.arange(200)
+    have = set(all_opens[rng.random(200) < 0.7].tolist())
+    unavailable = set(all_opens[rng.random(200) < 0.1].tolist())
+    kline_store.merge("BTCUSDT", "1h", _rows(sorted(have)), persist=False)
+    kline_store.mark_unavailable("BTCUSDT", "1h", unavailable)
+    for _ in range(20):
+        a, b = sorted(rng.integers(T0 - 10 * H1, T0 + 210 * H1, 2).tolist())
+        a += int(rng.integers(0, H1))                     # ızgaraya hizasız başlangıç
+        assert kline_store.missing_runs("BTCUSDT", "1h", a, b) == _brute_missing(have, unavailable, a, b)
+
+
+def test_missing_runs_empty_store_and_window(kline_store_tmp):
+    assert kline_store.missing_runs("BTCUSDT", "1h", T0, T0 + 3 * H1) == [(T0, T0 + 2 * H1)]
+    assert kline_store.missing_runs("BTCUSDT", "1h", T0, T0) == []
+    kline_store.merge("BTCUSDT", "1h", _rows(T0 + H1 * np.arange(3)), persist=False)
+    assert kline_store.missing_runs("BTCUSDT", "1h", T0, T0 + 3 * H1) == []
+    w = kline_store.window("BTCUSDT", "1h", T0 + H1, T0 + 2 * H1)
+    assert w["open_time"].tolist() == [T0 + H1]
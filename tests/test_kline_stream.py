@@ -0,0 +1,89 @@
+# tests/test_kline_stream.py
+# KlineStream.window: bar açılışı turu penceresi akış + depodan (REST yok), delikte None
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("websockets")
+
+from services import kline_store
+from services.kline_stream import KlineStream
+
+IV = 3600_000
+T0 = 1_704_067_200_000      # 2024-01-01 00:00 UTC
+
+
+def bars(n, start=T0):
+    rng = np.random.default_rng(1)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "open_time": start + np.arange(n, dtype=np.int64) * IV,
+        "open": close - 0.5, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0,
+    })
+
+
+def event(bar, closed):
+    return {"stream": "btcusdt@kline_1h", "data": {"e": "kline", "s": "BTCUSDT", "k": {
+        "t": int(bar["open_time"]), "i": "1h", "s": "BTCUSDT", "x": closed,
+        "o": str(bar["open"]), "h": str(bar["high"]), "l": str(bar["low"]),
+        "c": str(bar["close"]), "v": str(bar["volume"])}}}
+
+
+def test_window_from_store_and_stream(kline_store_tmp):
+    hist = bars(102)
+    kline_store.merge("BTCUSDT", "1h", hist.iloc[:100])
+    stream = KlineStream(["BTCUSDT"], ["1h"])
+    stream.handle_message(event(hist.iloc[100], closed=True))        # depoya da yazılır
+    assert stream.window("BTCUSDT", "1h", 50) is None                  # yeni bar henüz gelmedi
+    stream.handle_message(event(hist.iloc[101], closed=False))
+
+    df = stream.window("BTCUSDT", "1h", 50, live_open=int(hist["open_time"].iloc[101]))
+    assert len(df) == 50
+    assert list(df.columns) == ["timestamp", "open", "high", "low", "close", "volume", "open_time"]
+    np.testing.assert_array_equal(df["open_time"].to_numpy(), hist["open_time"].to_numpy()[-50:])
+    np.testing.assert_allclose(df[["open", "high", "low", "close"]].to_numpy(),
+                               hist[["open", "high", "low", "close"]].to_numpy()[-50:])
+    assert df["timestamp"].iloc[-1] == pd.Timestamp(int(hist["open_time"].iloc[101]), unit="ms")
+
+
+def test_window_in_memory_bars_without_persist(kline_store_tmp):
+    hist = bars(62)
+    kline_store.merge("BTCUSDT", "1h", hist.iloc[:58])
+    stream = KlineStream(["BTCUSDT"], ["1h"], persist=False)
+    for i in range(58, 61):
+        stream.handle_message(event(hist.iloc[i], closed=True))
+    stream.handle_message(event(hist.iloc[61], closed=False))
+    df = stream.window("BTCUSDT", "1h", 40)
+    np.testing.assert_array_equal(df["open_time"].to_numpy(), hist["open_time"].to_numpy()[-40:])
+
+
+def test_window_gap_falls_back(kline_store_tmp):
+    hist = bars(62)
+    kline_store.merge("BTCUSDT", "1h", pd.concat([hist.iloc[:30], hist.iloc[31:60]]))
+    stream = KlineStream(["BTCUSDT"], ["1h"])
+    stream.handle_message(event(hist.iloc[60], closed=True))
+    stream.handle_message(event(hist.iloc[61], closed=False))
+    assert stream.window("BTCUSDT", "1h", 20) is not None             # delik pencerenin dışında
+    assert stream.window("BTCUSDT", "1h", 40) is None                 # delik içeride → REST
+    kline_store.mark_unavailable("BTCUSDT", "1h", [int(hist["open_time"].iloc[30])])
+    assert len(stream.window("BTCUSDT", "1h", 40)) == 39              # borsada yok → get_klines ile aynı
+
+
+def test_paper_trader_stream_frames_skip_rest(kline_store_tmp, monkeypatch):
+    from paper_trader import paper_trader as pt
+
+    hist = bars(102)
+    kline_store.merge("BTCUSDT", "1h", hist.iloc[:100])
+    stream = KlineStream(["BTCUSDT"], ["1h"])
+    stream.handle_message(event(hist.iloc[100], closed=True))
+    stream.handle_message(event(hist.iloc[101], closed=False))
+
+    calls = []
+    monkeypatch.setattr(pt, "get_klines", lambda **kw: calls.append(kw))
+    req = ("BTCUSDT", "1h", 80)
+    frames = pt._fetch_frames([req], stream=stream, live_open=int(hist["open_time"].iloc[101]))
+    assert not calls
+    assert len(frames[req]) == 80
+
+    frames = pt._fetch_frames([("BTCUSDT", "1h", 200)], stream=stream)     # depoda yetersiz geçmiş
+    assert len(calls) == 1
@@ -0,0 +1,106 @@
+# tests/test_metrics.py
+# MetricsAccumulator (artımlı) ↔ toplu hesaplar: sweep.summarize_results ve storage.compute_metrics_from_trades
+import json
+
+import numpy as np
+import pytest
+
+from analysis.metrics import MetricsAccumulator
+from analysis.sweep import _r_multiple, summarize_results
+from paper_trader import storage
+from tests.test_trade_book import make_trade
+
+SHARED = ["trades", "wins", "losses", "win_rate", "profit_factor", "avg_r", "pnl_percent_cum", "max_drawdown_pct"]
+
+
+def _results(n=250, seed=11, fee=0.0006):
+    rng = np.random.default_rng(seed)
+    out = []
+    for k in range(n):
+        buy = bool(rng.random() < 0.5)
+        entry = float(rng.uniform(50, 150))
+        risk = entry * float(rng.uniform(0.003, 0.02))
+        sl = entry - risk if buy else entry + risk
+        move = risk * float(rng.choice([-1.0, 1.5, 0.0, rng.normal(0, 1)]))
+        exitp = entry + move if buy else entry - move
+        r = {"direction": "BUY" if buy else "SELL", "entry_price": entry, "sl": sl, "exit_price": exitp,
+             "exit_reason": "TIMEOUT" if k % 7 == 0 else "SL_HIT"}
+        r["r_multiple"] = _r_multiple(r)
+        r["pnl_percent"] = move / entry * 100.0 - fee * 100.0 * (k % 3 != 0)
+        r["result"] = "WIN" if r["pnl_percent"] > 0 else ("LOSS" if r["pnl_percent"] < 0 else "FLAT")
+        out.append(r)
+    return out
+
+
+def _acc(results, window=None):
+    acc = MetricsAccumulator(window=window)
+    for r in results:
+        acc.add_trade(r)
+    return acc
+
+
+def test_summary_matches_summarize_results():
+    results = _results()
+    got, want = _acc(results).summary(), summarize_results(results)
+    for k in SHARED:
+        assert got[k] == pytest.approx(want[k]), k
+    assert got["timeouts"] == sum(r["exit_reason"] == "TIMEOUT" for r in results)
+    assert got["expectancy_pct"] == pytest.approx(want["pnl_percent_cum"] / want["trades"])
+
+
+def test_loss_streak_and_no_loss_pf():
+    results = _results()
+    streak = best = 0
+    for r in results:
+        if r["result"] == "LOSS":
+            streak += 1
+            best = max(best, streak)
+        elif r["result"] == "WIN":
+            streak = 0
+    assert _acc(results).summary()["max_loss_streak"] == best
+
+    wins = [r for r in results if r["result"] == "WIN"][:5]
+    assert _acc(wins).summary()["profit_factor"] == summarize_results(wins)["profit_factor"] == 9999.0
+    assert _acc([]).summary()["profit_factor"] == 0.0
+
+
+@pytest.mark.parametrize("window", [1, 50, 1000])
+def test_rolling_window_matches_batch_over_tail(window):
+    results = _results()
+    got = _acc(results, window=window).summary()
+    tail = summarize_results(results[-window:])
+    assert got["rolling_trades"] == tail["trades"]
+    assert got["rolling_win_rate"] == pytest.approx(tail["win_rate"])
+    assert got["rolling_profit_factor"] == pytest.approx(tail["profit_factor"])
+    assert got["rolling_avg_r"] == pytest.approx(tail["avg_r"])
+    assert got["rolling_pnl_percent"] == pytest.approx(tail["pnl_percent_cum"])
+
+
+def test_state_roundtrip_continues_identically():
+    results = _results()
+    acc = _acc(results[:120], window=50)
+    restored = MetricsAccumulator.from_dict(json.loads(json.dumps(acc.to_dict())))
+    for r in results[120:]:
+        acc.add_trade(r)
+        restored.add_trade(r)
+    assert restored.summary() == pytest.approx(acc.summary())
+    assert restored.summary() == pytest.approx(_acc(results, window=50).summary())
+
+
+def test_equity_row_matches_storage_metrics(storage_backend):
+    results = _results(60)
+    rows = []
+    for k, r in enumerate(results):
+        rows.append(make_trade(f"BTCUSDT-2024-01-{1 + k // 24:02d} {k % 24:02d}:00:00", state="CLOSED",
+                               side=r["direction"], entry_price=r["entry_price"], sl=r["sl"],
+                               exit_price=r["exit_price"], exit_reason=r["exit_reason"],
+                               r_multiple=r["r_multiple"], pnl_percent=r["pnl_percent"], result=r["result"]))
+    rows.append(make_trade("BTCUSDT-2024-02-01 00:00:00"))          # açık işlem sayılmaz
+    storage.ensure_data_dir()
+    storage.upsert_trade_rows(rows)
+
+    want = storage.compute_metrics_from_trades()
+    got = _acc(results).equity_row(want["timestamp_utc"])
+    assert got.keys() == want.keys()
+    for k in got:
+        assert got[k] == pytest.approx(want[k]), k
@@ -0,0 +1,107 @@
+# tests/test_portfolio.py
+# Portföy backtest'i: blok sınırlarından bağımsız sinyal akışı, heapq.merge zaman çizelgesi ↔ global sıralama
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import portfolio
+from analysis.portfolio import _SymbolStream, run_portfolio
+
+PARAMS = dict(rr_ratio=1.5, sl_buffer_pct=0.005, max_tp_percent=0.05, max_risk_pct=0.02, min_tp_percent=0.0,
+              min_risk_pct=0.0, use_htf_filter=True, htf_interval="4h", htf_lookback=3,
+              htf_max_bars_since_swing=300, fee_roundtrip=0.0006, conservative_double_hit=True,
+              timeout_close=None, max_future_bars=20)
+
+
+def _ohlc(n, start, seed):
+    rng = np.random.default_rng(seed)
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.008, n)))
+    o = np.concatenate([[100.0], c[:-1]]) * (1 + rng.normal(0, 0.001, n))
+    h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    lo = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.003, n)))
+    ts = pd.date_range(start, periods=n, freq="1h")
+    return pd.DataFrame({"timestamp": ts, "open": o, "high": h, "low": lo, "close": c, "volume": 1.0})
+
+
+SOURCES = {
+    "AAAUSDT": _ohlc(1500, "2024-01-01", 1),
+    "BBBUSDT": _ohlc(1200, "2024-01-05 03:00", 2),     # geç başlayan, farklı uzunluk
+    "CCCUSDT": _ohlc(1400, "2024-01-02", 3),
+}
+
+
+@pytest.mark.parametrize("htf", [False, True])
+def test_events_independent_of_block_size(monkeypatch, htf):
+    p = dict(PARAMS, use_htf_filter=htf)
+    src = SOURCES["AAAUSDT"]
+    ref = list(_SymbolStream("AAAUSDT", 0, src, "1h", p).events())
+    assert ref
+    for block in (37, 200, 1499):
+        monkeypatch.setattr(portfolio, "BLOCK_BARS", block)
+        assert list(_SymbolStream("AAAUSDT", 0, src, "1h", p).events()) == ref, block
+
+
+def _reference(sources, p, initial_equity, risk_per_trade, max_position_pct, max_gross_exposure, max_open):
+    """heapq yerine global sıralama: tüm olaylar (t, rank) ile sıralanır, kapanışlar her olaydan önce taranır."""
+    symbols = list(sources)
+    events = sorted((ev for r, s in enumerate(symbols)
+                     for ev in _SymbolStream(s, r, sources[s], "1h", p).events()),
+                    key=lambda ev: (ev[0], ev[1]))
+    equity, gross, pending, out = initial_equity, 0.0, [], []
+    open_side = {}
+
+    def close_until(key):
+        nonlocal equity, gross
+        while True:
+            due = [x for x in pending if key is None or (x[0], x[1]) <= key]
+            if not due:
+                return
+            x = min(due, key=lambda x: (x[0], x[1], x[2]))
+            pending.remove(x)
+            tid, notional, pnl, rank, side = x[3]
+            equity += notional * pnl / 100.0
+            gross -= notional
+            open_side[(rank, side)] -= 1
+            out.append((tid, round(notional, 6), round(equity, 6)))
+
+    for k, ev in enumerate(events):
+        t, rank, _j, side, entry, sl, _tp, closed, eval_t, _x, _px, _r, _b, pnl, _rm = ev
+        close_until((t, rank))
+        if open_side.get((rank, side), 0):
+            continue
+        if max_open is not None and sum(open_side.values()) >= max_open:
+            continue
+        risk_pct = abs(entry - sl) / entry
+        notional = min(equity * risk_per_trade / risk_pct, equity * max_position_pct,
+                       equity * max_gross_exposure - gross)
+        if notional <= 0:
+            continue
+        open_side[(rank, side)] = open_side.get((rank, side), 0) + 1
+        gross += notional
+        tid = f"{symbols[rank]}-{portfolio._iso(t)}"
+        if closed:
+            pending.append((eval_t, rank, k, (tid, notional, pnl, rank, side)))
+    close_until(None)
+    return out, equity
+
+
+@pytest.mark.parametrize("max_open, gross_cap", [(None, 1.0), (2, 1.0), (None, 0.3)])
+def test_heap_merge_matches_global_sort(max_open, gross_cap):
+    kw = dict(initial_equity=10_000.0, risk_per_trade=0.01, max_position_pct=0.25,
+              max_gross_exposure=gross_cap, max_open_positions=max_open)
+    res = run_portfolio(SOURCES, interval="1h", verbose=False, **kw)
+    want, final = _reference(SOURCES, PARAMS, kw["initial_equity"], kw["risk_per_trade"],
+                             kw["max_position_pct"], gross_cap, max_open)
+    got = [(t["trade_id"], round(t["notional"], 6), round(t["equity_after"], 6))
+           for t in res["trades"] if t["state"] == "CLOSED"]
+    assert got == want
+    assert res["summary"]["final_equity"] == pytest.approx(final)
+    assert len({t["symbol"] for t in res["trades"]}) == 3
+
+    # zaman çizelgesi monoton, limitler hiçbir anda aşılmaz
+    times = [e["time_utc"] for e in res["equity"]]
+    assert times == sorted(times)
+    for e in res["equity"]:
+        assert e["gross_exposure"] <= gross_cap * e["equity"] + 1e-6
+        if max_open is not None:
+            assert e["open_positions"] <= max_open
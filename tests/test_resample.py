@@ -0,0 +1,102 @@
+# tests/test_resample.py
+# LTF'ten üretilen HTF barları, aynı işlemlerden borsanın ürettiği doğrudan 4h barlarla aynı olmalı.
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis import live_signal
+from analysis.resample import HtfAggregator, resample_ohlc
+from services import kline_store
+
+M15 = 15 * 60_000
+H1 = 60 * 60_000
+H4 = 4 * H1
+
+
+def _base_bars(n, start=1_700_000_000_000 // H4 * H4 + H1, seed=7):
+    """Rastgele yürüyüş 15m barları (borsadaki 'işlemler' yerine geçer)."""
+    rng = np.random.default_rng(seed)
+    rows, price = [], 100.0
+    for k in range(n):
+        o = price
+        c = o * (1 + rng.normal(0, 0.004))
+        h = max(o, c) * (1 + abs(rng.normal(0, 0.002)))
+        l = min(o, c) * (1 - abs(rng.normal(0, 0.002)))
+        rows.append({"open_time": start + k * M15, "open": o, "high": h, "low": l, "close": c,
+                     "volume": float(rng.integers(1, 100))})
+        price = c
+    return rows
+
+
+def _native(rows, iv_ms):
+    """Borsanın yaptığı gibi: açılışı iv ızgarasına düşen alt barları tek bara topla (kısmi kovalar dahil)."""
+    out = {}
+    for r in rows:
+        b = r["open_time"] // iv_ms * iv_ms
+        cur = out.get(b)
+        if cur is None:
+            out[b] = dict(r, open_time=b)
+        else:
+            cur["high"] = max(cur["high"], r["high"])
+            cur["low"] = min(cur["low"], r["low"])
+            cur["close"] = r["close"]
+            cur["volume"] += r["volume"]
+    df = pd.DataFrame([out[b] for b in sorted(out)])
+    df.insert(0, "timestamp", pd.to_datetime(df["open_time"], unit="ms"))
+    return df
+
+
+def test_resampled_1h_matches_native_4h():
+    base = _base_bars(4 * 4 * 60 + 6)        # ilk 4h kovasının ortasından başlar, kuyrukta yarım 4h
+    h1 = _native(base, H1)
+    h4 = _native(base, H4)
+
+    got = resample_ohlc(h1, "4h", interval="1h")
+    # baştaki yarım kova atılır (açılışı gerçek 4h açılışı değil), sondaki oluşmakta olan kova tutulur
+    want = h4.iloc[1:].reset_index(drop=True)
+    assert got["open_time"].tolist() == want["open_time"].tolist()
+    assert (got["timestamp"] == want["timestamp"]).all()
+    for c in ["open", "high", "low", "close", "volume"]:
+        np.testing.assert_allclose(got[c].to_numpy(), want[c].to_numpy(), rtol=0, atol=1e-9)
+
+    closed = resample_ohlc(h1, "4h", interval="1h", include_partial=False)
+    assert closed["open_time"].tolist() == want["open_time"].tolist()[:-1]
+
+
+def test_aggregator_matches_batch_resample():
+    h1 = _native(_base_bars(4 * 4 * 30 + 2), H1)
+    agg = HtfAggregator("1h", "4h")
+    for r in h1.to_dict("records"):
+        agg.update(r)
+    batch = resample_ohlc(h1, "4h", interval="1h")
+    inc = agg.frame()
+    assert inc["open_time"].tolist() == batch["open_time"].tolist()
+    for c in ["open", "high", "low", "close", "volume"]:
+        np.testing.assert_allclose(inc[c].to_numpy(), batch[c].to_numpy(), rtol=0, atol=1e-9)
+
+
+def _store_history(symbol, bars):
+    now_ms = int(time.time() * 1000)
+    last_open = now_ms // H1 * H1
+    opens = last_open - H1 * np.arange(bars, 0, -1, dtype=np.int64)
+    rows = pd.DataFrame({"open_time": opens, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0})
+    kline_store.merge(symbol, "1h", rows, persist=False)
+
+
+def test_requests_fetch_htf_unless_ltf_history_stored(kline_store_tmp):
+    # depo boş → geniş LTF penceresi yerine HTF doğrudan çekilir
+    assert live_signal.live_signal_requests("BTCUSDT", interval="1h", limit=500) == [
+        ("BTCUSDT", "1h", 500), ("BTCUSDT", "4h", 500)]
+
+    # yalnızca son `limit` bar depoda → hâlâ HTF çekimi
+    _store_history("BTCUSDT", 499)
+    assert len(live_signal.live_signal_requests("BTCUSDT", interval="1h", limit=500)) == 2
+
+    # geçmişin tamamı depoda → tek LTF isteği, HTF yerelde üretilir
+    n = live_signal._ltf_limit(500, "1h", "4h")
+    _store_history("BTCUSDT", n)
+    assert live_signal.live_signal_requests("BTCUSDT", interval="1h", limit=500) == [("BTCUSDT", "1h", n)]
+
+    # htf_source="fetch" → her zaman ayrı çekim
+    assert len(live_signal.live_signal_requests("BTCUSDT", interval="1h", limit=500, htf_source="fetch")) == 2
@@ -0,0 +1,35 @@
+# tests/test_signals.py
+import pandas as pd
+
+from analysis.signals import generate_signals
+
+H1 = 3_600_000
+
+
+def _case(at):
+    """HL/LH + engulfing'ler: pencere içinde (0, 1, 2 bar) ve dışında (3 bar)."""
+    trend = [(at(0), 100.0, "HL"), (at(10), 110.0, "LH")]
+    engulf = [
+        (at(1), 101.0, "bullish"),
+        (at(3), 103.0, "bullish"),      # 3 bar sonra → pencere dışı
+        (at(10), 109.0, "bearish"),
+        (at(12), 108.0, "bearish"),
+        (at(11), 107.0, "bullish"),     # yanlış yön
+    ]
+    return trend, engulf
+
+
+def test_window_in_datetime_keys():
+    base = pd.Timestamp("2024-01-01")
+    trend, engulf = _case(lambda bars: base + pd.Timedelta(hours=bars))
+    got = generate_signals(trend, engulf, window_bars=2, interval="1h")
+    assert [(s[1], s[2]) for s in got] == [(101.0, "BUY"), (109.0, "SELL"), (108.0, "SELL")]
+
+
+def test_window_in_epoch_ms_keys_matches_datetime():
+    base = 1_704_067_200_000
+    trend, engulf = _case(lambda bars: base + bars * H1)
+    got = generate_signals(trend, engulf, window_bars=2, interval="1h")
+    # epoch-ms anahtarlarla pencere 2 bar kalmalı (ns varsayımıyla 10^6 kat geniş olurdu)
+    assert [(s[1], s[2]) for s in got] == [(101.0, "BUY"), (109.0, "SELL"), (108.0, "SELL")]
+    assert got[0][0] == base + H1
@@ -0,0 +1,125 @@
+# tests/test_storage_sqlite.py
+# SQLite arka ucu: upsert, CSV içe/dışa aktarım, sinyal tekilliği, eski veritabanı geçişi
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from paper_trader import storage, storage_sqlite
+from tests.test_trade_book import make_trade
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    for name, value in {
+        "DATA_DIR": str(tmp_path),
+        "SIGNALS_CSV": str(tmp_path / "signals_live.csv"),
+        "TRADES_CSV": str(tmp_path / "trades_live.csv"),
+        "EQUITY_CSV": str(tmp_path / "equity_live.csv"),
+        "SQLITE_PATH": str(tmp_path / "paper_trader.db"),
+    }.items():
+        monkeypatch.setattr(storage_sqlite, name, value)
+    storage_sqlite.close()
+    yield tmp_path
+    storage_sqlite.close()
+
+
+def make_signal(symbol, ts, **kw):
+    row = {"signal_id": f"{symbol}-{ts}", "timestamp_utc": ts, "symbol": symbol, "interval": "1h",
+           "side": "BUY", "entry_price": 100.0, "sl": 99.0, "tp": 101.5, "rr_ratio": 1.5,
+           "sl_buffer_pct": 0.005, "status": "opened", "note": ""}
+    row.update(kw)
+    return row
+
+
+def test_upsert_inserts_then_updates_in_place(db):
+    a, b = make_trade("BTCUSDT-2024-01-01 00:00:00"), make_trade("ETHUSDT-2024-01-01 00:00:00", symbol="ETHUSDT")
+    storage_sqlite.upsert_trade_rows([a, b])
+    closed = make_trade(a["trade_id"], state="CLOSED")
+    storage_sqlite.upsert_trade_row(closed)
+    df = storage_sqlite.load_trades()
+    assert df["trade_id"].tolist() == [a["trade_id"], b["trade_id"]]        # sıra korunur, satır çoğalmaz
+    assert df.iloc[0]["state"] == "CLOSED" and df.iloc[0]["exit_price"] == pytest.approx(101.5)
+    assert df.iloc[0]["close_time_utc"] == closed["close_time_utc"]
+    assert pd.isna(df.iloc[1]["exit_price"])                               # "" → NULL
+    assert storage_sqlite.load_trades(symbol="ETHUSDT", state="OPEN")["trade_id"].tolist() == [b["trade_id"]]
+    # kısmi satır yalnızca verilen kolonları günceller
+    storage_sqlite.upsert_trade_row({"trade_id": b["trade_id"], "bars_held": 7})
+    row = storage_sqlite.load_trades(symbol="ETHUSDT").iloc[0]
+    assert row["bars_held"] == 7 and row["entry_price"] == pytest.approx(100.0)
+    assert storage_sqlite.trade_exists(a["trade_id"]) and not storage_sqlite.trade_exists("nope")
+
+
+def test_batch_rolls_back_on_error(db):
+    storage_sqlite.upsert_trade_row(make_trade("BTCUSDT-2024-01-01 00:00:00"))
+    with pytest.raises(RuntimeError):
+        with storage_sqlite.batch():
+            storage_sqlite.upsert_trade_row(make_trade("BTCUSDT-2024-01-01 00:00:00", state="CLOSED"))
+            storage_sqlite.append_signal_row(make_signal("BTCUSDT", "2024-01-01 00:00:00"))
+            raise RuntimeError("boom")
+    assert storage_sqlite.load_trades().iloc[0]["state"] == "OPEN"
+    assert storage_sqlite.load_signals().empty
+
+
+def test_signal_rows_are_unique_per_symbol_and_time(db):
+    storage_sqlite.append_signal_row(make_signal("BTCUSDT", "2024-01-01 00:00:00"))
+    storage_sqlite.append_signal_row(make_signal("BTCUSDT", "2024-01-01 00:00:00", note="again"))
+    storage_sqlite.append_signal_row(make_signal("ETHUSDT", "2024-01-01 00:00:00"))
+    sigs = storage_sqlite.load_signals()
+    assert len(sigs) == 2 and sigs.iloc[0]["note"] in ("", None)
+    assert storage_sqlite.signal_exists("BTCUSDT", "2024-01-01 00:00:00")
+
+
+def test_import_csv_is_idempotent(db):
+    pd.DataFrame([make_trade("BTCUSDT-2024-01-01 00:00:00", state="CLOSED"),
+                  make_trade("BTCUSDT-2024-01-01 05:00:00")]).to_csv(db / "trades_live.csv", index=False)
+    pd.DataFrame([make_signal("BTCUSDT", "2024-01-01 00:00:00"),
+                  make_signal("BTCUSDT", "2024-01-01 05:00:00")]).to_csv(db / "signals_live.csv", index=False)
+    storage_sqlite.ensure_data_dir()                # taze veritabanı → CSV geçmişi bir kez alınır
+    storage_sqlite.import_csv()                     # --import-csv tekrar
+    storage_sqlite.import_csv()
+    assert len(storage_sqlite.load_signals()) == 2
+    trades = storage_sqlite.load_trades()
+    assert len(trades) == 2 and trades.iloc[0]["state"] == "CLOSED"
+
+
+def test_export_round_trip(db):
+    storage_sqlite.upsert_trade_rows([make_trade("BTCUSDT-2024-01-01 00:00:00", state="CLOSED"),
+                                      make_trade("BTCUSDT-2024-01-01 05:00:00")])
+    storage_sqlite.append_signal_row(make_signal("BTCUSDT", "2024-01-01 00:00:00"))
+    storage_sqlite.append_equity_row({"timestamp_utc": "2024-01-01 06:00:00", "equity_index": 101.5,
+                                      "trades_closed": 1, "win_rate": 100.0, "profit_factor": 9999.0,
+                                      "pnl_percent_cum": 1.5})
+    out = db / "export"
+    out.mkdir()
+    storage_sqlite.export_csv(str(out / "t.csv"), str(out / "s.csv"), str(out / "e.csv"))
+    trades = pd.read_csv(out / "t.csv")
+    assert list(trades.columns) == storage.TRADES_COLUMNS
+    assert trades["trade_id"].tolist() == storage_sqlite.load_trades()["trade_id"].tolist()
+    assert trades.iloc[0]["pnl_percent"] == pytest.approx(1.5)
+    assert list(pd.read_csv(out / "s.csv").columns) == storage.SIGNALS_COLUMNS
+    eq = pd.read_csv(out / "e.csv")
+    assert eq.iloc[0]["equity_index"] == pytest.approx(101.5) and eq.iloc[0]["trades_closed"] == 1
+
+
+def test_old_database_duplicates_are_collapsed(db):
+    # UNIQUE'ten önceki şema: düz index, tekrar eden sinyal satırları
+    conn = sqlite3.connect(storage_sqlite.SQLITE_PATH)
+    cols = storage.SIGNALS_COLUMNS
+    conn.executescript(f"""
+        CREATE TABLE trades (trade_id TEXT PRIMARY KEY, {", ".join(c + " TEXT" for c in storage.TRADES_COLUMNS[1:])});
+        CREATE TABLE signals (id INTEGER PRIMARY KEY AUTOINCREMENT, {", ".join(c + " TEXT" for c in cols)});
+        CREATE INDEX idx_signals_symbol_ts ON signals(symbol, timestamp_utc);
+    """)
+    for note in ("first", "dup", "dup2"):
+        row = make_signal("BTCUSDT", "2024-01-01 00:00:00", note=note)
+        conn.execute(f"INSERT INTO signals ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                     [row[c] for c in cols])
+    conn.commit()
+    conn.close()
+
+    sigs = storage_sqlite.load_signals()
+    assert sigs["note"].tolist() == ["first"]
+    storage_sqlite.import_csv()
+    storage_sqlite.append_signal_row(make_signal("BTCUSDT", "2024-01-01 00:00:00"))
+    assert len(storage_sqlite.load_signals()) == 1
@@ -0,0 +1,37 @@
+# tests/test_sweep.py
+# Paralel tarama ↔ seri run_backtest (detect_swing_points + classify_trend_structure ile kurulan girdiler)
+import csv
+import json
+
+import pytest
+
+from analysis.backtest import run_backtest
+from analysis.sweep import SUMMARY_COLUMNS, run_sweep, summarize_results
+from tests.test_walk_forward import _ohlc, _reference
+
+
+def test_sweep_rows_match_serial_backtest(tmp_path):
+    df = _ohlc(800)
+    grid = {"rr_ratio": [1.0, 2.0], "max_future_bars": [5, 20], "nope": [None]}
+    out_csv = tmp_path / "sweep.csv"
+    # "nope" run_backtest'te yok → her kombinasyon hata satırı; ayrı bir taramada geçerli ızgara
+    bad = list(run_sweep({"test": df}, grid, out_csv=str(out_csv), max_workers=1, verbose=False))
+    assert len(bad) == 4 and all(r["error"].startswith("TypeError") for r in bad)
+
+    grid.pop("nope")
+    rows = list(run_sweep({"test": df}, grid, out_csv=str(out_csv), max_workers=2, combos_per_task=1,
+                          base_params={"fee_roundtrip": 0.001}, verbose=False))
+    assert sorted(r["combo_id"] for r in rows) == [0, 1, 2, 3]
+
+    signals, highs, lows = _reference(df)
+    for r in rows:
+        assert r["symbol"] == "TEST" and "error" not in r
+        params = json.loads(r["params"])
+        want = summarize_results(run_backtest(signals, df, highs, lows, symbol="TEST", fee_roundtrip=0.001, **params))
+        for k, v in want.items():
+            assert r[k] == pytest.approx(v), (params, k)
+
+    with open(out_csv, newline="", encoding="utf-8") as f:
+        written = list(csv.DictReader(f))
+    assert list(written[0].keys()) == SUMMARY_COLUMNS
+    assert len(written) == 4 and all(not w["error"] for w in written)
@@ -0,0 +1,113 @@
+# tests/test_swing_points.py
+# detect_swing_points / swing_point_indices ↔ eski (satır satır) döngü birebir eşitlik testi
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.swing_points import detect_swing_points, swing_point_indices
+
+
+def reference_detect_swing_points(df, lookback=3):
+    """Vektörleştirme öncesi orijinal uygulama (referans)."""
+    swing_highs = []
+    swing_lows = []
+
+    for i in range(lookback, len(df) - lookback):
+        is_swing_high = all(df["high"].iloc[i] > df["high"].iloc[i - j] and df["high"].iloc[i] > df["high"].iloc[i + j] for j in range(1, lookback + 1))
+        is_swing_low = all(df["low"].iloc[i] < df["low"].iloc[i - j] and df["low"].iloc[i] < df["low"].iloc[i + j] for j in range(1, lookback + 1))
+
+        if is_swing_high:
+            swing_highs.append((df["timestamp"].iloc[i], df["high"].iloc[i]))
+
+        if is_swing_low:
+            swing_lows.append((df["timestamp"].iloc[i], df["low"].iloc[i]))
+
+    return swing_highs, swing_lows
+
+
+def make_df(high, low):
+    n = len(high)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "high": np.asarray(high, dtype=np.float64),
+        "low": np.asarray(low, dtype=np.float64),
+    })
+
+
+def random_df(n, seed, ties=False, nan_frac=0.0):
+    rng = np.random.default_rng(seed)
+    mid = 100 + np.cumsum(rng.normal(0, 1, n))
+    if ties:
+        mid = np.round(mid)               # bol eşitlik
+    high = mid + (np.round(rng.uniform(0, 2, n)) if ties else rng.uniform(0, 2, n))
+    low = mid - (np.round(rng.uniform(0, 2, n)) if ties else rng.uniform(0, 2, n))
+    if nan_frac:
+        high[rng.random(n) < nan_frac] = np.nan
+        low[rng.random(n) < nan_frac] = np.nan
+    return make_df(high, low)
+
+
+def assert_same(got, ref):
+    for g, r in zip(got, ref):
+        assert len(g) == len(r)
+        for (gt, gv), (rt, rv) in zip(g, r):
+            assert gt == rt
+            assert gv == rv
+            assert type(gt) is type(rt)
+            assert type(gv) is type(rv)
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("seed", range(5))
+def test_random_parity(lookback, seed):
+    df = random_df(400, seed)
+    assert_same(detect_swing_points(df, lookback), reference_detect_swing_points(df, lookback))
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 3, 4, 5])
+def test_ties_are_not_swings(lookback):
+    df = random_df(400, 42, ties=True)
+    assert_same(detect_swing_points(df, lookback), reference_detect_swing_points(df, lookback))
+    flat = make_df([5.0] * 20, [1.0] * 20)
+    assert detect_swing_points(flat, lookback) == ([], [])
+    # tepe komşusuyla eşit → swing değil
+    plateau = make_df([1, 2, 3, 3, 2, 1, 0, 0], [1, 0, -1, -1, 0, 1, 2, 2])
+    assert_same(detect_swing_points(plateau, lookback), reference_detect_swing_points(plateau, lookback))
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 3, 4, 5])
+def test_nan_windows(lookback):
+    df = random_df(300, 7, nan_frac=0.05)
+    assert_same(detect_swing_points(df, lookback), reference_detect_swing_points(df, lookback))
+    # NaN merkez / komşu pencere swing üretmez
+    spike = make_df([1, 1, np.nan, 9, 1, 1, 1, 1, 1, 1, 1], [0] * 11)
+    assert_same(detect_swing_points(spike, lookback), reference_detect_swing_points(spike, lookback))
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 3, 4, 5])
+def test_short_inputs(lookback):
+    for n in range(0, 2 * lookback + 2):
+        df = random_df(n, n)
+        got = detect_swing_points(df, lookback)
+        assert_same(got, reference_detect_swing_points(df, lookback))
+        hi, lo = swing_point_indices(df["high"].to_numpy(), df["low"].to_numpy(), lookback)
+        assert hi.dtype == np.int64 and lo.dtype == np.int64
+        if n < 2 * lookback + 1:
+            assert got == ([], []) and len(hi) == 0 and len(lo) == 0
+
+
+def test_element_types():
+    df = random_df(200, 3)
+    highs, lows = detect_swing_points(df, 3)
+    assert highs and lows
+    for t, v in highs + lows:
+        assert isinstance(t, pd.Timestamp)
+        assert isinstance(v, np.float64)
+
+
+def test_indices_match_tuples():
+    df = random_df(500, 11)
+    hi, lo = swing_point_indices(df["high"].to_numpy(), df["low"].to_numpy(), 3)
+    highs, lows = reference_detect_swing_points(df, 3)
+    assert [df["timestamp"].iloc[i] for i in hi] == [t for t, _ in highs]
+    assert [df["timestamp"].iloc[i] for i in lo] == [t for t, _ in lows]
@@ -0,0 +1,137 @@
+# tests/test_swing_stream.py
+# SwingTrendDetector (bar bar) ↔ detect_swing_points + classify_trend_structure (batch) birebir eşitlik testi
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.live_signal import get_live_signal
+from analysis.resample import resample_ohlc
+from analysis.swing_points import detect_swing_points
+from analysis.swing_stream import SwingTrendDetector
+from analysis.trend_structure import classify_trend_structure
+
+
+def make_klines(n, seed, freq="1h", ties=False):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    opens = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(opens, close) + rng.uniform(0, 1, n)
+    low = np.minimum(opens, close) - rng.uniform(0, 1, n)
+    if ties:
+        high, low = np.round(high), np.round(low)
+    ts = pd.date_range("2024-01-01", periods=n, freq=freq)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "open": opens, "high": high, "low": low, "close": close,
+        "volume": rng.uniform(1, 10, n),
+        "open_time": ((ts - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64),
+    })
+
+
+def batch(df, lookback):
+    highs, lows = detect_swing_points(df, lookback=lookback)
+    return highs, lows, classify_trend_structure(highs, lows)
+
+
+def assert_prefix_parity(df, lookback):
+    det = SwingTrendDetector(lookback=lookback)
+    for k in range(len(df)):
+        row = df.iloc[k]
+        det.update(row["timestamp"], row["high"], row["low"])
+        highs, lows, points = batch(df.iloc[: k + 1], lookback)
+        assert det.swing_highs == highs
+        assert det.swing_lows == lows
+        assert det.trend_points == points
+
+
+@pytest.mark.parametrize("lookback", [1, 2, 3, 5])
+@pytest.mark.parametrize("seed", range(3))
+def test_every_prefix_matches_batch(lookback, seed):
+    assert_prefix_parity(make_klines(150, seed), lookback)
+
+
+@pytest.mark.parametrize("lookback", [1, 3])
+def test_ties_every_prefix(lookback):
+    assert_prefix_parity(make_klines(150, 9, ties=True), lookback)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_htf_resampled_every_prefix(seed):
+    # get_live_signal'deki HTF yolu: 4h barlar kapanmış 1h barlardan üretilir, htf_lookback=3
+    ltf = make_klines(4 * 120 + 3, seed)
+    htf = resample_ohlc(ltf.iloc[:-1], "4h", interval="1h")
+    assert_prefix_parity(htf, 3)
+
+
+def test_sliding_window_matches_batch():
+    # canlı kullanım: her turda son N kapanmış bar, detektör kalıcı
+    df = make_klines(600, 4)
+    det = SwingTrendDetector(lookback=3)
+    for end in range(60, len(df) + 1):
+        win = df.iloc[max(0, end - 200): end].reset_index(drop=True)
+        assert det.window(win) == batch(win, 3)
+
+
+def test_sync_resets_on_older_series():
+    df = make_klines(200, 5)
+    det = SwingTrendDetector(lookback=3)
+    det.sync(df)
+    det.sync(df.iloc[:120])                 # daha eskiye biten seri → baştan kurulur
+    highs, lows, points = batch(df.iloc[:120], 3)
+    assert (det.swing_highs, det.swing_lows, det.trend_points) == (highs, lows, points)
+
+
+def test_get_live_signal_with_detector_matches_batch():
+    # uçtan uca: HTF filtresi açık (resample yolu); detektörlü ve detektörsüz çağrılar aynı sinyali vermeli
+    df = make_klines(1000, 3)
+    det = SwingTrendDetector(lookback=3)
+    fired = 0
+    for end in range(400, len(df) + 1):
+        win = df.iloc[end - 400: end].reset_index(drop=True)
+        kw = dict(symbol="TEST", interval="1h", use_htf_filter=True, htf_interval="4h", df=win)
+        a = get_live_signal(**kw, detector=det)
+        b = get_live_signal(**kw)
+        assert a == b
+        fired += a is not None
+    assert fired > 0
+
+
+def test_window_unsettled_tail_is_not_consumed():
+    # bar açılışında az önce kapanan bar henüz kesinleşmemiş olabilir; sonraki çekimde değeri değişir
+    df = make_klines(300, 6)
+    det = SwingTrendDetector(lookback=3)
+    rng = np.random.default_rng(0)
+    for end in range(40, len(df) + 1):
+        final = df.iloc[:end].reset_index(drop=True)
+        early = final.copy()
+        k = len(early) - 1                       # son bar: ilk çekimde farklı high/low
+        early.loc[k, "high"] += rng.uniform(-2, 2)
+        early.loc[k, "low"] = min(early.loc[k, "low"] + rng.uniform(-2, 2), early.loc[k, "high"])
+        cut = final["timestamp"].iloc[-2]
+        assert det.window(early, settled_until=cut) == batch(early, 3)
+        assert det.window(final, settled_until=cut) == batch(final, 3)
+
+
+def test_sync_rebuilds_when_consumed_tail_changes():
+    df = make_klines(200, 7)
+    det = SwingTrendDetector(lookback=3)
+    det.sync(df)
+    healed = df.copy()
+    healed.loc[len(healed) - 2, "high"] += 50      # depo kuyruğu sonradan düzeltildi
+    det.sync(healed)
+    assert (det.swing_highs, det.swing_lows, det.trend_points) == batch(healed, 3)
+
+
+def test_window_labels_are_not_reclassified(monkeypatch):
+    from analysis import swing_stream
+
+    df = make_klines(400, 8)
+    det = SwingTrendDetector(lookback=3)
+    det.sync(df.iloc[:300])
+    # etiketler update()'te bir kez hesaplanır; pencere sorgusu sınıflandırıcıyı çağırmaz
+    monkeypatch.setattr(swing_stream, "classify_trend_structure",
+                        lambda *a: pytest.fail("window() etiketleri yeniden hesaplamamalı"), raising=False)
+    for end in range(300, 400):
+        win = df.iloc[end - 150: end].reset_index(drop=True)
+        highs, lows, points = det.window(win)
+        assert (highs, lows, points) == batch(win, 3)
@@ -0,0 +1,143 @@
+# tests/test_trade_book.py
+# TradeBook: depodan ilk kurulum, kapanmış işlemlerin tekrar açılmaması, çökme sonrası journal kurtarma
+import pytest
+
+from paper_trader import paper_trader as pt
+from paper_trader import storage, trade_book
+from paper_trader.signal_index import SignalIndex
+from paper_trader.trade_book import TradeBook
+
+
+def make_trade(trade_id, state="OPEN", symbol="BTCUSDT", side="BUY", **kw):
+    row = {
+        "trade_id": trade_id, "open_time_utc": trade_id.split("-", 1)[1], "close_time_utc": "",
+        "symbol": symbol, "interval": "1h", "side": side,
+        "entry_price": 100.0, "sl": 99.0, "tp": 101.5, "exit_price": "", "exit_reason": "",
+        "bars_held": 0, "fee_roundtrip": 0.0, "risk_abs": 1.0, "r_multiple": "", "pnl_percent": "",
+        "result": "", "state": state,
+    }
+    if state == "CLOSED":
+        row.update(close_time_utc="2024-01-01 05:00:00", exit_price=101.5, exit_reason="TP",
+                   r_multiple=1.5, pnl_percent=1.5, result="WIN")
+    row.update(kw)
+    return row
+
+
+def test_bootstrap_remembers_closed_trades(storage_backend, tmp_path):
+    storage.ensure_data_dir()
+    storage.upsert_trade_rows([make_trade("BTCUSDT-2024-01-01 00:00:00", state="CLOSED"),
+                               make_trade("BTCUSDT-2024-01-01 03:00:00")])
+    book = TradeBook.open(path=str(tmp_path / "book"))
+    try:
+        assert book.exists("BTCUSDT-2024-01-01 00:00:00")
+        assert book.exists("BTCUSDT-2024-01-01 03:00:00")
+        assert not book.exists("BTCUSDT-2024-01-01 04:00:00")
+        assert book.metrics.n == 1
+    finally:
+        book.close()
+
+
+def test_exists_falls_back_to_storage(storage_backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(trade_book, "RECENT_CLOSED_MAX", 1)
+    storage.ensure_data_dir()
+    old, new = "BTCUSDT-2024-01-01 00:00:00", "BTCUSDT-2024-01-01 02:00:00"
+    storage.upsert_trade_rows([make_trade(old, state="CLOSED", close_time_utc="2024-01-01 01:00:00"),
+                               make_trade(new, state="CLOSED", close_time_utc="2024-01-01 03:00:00")])
+    book = TradeBook.open(path=str(tmp_path / "book"))
+    try:
+        assert old not in book._recent_closed      # bellekteki pencereden düştü
+        assert book.exists(old)                    # → depodan
+        assert book.exists(new)
+    finally:
+        book.close()
+
+
+def test_resignal_does_not_reopen_closed_trade(storage_backend, tmp_path, monkeypatch):
+    """Kapanmış işlemin swing'i tekrar sinyal verirse (MAX_BARS_SINCE_SWING içinde) CLOSED kayıt ezilmez."""
+    tid = "BTCUSDT-2024-01-01 00:00:00"
+    storage.ensure_data_dir()
+    storage.upsert_trade_rows([make_trade(tid, state="CLOSED")])
+
+    sig = {"signal": "BUY", "time": "2024-01-01 00:00:00", "price": 100.0, "sl": 99.0, "tp": 101.5}
+    monkeypatch.setattr(pt, "SYMBOLS", ["BTCUSDT"])
+    monkeypatch.setattr(pt, "_process_symbol", lambda *a: {"log": [], "updated": [], "sig": dict(sig)})
+    monkeypatch.setattr(pt, "_BOOK", TradeBook.open(path=str(tmp_path / "book")))
+    monkeypatch.setattr(pt, "_SIGNALS", SignalIndex.load())
+    try:
+        pt.on_bar_open()
+        pt.on_bar_open()
+        trades = storage.load_trades()
+        assert len(trades) == 1
+        assert trades.iloc[0]["state"] == "CLOSED"
+        assert float(trades.iloc[0]["exit_price"]) == pytest.approx(101.5)
+        assert len(pt._BOOK) == 0
+    finally:
+        pt._BOOK.close()
+
+
+def _book(path):
+    return TradeBook.open(path=str(path), bootstrap=lambda: [], snapshot_every=1000,
+                          lookup=lambda trade_id: False)
+
+
+@pytest.mark.parametrize("tail", [b'{"seq": 9, "trade": {"trade_id": "BTCUSDT-2024', b'{"seq"', b""])
+def test_journal_recovery_after_truncated_line(tmp_path, tail):
+    a, b, c = "BTCUSDT-2024-01-01 00:00:00", "ETHUSDT-2024-01-01 01:00:00", "BTCUSDT-2024-01-01 02:00:00"
+    book = _book(tmp_path)
+    book.put(make_trade(a))
+    book.put(make_trade(b, symbol="ETHUSDT", side="SELL"))
+    book.put(make_trade(a, state="CLOSED"))
+    book.commit()
+    seq = book.seq
+    book.close()
+
+    # çökme: son satır yarım yazılmış
+    with open(book.journal_path, "ab") as f:
+        f.write(tail)
+
+    book = _book(tmp_path)
+    try:
+        assert book.seq == seq
+        assert [t["trade_id"] for t in book.open_trades()] == [b]
+        assert book.exists(a) and not book.has_open("BTCUSDT", "BUY")
+        assert book.metrics.n == 1
+        with open(book.journal_path, "rb") as f:
+            assert f.read().endswith(b"\n")         # yarım satır kesildi
+        book.put(make_trade(c))
+        book.commit()
+    finally:
+        book.close()
+
+    # kesilen satırın ardından yazılan kayıt yeniden okunabilir
+    book = _book(tmp_path)
+    try:
+        assert sorted(t["trade_id"] for t in book.open_trades()) == sorted([b, c])
+        assert book.seq == seq + 1
+    finally:
+        book.close()
+
+
+def test_journal_recovery_keeps_complete_last_line_without_newline(tmp_path):
+    a, b = "BTCUSDT-2024-01-01 00:00:00", "BTCUSDT-2024-01-01 01:00:00"
+    book = _book(tmp_path)
+    book.put(make_trade(a))
+    book.commit()
+    book.close()
+    with open(book.journal_path, "rb+") as f:
+        data = f.read()
+        f.seek(0)
+        f.truncate()
+        f.write(data.rstrip(b"\n"))                 # son satır tam ama satır sonu yok
+
+    book = _book(tmp_path)
+    try:
+        assert [t["trade_id"] for t in book.open_trades()] == [a]
+        book.put(make_trade(b))
+        book.commit()
+    finally:
+        book.close()
+    book = _book(tmp_path)
+    try:
+        assert [t["trade_id"] for t in book.open_trades()] == [a, b]
+    finally:
+        book.close()
@@ -0,0 +1,93 @@
+# tests/test_walk_forward.py
+# Walk-forward pencereleri: tüm seri için bir kez bulunan swing'lerin dilimlenmesi ↔ pencereye detect_swing_points
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import sweep
+from analysis import walk_forward as wf
+from analysis.backtest import run_backtest
+from analysis.swing_points import detect_swing_points
+from analysis.trend_structure import classify_trend_structure
+
+L = 3
+
+
+def _ohlc(n=1500, seed=21):
+    rng = np.random.default_rng(seed)
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.008, n)))
+    o = np.concatenate([[100.0], c[:-1]])
+    h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    lo = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.003, n)))
+    h[200:204] = h[199]                      # eşit tepeler → swing değil
+    ts = pd.date_range("2024-01-01", periods=n, freq="1h")
+    return pd.DataFrame({"timestamp": ts, "open": o, "high": h, "low": lo, "close": c})
+
+
+def _reference(wdf):
+    highs, lows = detect_swing_points(wdf, lookback=L)
+    points = classify_trend_structure(highs, lows)
+    signals = [(t, v, "BUY" if lab == "HL" else "SELL") for t, v, lab in points if lab in ("HL", "LH")]
+    return signals, highs, lows
+
+
+def test_window_swings_match_detection_on_window():
+    df = _ohlc()
+    a = sweep.prepare_symbol(df, lookback=L)
+    rng = np.random.default_rng(1)
+    windows = [(0, len(df)), (0, 7), (5, 12), (len(df) - 10, len(df))]
+    windows += [tuple(sorted(rng.integers(0, len(df) + 1, 2).tolist())) for _ in range(40)]
+    for start, end in windows:
+        wdf, signals, highs, lows = wf._window_inputs(df, a, start, end, start, L)
+        assert len(wdf) == end - start
+        r_signals, r_highs, r_lows = _reference(df.iloc[start:end].reset_index(drop=True))
+        assert highs == r_highs and lows == r_lows, (start, end)
+        assert signals == r_signals, (start, end)
+
+
+def test_window_signal_range():
+    df = _ohlc()
+    a = sweep.prepare_symbol(df, lookback=L)
+    start, end, s_from, s_to = 100, 900, 400, 700
+    _, signals, _, _ = wf._window_inputs(df, a, start, end, s_from, L, signal_to=s_to)
+    r_signals, _, _ = _reference(df.iloc[start:end].reset_index(drop=True))
+    t0, t1 = df["timestamp"].iloc[s_from], df["timestamp"].iloc[s_to]
+    assert signals == [s for s in r_signals if t0 <= s[0] < t1]
+    assert signals
+
+
+@pytest.mark.parametrize("anchored", [False, True])
+def test_folds_tile_the_series(anchored):
+    folds = wf.make_folds(1000, 300, 100, anchored=anchored)
+    assert len(folds) == 7
+    for k, (tr_s, tr_e, te_s, te_e) in enumerate(folds):
+        assert tr_e == te_s and te_e - te_s == 100
+        assert tr_s == (0 if anchored else tr_e - 300)
+        if k:
+            assert te_s == folds[k - 1][3]
+    assert folds[-1][3] <= 1000
+
+
+def test_oos_exits_not_cut_at_fold_end(monkeypatch):
+    """OOS girişleri [te_start, te_end) içinde; fiyat penceresi test sonrasına uzatıldığı için çıkışlar
+    tüm seri üzerinde koşturulanla aynı (fold sonunda yapay MAX_BARS yok)."""
+    df = _ohlc()
+    a = sweep.prepare_symbol(df, lookback=L)
+    df_w = df.assign(open_time=sweep.open_times(df))
+    monkeypatch.setitem(sweep._WORKER_FRAMES, "TEST", (df_w, a))   # attach_symbol önbelleği
+
+    fold = (200, 800, 800, 910)                # 908'de açılan işlem 18 bar tutuluyor → test sonunu aşar
+    out = wf._run_fold("TEST", 0, fold, [{"rr_ratio": 1.5}], {"max_future_bars": 20}, "pnl_percent_cum", 0,
+                       300, L)
+    assert out["selected"] and out["oos_trades"]
+    ts = df_w["timestamp"]
+    for t in out["oos_trades"]:
+        assert ts.iloc[800] < t["entry_time"] <= ts.iloc[910]
+    assert any(ts.searchsorted(t["entry_time"]) + t["bars_held"] > 910 for t in out["oos_trades"])
+
+    # aynı sinyaller, serinin sonuna kadar uzanan fiyat penceresiyle
+    xdf, xsig, xhi, xlo = wf._window_inputs(df_w, a, 500, 931, 800, L, signal_to=910)
+    full = df_w.iloc[500:].reset_index(drop=True)
+    ref = run_backtest(xsig, full, xhi, xlo, rr_ratio=1.5, max_future_bars=20, symbol="TEST")
+    got = [(t["entry_time"], t["exit_reason"], t["bars_held"], t["exit_price"]) for t in out["oos_trades"]]
+    assert got == [(t["entry_time"], t["exit_reason"], t["bars_held"], t["exit_price"]) for t in ref]